@@ -1,16 +1,19 @@
 import streamlit as st
-import pandas as pd
-import joblib
+import time
 from datetime import datetime
+from model_registry import registry
+from tree_engine import as_flat_forest, reset_trees_evaluated, trees_evaluated, with_early_exit
+from prediction_cache import cached_predictor
+from feature_schema import CROP_BOUNDS, CROP_FEATURES, CROP_LABELS, reverse_label_mapping
+from sensitivity import crop_regions, crop_sweep
+from batch_scoring import score_crop_csv
+from bulk_upload import render_bulk_scoring
+from static_assets import background_css, font_import
+from lazy_imports import lazy_module
 
-# Label mapping
-label_mapping = {
-    'rice': 0, 'maize': 1, 'chickpea': 2, 'kidneybeans': 3, 'pigeonpeas': 4, 'mothbeans': 5,
-    'mungbean': 6, 'blackgram': 7, 'lentil': 8, 'pomegranate': 9, 'banana': 10, 'mango': 11,
-    'grapes': 12, 'watermelon': 13, 'muskmelon': 14, 'apple': 15, 'orange': 16, 'papaya': 17,
-    'coconut': 18, 'cotton': 19, 'jute': 20, 'coffee': 21
-}
-reverse_label_mapping = {v: k.capitalize() for k, v in label_mapping.items()}
+# Imported on first use, not before the page is painted (see lazy_imports.py)
+pd = lazy_module("pandas")
+alt = lazy_module("altair")
 
 crop_info = {
     "Rice": "Rice is a staple food for more than half of the world's population. It requires warm temperatures and plenty of water.",
@@ -40,10 +43,9 @@ crop_info = {
 st.set_page_config(page_title="🌾 Crop Recommender", layout="wide", page_icon="🌱")
 
 def add_custom_styles():
-    background_url = "https://images.unsplash.com/photo-1501004318641-b39e6451bec6?auto=format&fit=crop&w=1470&q=80"
     st.markdown(f"""
         <style>
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
+        {font_import('Inter')}
 
         .stApp::before {{
             content: "";
@@ -55,7 +57,7 @@ def add_custom_styles():
         }}
 
         .stApp {{
-            background: url('{background_url}') no-repeat center center fixed;
+            background: no-repeat center center fixed;
             background-size: cover;
             font-family: 'Inter', sans-serif;
             color: #1a1a1a;
@@ -175,6 +177,7 @@ def add_custom_styles():
             color: #dcedc8;
             font-weight: 500;
         }}
+        {background_css("crop_field.jpg")}
         </style>
     """, unsafe_allow_html=True)
 
@@ -192,10 +195,9 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-@st.cache_resource(show_spinner=False)
 def load_model():
     try:
-        return joblib.load("crop_recommendation_model.pkl")
+        return registry.get("crop")
     except FileNotFoundError:
         st.error("❌ Model file 'crop_recommendation_model.pkl' not found.")
         return None
@@ -209,15 +211,15 @@ with st.form("crop_input_form"):
     st.markdown("### 📊 *Soil & Environmental Parameters*")
     col1, col2, col3 = st.columns(3, gap="large")
     with col1:
-        N = st.number_input("Nitrogen content (Kg/Ha)", min_value=0, max_value=150, value=50)
-        K = st.number_input("Potassium content (Kg/Ha)", min_value=5, max_value=250, value=50)
-        temperature = st.number_input("Temperature (°C)", min_value=5.0, max_value=45.0, value=25.0, step=0.1)
+        N = st.number_input("Nitrogen content (Kg/Ha)", *CROP_BOUNDS["N"], value=50)
+        K = st.number_input("Potassium content (Kg/Ha)", *CROP_BOUNDS["K"], value=50)
+        temperature = st.number_input("Temperature (°C)", *CROP_BOUNDS["temperature"], value=25.0, step=0.1)
     with col2:
-        P = st.number_input("Phosphorus content (Kg/Ha)", min_value=5, max_value=150, value=40)
-        ph = st.number_input("Soil pH", min_value=3.5, max_value=9.9, value=6.5, step=0.1)
-        humidity = st.number_input("Humidity (%)", min_value=14.3, max_value=99.98, value=60.0, step=0.1)
+        P = st.number_input("Phosphorus content (Kg/Ha)", *CROP_BOUNDS["P"], value=40)
+        ph = st.number_input("Soil pH", *CROP_BOUNDS["ph"], value=6.5, step=0.1)
+        humidity = st.number_input("Humidity (%)", *CROP_BOUNDS["humidity"], value=60.0, step=0.1)
     with col3:
-        rainfall = st.number_input("Rainfall (mm)", min_value=20.2, max_value=298.6, value=100.0, step=0.1)
+        rainfall = st.number_input("Rainfall (mm)", *CROP_BOUNDS["rainfall"], value=100.0, step=0.1)
 
     submitted = st.form_submit_button("Predict Crop")
 
@@ -226,7 +228,15 @@ st.markdown("</div>", unsafe_allow_html=True)
 if submitted and model:
     try:
         input_features = [[N, P, K, temperature, humidity, ph, rainfall]]
-        prediction_encoded = model.predict(input_features)[0]
+        # Same answer as model.predict, without sklearn's per-call overhead and
+        # from only as many trees as it takes to settle it; repeated inputs
+        # (e.g. the form defaults) are served from the cache, the rest are
+        # batched with other sessions' rows
+        fast_model = cached_predictor(registry, "crop", with_early_exit("crop", CROP_FEATURES),
+                                      batch=True)
+        reset_trees_evaluated()
+        prediction_encoded = fast_model.predict(input_features)[0]
+        n_trees = trees_evaluated()
         predicted_crop = reverse_label_mapping.get(prediction_encoded, "Unknown").capitalize()
 
         st.markdown(f"""
@@ -236,10 +246,72 @@ if submitted and model:
             <div class='crop-info'>{crop_info.get(predicted_crop, "Detailed information about this crop is not available.")}</div>
         </div>
         """, unsafe_allow_html=True)
+        if n_trees:
+            st.caption(f"🌲 Settled after {n_trees} of {fast_model.n_trees} trees")
 
     except Exception as e:
         st.error(f"Error during prediction: {e}")
 
+# ----------------- WHAT-IF SWEEP -----------------
+with st.expander("🔍 What-if: how does the recommendation change?"):
+    st.markdown("Vary one or two inputs across their full range while the others keep the values entered above.")
+    sweep_params = st.multiselect(
+        "Parameters to vary (up to 2)", CROP_FEATURES, default=["rainfall"],
+        format_func=CROP_LABELS.get, max_selections=2, key="sweep_params"
+    )
+    resolution = st.slider("Steps per parameter", 10, 200, 100, 10, key="sweep_resolution")
+
+    if st.button("Run Sweep", key="sweep_run", disabled=model is None or not sweep_params):
+        base = dict(zip(CROP_FEATURES, [N, P, K, temperature, humidity, ph, rainfall]))
+        start = time.perf_counter()
+        try:
+            fast_model = registry.derive("crop", "flat", as_flat_forest)
+            sweep = crop_sweep(fast_model, base, sweep_params, resolution)
+        except Exception as e:
+            st.error(f"Error during sweep: {e}")
+        else:
+            st.caption(f"Scored {len(sweep):,} combinations in {time.perf_counter() - start:.2f}s")
+            # Each cell spans to the next swept value
+            for p in sweep_params:
+                steps = sorted(sweep[p].unique())
+                sweep[f"{p}_end"] = sweep[p].map(dict(zip(steps, steps[1:] + steps[-1:])))
+            x = sweep_params[0]
+            color = alt.Color("crop:N", title="Recommended crop", scale=alt.Scale(scheme="category20"))
+            you = pd.DataFrame([base])
+
+            if len(sweep_params) == 1:
+                chart = alt.Chart(sweep).mark_rect().encode(
+                    x=alt.X(f"{x}:Q", title=CROP_LABELS[x]), x2=f"{x}_end", color=color,
+                    tooltip=[alt.Tooltip(f"{x}:Q", title=CROP_LABELS[x]), "crop:N"]
+                ).properties(height=80)
+                marker = alt.Chart(you).mark_rule(color="black", strokeWidth=2).encode(x=f"{x}:Q")
+                st.altair_chart(chart + marker, use_container_width=True)
+                regions = crop_regions(sweep, x).rename(columns={"crop": "Crop", "from": "From", "to": "To"})
+                st.dataframe(regions, hide_index=True, use_container_width=True)
+            else:
+                y = sweep_params[1]
+                chart = alt.Chart(sweep).mark_rect().encode(
+                    x=alt.X(f"{x}:Q", title=CROP_LABELS[x]), x2=f"{x}_end",
+                    y=alt.Y(f"{y}:Q", title=CROP_LABELS[y]), y2=f"{y}_end", color=color,
+                    tooltip=[alt.Tooltip(f"{x}:Q", title=CROP_LABELS[x]),
+                             alt.Tooltip(f"{y}:Q", title=CROP_LABELS[y]), "crop:N"]
+                ).properties(height=500)
+                marker = alt.Chart(you).mark_point(color="black", size=120, filled=True).encode(
+                    x=f"{x}:Q", y=f"{y}:Q")
+                st.altair_chart(chart + marker, use_container_width=True)
+                share = sweep["crop"].value_counts(normalize=True).mul(100).round(1)
+                st.dataframe(share.rename("Share of grid (%)").rename_axis("Crop"), use_container_width=True)
+
+# ----------------- BULK CSV SCORING -----------------
+with st.expander("📁 Bulk scoring from a CSV lab sheet"):
+    render_bulk_scoring(
+        "crop_bulk", CROP_FEATURES,
+        lambda upload, path, compress, progress: score_crop_csv(
+            model, upload, path, compress=compress, progress=progress),
+        "Crop_Recommendations",
+        disabled=model is None
+    )
+
 st.markdown("""
 <div class="enhanced-footer">
     Developed with ❤️ by AgriFusion &nbsp; 
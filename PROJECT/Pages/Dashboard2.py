@@ -1,5 +1,6 @@
 import streamlit as st
-import base64
+from static_assets import background_css
+from dashboard_view import render_dashboard
 
 # Set page configuration
 st.set_page_config(page_title="🌾 Soil Prediction Dashboard", layout="wide")
@@ -7,14 +8,10 @@ st.set_page_config(page_title="🌾 Soil Prediction Dashboard", layout="wide")
 # 🔹 Background from local image
 def add_bg_from_local(image_file):
     try:
-        with open(image_file, "rb") as f:
-            encoded_string = base64.b64encode(f.read())
         st.markdown(
             f"""
             <style>
             .stApp {{
-                background-image: linear-gradient(rgba(255, 255, 255, 0.85), rgba(255, 255, 255, 0.85)),
-                                  url(data:image/jpg;base64,{encoded_string.decode()});
                 background-size: cover;
                 background-position: center;
                 background-repeat: no-repeat;
@@ -27,10 +24,7 @@ def add_bg_from_local(image_file):
                 flex-direction: column;
                 text-align: center;
             }}
-            iframe {{
-                border-radius: 12px;
-                box-shadow: 0 0 20px rgba(0, 0, 0, 0.2);
-            }}
+            {background_css(image_file, "linear-gradient(rgba(255, 255, 255, 0.85), rgba(255, 255, 255, 0.85))")}
             </style>
             """,
             unsafe_allow_html=True
@@ -44,22 +38,7 @@ add_bg_from_local("soil1.jpg")
 st.markdown('<div class="center">', unsafe_allow_html=True)
 
 st.markdown("<h1>🌱 Fertilizer Data Analysis</h1>", unsafe_allow_html=True)
-st.markdown("<p>This dashboard provides soil analysis and prediction insights using Power BI.</p>", unsafe_allow_html=True)
-
-# Embed Power BI iframe in center
-powerbi_url = "https://app.powerbi.com/reportEmbed?reportId=606f5918-5c84-4fed-a17e-b13d8f145b9f&autoAuth=true&ctid=7402bea1-1360-40f4-8265-f62014f87ab5"
-
-st.markdown(
-    f"""
-    <iframe title="SOIL PREDICTION"
-        width="1350"
-        height="600"
-        src="{powerbi_url}"
-        frameborder="0"
-        allowFullScreen="true">
-    </iframe>
-    """,
-    unsafe_allow_html=True
-)
-
+st.markdown("<p>Explore the bundled fertilizer dataset. Filters work on precomputed aggregates, so everything updates instantly and works offline.</p>", unsafe_allow_html=True)
 st.markdown('</div>', unsafe_allow_html=True)
+
+render_dashboard("fertilizer")
@@ -1,12 +1,19 @@
 # Fertilizer Recommendation Web App - Enhanced Version with Polished UI
 import streamlit as st
-import pandas as pd
-import joblib
-import base64
-import time
-from streamlit_lottie import st_lottie
-import requests
-from fpdf import FPDF
+from model_registry import registry
+from animations import load_animation, st_lottie
+from decision_grid import with_decision_grid
+from rule_model import with_rule_model
+from prediction_cache import cached_predictor
+from feature_schema import FERT_BOUNDS, FERT_FEATURES
+from batch_scoring import FertilizerBatch, score_fertilizer_csv
+from bulk_upload import render_bulk_scoring
+from static_assets import background_css, font_import
+from reports import render_report_downloads
+from lazy_imports import lazy_module
+
+# Imported on first use, not before the page is painted (see lazy_imports.py)
+pd = lazy_module("pandas")
 
 # ----------------- CONFIG -----------------
 st.set_page_config(
@@ -16,32 +23,19 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Load animation from Lottie
-def load_lottieurl(url: str):
-    try:
-        r = requests.get(url)
-        if r.status_code != 200:
-            return None
-        return r.json()
-    except:
-        return None
-
 # Enhanced background with lighter overlay
 def add_bg_from_local(image_file):
     try:
-        with open(image_file, "rb") as f:
-            encoded_string = base64.b64encode(f.read())
         st.markdown(
             f"""
             <style>
             .stApp {{
-                background-image: linear-gradient(rgba(255, 255, 255, 0.85), rgba(255, 255, 255, 0.85)), 
-                                 url(data:image/jpg;base64,{encoded_string.decode()});
                 background-size: cover;
                 background-position: center;
                 background-repeat: no-repeat;
                 background-attachment: fixed;
             }}
+            {background_css(image_file, "linear-gradient(rgba(255, 255, 255, 0.85), rgba(255, 255, 255, 0.85))")}
             </style>
             """,
             unsafe_allow_html=True
@@ -60,22 +54,20 @@ add_bg_from_local("ferti.jpg")
 
 # ----------------- LOAD FILES -----------------
 try:
-    model = joblib.load("fertilizer_model.pkl")
-    le_soil = joblib.load("le_soil.pkl")
-    le_crop = joblib.load("le_crop.pkl")
-    le_fert = joblib.load("le_fert.pkl")
+    model, le_soil, le_crop, le_fert = registry.get_many("fertilizer", "le_soil", "le_crop", "le_fert")
 except:
     st.error("❌ Model or encoders not found. Please ensure all required files are in the directory.")
     st.stop()
 
 # ----------------- ANIMATIONS -----------------
-loading_anim = load_lottieurl("https://assets10.lottiefiles.com/packages/lf20_usmfx6bp.json")
-celebration_anim = load_lottieurl("https://assets1.lottiefiles.com/packages/lf20_sk5h1kfn.json")
+# Bundled assets from a process-wide cache; None (no animation) never blocks the page
+loading_anim = load_animation("loading")
+celebration_anim = load_animation("celebration")
 
 # ----------------- ENHANCED STYLES -----------------
+st.markdown(f"<style>{font_import('Inter')}</style>", unsafe_allow_html=True)
 st.markdown("""
 <style>
-@import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700&display=swap');
 
 html, body, [class*="css"]  {
     font-family: 'Inter', sans-serif;
@@ -230,21 +222,6 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-# ----------------- PDF REPORT -----------------
-def generate_pdf_report(data):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=16)
-    pdf.cell(200, 10, txt="Fertilizer Recommendation Report", ln=1, align='C')
-    pdf.ln(10)
-    pdf.set_font("Arial", size=12)
-    
-    for key, value in data.items():
-        pdf.cell(200, 8, txt=f"{key}: {value}", ln=1)
-        pdf.ln(2)
-    
-    return pdf.output(dest='S').encode('latin1')
-
 # ----------------- FORM -----------------
 st.markdown('<div class="form-container">', unsafe_allow_html=True)
 
@@ -259,8 +236,8 @@ with st.form("fertilizer_input"):
     with col1:
         temperature = st.number_input(
             "🌡️ Temperature (°C)", 
-            min_value=10.0, 
-            max_value=50.0, 
+            min_value=FERT_BOUNDS["Temperature"][0], 
+            max_value=FERT_BOUNDS["Temperature"][1], 
             value=30.0,
             help="Average temperature in your region"
         )
@@ -268,8 +245,8 @@ with st.form("fertilizer_input"):
     with col2:
         humidity = st.number_input(
             "💧 Humidity (%)", 
-            min_value=10.0, 
-            max_value=90.0, 
+            min_value=FERT_BOUNDS["Humidity"][0], 
+            max_value=FERT_BOUNDS["Humidity"][1], 
             value=50.0,
             help="Relative humidity percentage"
         )
@@ -277,8 +254,8 @@ with st.form("fertilizer_input"):
     with col3:
         moisture = st.number_input(
             "🏞️ Soil Moisture (%)", 
-            min_value=10.0, 
-            max_value=80.0, 
+            min_value=FERT_BOUNDS["Moisture"][0], 
+            max_value=FERT_BOUNDS["Moisture"][1], 
             value=40.0,
             help="Soil moisture content percentage"
         )
@@ -314,8 +291,8 @@ with st.form("fertilizer_input"):
     with col6:
         nitrogen = st.number_input(
             "🟢 Nitrogen (N)", 
-            min_value=0, 
-            max_value=100, 
+            min_value=FERT_BOUNDS["Nitrogen"][0], 
+            max_value=FERT_BOUNDS["Nitrogen"][1], 
             value=30,
             help="Nitrogen content in soil"
         )
@@ -323,8 +300,8 @@ with st.form("fertilizer_input"):
     with col7:
         potassium = st.number_input(
             "🟡 Potassium (K)", 
-            min_value=0, 
-            max_value=50, 
+            min_value=FERT_BOUNDS["Potassium"][0], 
+            max_value=FERT_BOUNDS["Potassium"][1], 
             value=20,
             help="Potassium content in soil"
         )
@@ -332,8 +309,8 @@ with st.form("fertilizer_input"):
     with col8:
         phosphorous = st.number_input(
             "🔴 Phosphorous (P)", 
-            min_value=0, 
-            max_value=50, 
+            min_value=FERT_BOUNDS["Phosphorous"][0], 
+            max_value=FERT_BOUNDS["Phosphorous"][1], 
             value=15,
             help="Phosphorous content in soil"
         )
@@ -351,7 +328,6 @@ if submitted:
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
                 st_lottie(loading_anim, height=120)
-        time.sleep(2)
 
         # Encode categorical variables
         encoded_soil = le_soil.transform([soil_type])[0]
@@ -368,8 +344,13 @@ if submitted:
         ])
 
         # Make prediction
-        prediction = model.predict(input_df)
+        # Distilled rules when built and accurate enough, else the precomputed
+        # decision grid, else the flat forest; batched with other sessions' rows
+        fast_model = cached_predictor(registry, "fertilizer", with_rule_model(registry), batch=True)
+        prediction = fast_model.predict(input_df)
         fertilizer = le_fert.inverse_transform(prediction)[0]
+        explain = getattr(fast_model, "explain", None)
+        rule = explain(input_df) if explain else None
 
     # Display results
     st.markdown('<div class="result-container">', unsafe_allow_html=True)
@@ -383,6 +364,8 @@ if submitted:
     
     # Success message with animation
     st.success(f"✅ **Analysis Complete!** Based on your soil and crop parameters, we recommend using **{fertilizer}** for optimal growth and yield.")
+    if rule:
+        st.caption(f"📜 Matching rule: {rule}")
     
     if celebration_anim:
         col1, col2, col3 = st.columns([1, 2, 1])
@@ -453,15 +436,23 @@ if submitted:
         "Recommended Fertilizer": fertilizer
     }
     
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        st.download_button(
-            "📄 Download Detailed Report (PDF)",
-            generate_pdf_report(report_data),
-            f"Fertilizer_Recommendation_{fertilizer.replace(' ', '_')}.pdf",
-            "application/pdf",
-            use_container_width=True
-        )
+    # Rendered only when a format is downloaded
+    render_report_downloads("fertilizer", report_data,
+                            f"Fertilizer_Recommendation_{fertilizer.replace(' ', '_')}",
+                            use_container_width=True)
+
+# ----------------- DISTRICT BATCH -----------------
+with st.expander("📁 Batch recommendations for a whole district (CSV)"):
+    st.caption(f"Soil types: {', '.join(le_soil.classes_)} | Crop types: {', '.join(le_crop.classes_)}")
+    batch = FertilizerBatch(registry.derive("fertilizer", "grid", with_decision_grid(registry)),
+                            {"Soil Type": le_soil, "Crop Type": le_crop}, le_fert)
+    render_bulk_scoring(
+        "fert_bulk", FERT_FEATURES,
+        lambda upload, path, compress, progress: score_fertilizer_csv(
+            batch, upload, path, compress=compress, progress=progress),
+        "Fertilizer_Recommendations",
+        report="fertilizer"
+    )
 
 # ----------------- FOOTER -----------------
 st.markdown("""
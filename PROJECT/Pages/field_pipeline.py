@@ -0,0 +1,160 @@
+# Whole-field analysis: soil fertility -> crop -> fertilizer from one record
+import streamlit as st
+from model_registry import registry
+from feature_schema import fertility_labels
+from pipeline import (FieldPipeline, PIPELINE_BOUNDS, PIPELINE_FEATURES, STAGES, mapped_npk,
+                      score_pipeline_csv)
+from bulk_upload import render_bulk_scoring
+from static_assets import background_css
+from lazy_imports import lazy_module
+
+# Imported on first use, not before the page is painted (see lazy_imports.py)
+pd = lazy_module("pandas")
+
+st.set_page_config(page_title="🌾 Field Analysis", layout="wide", page_icon="🌱")
+
+# Background image (same as the soil page)
+def add_bg_from_local(image_file):
+    st.markdown(
+        f"""
+        <style>
+        .stApp {{
+            background-size: cover;
+            background-position: center;
+            background-attachment: fixed;
+            background-color: rgba(255, 255, 255, 0.6);
+            background-blend-mode: lighten;
+        }}
+        .title {{
+            color: #2e7d32;
+            text-align: center;
+            background-color: rgba(255, 255, 255, 0.8);
+            padding: 10px;
+            border-radius: 10px;
+        }}
+        .subtitle {{
+            color: #1b5e20;
+            text-align: center;
+            background-color: rgba(255, 255, 255, 0.8);
+            padding: 5px;
+            border-radius: 5px;
+        }}
+        .stForm {{
+            background-color: rgba(255, 255, 255, 0.85) !important;
+            padding: 20px !important;
+            border-radius: 10px !important;
+        }}
+        .stage-card {{
+            text-align: center;
+            padding: 16px;
+            background-color: rgba(255, 255, 255, 0.85);
+            border-radius: 10px;
+            min-height: 150px;
+        }}
+        {background_css(image_file)}
+        </style>
+        """,
+        unsafe_allow_html=True
+    )
+
+add_bg_from_local('soil1.jpg')
+
+# Load models
+try:
+    pipeline = FieldPipeline.from_registry(registry)
+    soil_types = registry.get("le_soil").classes_
+except Exception as e:
+    st.error(f"❌ Error loading models: {e}")
+    pipeline = None
+    soil_types = []
+
+st.markdown("<h1 class='title'>🧭 Field Analysis</h1>", unsafe_allow_html=True)
+st.markdown("<p class='subtitle'>One set of field readings → soil fertility, best crop and the fertilizer for it</p>",
+            unsafe_allow_html=True)
+
+# ----------------- INPUT -----------------
+with st.form("field_input"):
+    st.subheader("🧪 Soil test (lab values, kg/ha unless noted)")
+    st.caption("ℹ️ The crop and fertilizer models were trained on other datasets whose N, P and K run on "
+               "different scales. Your N, P and K are rescaled linearly between the datasets' ranges "
+               "before they reach those models. This is an approximation, not a unit conversion; "
+               "the values each model used are shown with the result.")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        N = st.number_input("Nitrogen (N)", *PIPELINE_BOUNDS["N"], 270.0)
+        P = st.number_input("Phosphorus (P)", *PIPELINE_BOUNDS["P"], 10.0)
+        K = st.number_input("Potassium (K)", *PIPELINE_BOUNDS["K"], 470.0)
+    with col2:
+        pH = st.number_input("pH", *PIPELINE_BOUNDS["Ph"], 6.5)
+        EC = st.number_input("EC [dS/m]", *PIPELINE_BOUNDS["EC"], 0.5)
+        OC = st.number_input("Organic Carbon (OC) [%]", *PIPELINE_BOUNDS["OC"], 1.0)
+    with col3:
+        S = st.number_input("Sulfur (S) [ppm]", *PIPELINE_BOUNDS["S"], 10.0)
+        Zn = st.number_input("Zinc (Zn) [ppm]", *PIPELINE_BOUNDS["Zn"], 1.0)
+        Fe = st.number_input("Iron (Fe) [ppm]", *PIPELINE_BOUNDS["Fe"], 5.0)
+    with col4:
+        Cu = st.number_input("Copper (Cu) [ppm]", *PIPELINE_BOUNDS["Cu"], 1.0)
+        Mn = st.number_input("Manganese (Mn) [ppm]", *PIPELINE_BOUNDS["Mn"], 5.0)
+        B = st.number_input("Boron (B) [ppm]", *PIPELINE_BOUNDS["B"], 0.5)
+
+    st.subheader("🌦️ Field conditions")
+    col5, col6, col7, col8 = st.columns(4)
+    with col5:
+        temperature = st.number_input("Temperature (°C)", *PIPELINE_BOUNDS["temperature"], value=28.0)
+        humidity = st.number_input("Humidity (%)", *PIPELINE_BOUNDS["humidity"], value=60.0)
+    with col6:
+        rainfall = st.number_input("Rainfall (mm)", *PIPELINE_BOUNDS["rainfall"], value=100.0)
+    with col7:
+        moisture = st.number_input("Soil Moisture (%)", *PIPELINE_BOUNDS["Moisture"], value=40.0)
+    with col8:
+        soil_type = st.selectbox("Soil Type", soil_types)
+
+    submitted = st.form_submit_button("🚀 Analyze Field", disabled=pipeline is None)
+
+# ----------------- RESULT -----------------
+if submitted and pipeline:
+    record = pd.DataFrame([[N, P, K, pH, EC, OC, S, Zn, Fe, Cu, Mn, B,
+                            temperature, humidity, rainfall, moisture, soil_type]],
+                          columns=PIPELINE_FEATURES)
+    try:
+        result, timings = pipeline.run(record)
+        row = result.iloc[0]
+        color = {label: color for label, color in fertility_labels.values()}.get(row["fertility_label"], "gray")
+
+        cards = [
+            ("🔍 Soil fertility", f"<h3 style='color:{color};'>{row['fertility_label']}</h3>",
+             row["soil_error"] or row["warnings"]),
+            ("🌾 Recommended crop", f"<h3>{row['predicted_crop']}</h3>", row["crop_error"]),
+            ("🧪 Fertilizer", f"<h3>{row['Recommended Fertilizer'] or '—'}</h3>",
+             row["fertilizer_error"] or ("" if row["Crop Type"] else "No fertilizer data for this crop")),
+        ]
+        for col, (title, value, note) in zip(st.columns(3), cards):
+            with col:
+                st.markdown(f"<div class='stage-card'><b>{title}</b>{value}<small>{note}</small></div>",
+                            unsafe_allow_html=True)
+
+        npk = mapped_npk(record)
+        st.markdown("**N, P and K as each model saw them** (crop and fertilizer: rescaled, approximate)")
+        st.dataframe(pd.DataFrame(
+            [npk[stage].iloc[0].to_numpy() for stage in STAGES],
+            index=["Soil model (your lab values)", "Crop model (rescaled)", "Fertilizer model (rescaled)"],
+            columns=["N", "P", "K"]).round(1), use_container_width=True)
+
+        st.caption("Model time: " + " | ".join(f"{stage} {timings[stage] * 1000:.1f} ms" for stage in STAGES))
+    except Exception as e:
+        st.error(f"Error during analysis: {e}")
+
+# ----------------- BATCH -----------------
+with st.expander("📁 Analyze many fields at once (CSV / Excel)"):
+    summary = render_bulk_scoring(
+        "field_bulk", PIPELINE_FEATURES,
+        lambda upload, path, compress, progress: score_pipeline_csv(
+            pipeline, upload, path, compress=compress, progress=progress),
+        "Field_Analysis",
+        disabled=pipeline is None,
+        file_types=("csv", "xlsx"),
+        report="field"
+    )
+    if summary and summary.get("counts"):
+        counts = pd.Series(summary["counts"], name="Fields").rename_axis("Recommended crop")
+        st.dataframe(counts.sort_values(ascending=False).to_frame(), use_container_width=True)
@@ -1,13 +1,18 @@
 # Soil Fertility Web App
 import streamlit as st
-import pandas as pd
-import joblib
-import base64
-import time
 import datetime
-from streamlit_lottie import st_lottie
-import requests
-from fpdf import FPDF
+from model_registry import registry
+from animations import load_animation, st_lottie
+from prediction_cache import cached_predictor
+from feature_schema import SOIL_BOUNDS, SOIL_FEATURES, fertility_labels
+from batch_scoring import score_soil_file
+from bulk_upload import render_bulk_scoring
+from static_assets import background_css
+from reports import render_report_downloads
+from lazy_imports import lazy_module
+
+# Imported on first use, not before the page is painted (see lazy_imports.py)
+pd = lazy_module("pandas")
 
 # Set page config
 st.set_page_config(page_title="🌾 Soil Fertility Analyzer", layout="wide", page_icon="🌱")
@@ -15,13 +20,10 @@ st.set_page_config(page_title="🌾 Soil Fertility Analyzer", layout="wide", pag
 # Function to add background image
 # Function to add background image with fine-tuned transparency
 def add_bg_from_local(image_file):
-    with open(image_file, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read())
     st.markdown(
         f"""
         <style>
         .stApp {{
-            background-image: url(data:image/{"jpg"};base64,{encoded_string.decode()});
             background-size: cover;
             background-position: center;
             background-repeat: no-repeat;
@@ -46,6 +48,7 @@ def add_bg_from_local(image_file):
         .footer {{
             background-color: rgba(255, 255, 255, 0.8) !important;
         }}
+        {background_css(image_file)}
         </style>
         """,
         unsafe_allow_html=True
@@ -54,30 +57,13 @@ def add_bg_from_local(image_file):
 # Add background image
 add_bg_from_local('soil1.jpg')
 
-# Load animation
-def load_lottieurl(url: str):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
-
-# PDF report generator
-def generate_pdf_report(data):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt="Soil Fertility Report", ln=1, align='C')
-    for key, value in data.items():
-        pdf.cell(200, 10, txt=f"{key}: {value}", ln=1)
-    return pdf.output(dest='S').encode('latin1')
-
 # Load Lottie animations
-loading_anim = load_lottieurl("https://assets10.lottiefiles.com/packages/lf20_usmfx6bp.json")
-celebration_anim = load_lottieurl("https://assets1.lottiefiles.com/packages/lf20_sk5h1kfn.json")
+loading_anim = load_animation("loading")
+celebration_anim = load_animation("celebration")
 
 # Load model
 try:
-    model = joblib.load("soil_fertility_model.pkl")
+    model = registry.get("soil")
 except:
     st.error("❌ Model not found.")
     model = None
@@ -121,20 +107,20 @@ with st.form("soil_input"):
 
     col1, col2, col3 = st.columns(3)
     with col1:
-        N = st.number_input("Nitrogen (N) [kg/ha]", 6.0, 383.0, 100.0, help="Unit: kg/ha | Range: 6 - 383")
-        P = st.number_input("Phosphorus (P) [kg/ha]", 2.9, 125.0, 50.0, help="Unit: kg/ha | Range: 2.9 - 125")
-        K = st.number_input("Potassium (K) [kg/ha]", 11.0, 887.0, 150.0, help="Unit: kg/ha | Range: 11 - 887")
-        pH = st.number_input("pH [0-14]", 0.9, 11.15, 6.5, help="Unit: pH | Range: 0.9 - 11.15")
+        N = st.number_input("Nitrogen (N) [kg/ha]", *SOIL_BOUNDS["N"], 100.0, help="Unit: kg/ha | Range: 6 - 383")
+        P = st.number_input("Phosphorus (P) [kg/ha]", *SOIL_BOUNDS["P"], 50.0, help="Unit: kg/ha | Range: 2.9 - 125")
+        K = st.number_input("Potassium (K) [kg/ha]", *SOIL_BOUNDS["K"], 150.0, help="Unit: kg/ha | Range: 11 - 887")
+        pH = st.number_input("pH [0-14]", *SOIL_BOUNDS["Ph"], 6.5, help="Unit: pH | Range: 0.9 - 11.15")
     with col2:
-        EC = st.number_input("Electrical Conductivity (EC) [dS/m]", 0.1, 0.95, 0.5, help="Unit: dS/m | Range: 0.1 - 0.95")
-        OC = st.number_input("Organic Carbon (OC) [%]", 0.1, 24.0, 0.75, help="Unit: % | Range: 0.1 - 24")
-        S = st.number_input("Sulfur (S) [ppm]", 0.64, 31.0, 10.0, help="Unit: mg/kg | Range: 0.64 - 31")
-        Zn = st.number_input("Zinc (Zn) [ppm]", 0.07, 42.0, 0.5, help="Unit: mg/kg | Range: 0.07 - 42")
+        EC = st.number_input("Electrical Conductivity (EC) [dS/m]", *SOIL_BOUNDS["EC"], 0.5, help="Unit: dS/m | Range: 0.1 - 0.95")
+        OC = st.number_input("Organic Carbon (OC) [%]", *SOIL_BOUNDS["OC"], 0.75, help="Unit: % | Range: 0.1 - 24")
+        S = st.number_input("Sulfur (S) [ppm]", *SOIL_BOUNDS["S"], 10.0, help="Unit: mg/kg | Range: 0.64 - 31")
+        Zn = st.number_input("Zinc (Zn) [ppm]", *SOIL_BOUNDS["Zn"], 0.5, help="Unit: mg/kg | Range: 0.07 - 42")
     with col3:
-        Fe = st.number_input("Iron (Fe) [ppm]", 0.21, 44.0, 4.0, help="Unit: mg/kg | Range: 0.21 - 44")
-        Cu = st.number_input("Copper (Cu) [ppm]", 0.09, 3.02, 0.5, help="Unit: mg/kg | Range: 0.09 - 3.02")
-        Mn = st.number_input("Manganese (Mn) [ppm]", 0.11, 31.0, 5.0, help="Unit: mg/kg | Range: 0.11 - 31")
-        B = st.number_input("Boron (B) [ppm]", 0.06, 2.82, 0.5, help="Unit: mg/kg | Range: 0.06 - 2.82")
+        Fe = st.number_input("Iron (Fe) [ppm]", *SOIL_BOUNDS["Fe"], 4.0, help="Unit: mg/kg | Range: 0.21 - 44")
+        Cu = st.number_input("Copper (Cu) [ppm]", *SOIL_BOUNDS["Cu"], 0.5, help="Unit: mg/kg | Range: 0.09 - 3.02")
+        Mn = st.number_input("Manganese (Mn) [ppm]", *SOIL_BOUNDS["Mn"], 5.0, help="Unit: mg/kg | Range: 0.11 - 31")
+        B = st.number_input("Boron (B) [ppm]", *SOIL_BOUNDS["B"], 0.5, help="Unit: mg/kg | Range: 0.06 - 2.82")
 
     submitted = st.form_submit_button("🚀 Analyze Soil")
 
@@ -143,22 +129,16 @@ if submitted:
     with st.spinner("🔄 Analyzing..."):
         if loading_anim:
             st_lottie(loading_anim, height=100)
-        time.sleep(2)
 
         features = pd.DataFrame([[N, P, K, pH, EC, OC, S, Zn, Fe, Cu, Mn, B]],
                                  columns=["N", "P", "K", "Ph", "EC", "OC", "S", "Zn", "Fe", "Cu", "Mn", "B"])
 
         if model:
-            pred = model.predict(features)[0]
+            # Predicted together with other sessions' rows (micro_batch.py)
+            pred = cached_predictor(registry, "soil", batch=True).predict(features)[0]
         else:
             pred = 1  # Fallback
 
-        # Labels
-        fertility_labels = {
-            0: ("🚫 Low Fertility", "red"),
-            1: ("✅ Moderate Fertility", "orange"),
-            2: ("🌟 High Fertility", "green")
-        }
         label, color = fertility_labels.get(pred, ("❓ Unknown", "gray"))
 
     # Display Result with better visibility
@@ -194,13 +174,23 @@ if submitted:
     elif pH > 8:
         st.info("➤ Alkaline Soil: Add gypsum or sulfur")
 
-    # Download PDF
-    st.download_button(
-        "📄 Download Report",
-        generate_pdf_report(features.iloc[0].to_dict()),
-        "Soil_Fertility_Report.pdf",
-        "application/pdf"
+    # Download the report (rendered only when a format is clicked)
+    render_report_downloads("soil", features.iloc[0].to_dict(), "Soil_Fertility_Report")
+
+# Bulk mode for soil testing labs
+with st.expander("📁 Score a lab result file (CSV / Excel)"):
+    summary = render_bulk_scoring(
+        "soil_bulk", SOIL_FEATURES,
+        lambda upload, path, compress, progress: score_soil_file(
+            model, upload, path, compress=compress, progress=progress),
+        "Soil_Fertility_Results",
+        disabled=model is None,
+        file_types=("csv", "xlsx"),
+        report="soil"
     )
+    if summary and summary.get("counts"):
+        counts = pd.Series(summary["counts"], name="Samples").rename_axis("Fertility class")
+        st.dataframe(counts.to_frame(), use_container_width=True)
 
 # Footer with better visibility
 st.markdown("""
@@ -0,0 +1,107 @@
+# Lottie animations for the pages
+#
+# Animations come from the JSON files bundled in assets/lottie/ and are kept
+# in a process-wide cache, so a rerun never touches the disk or the network.
+# Pages must treat a missing animation (None) as "skip it": nothing here
+# blocks or raises.
+#
+# An animation without a bundled file can be downloaded from its CDN URL on
+# a background thread (AGRIFUSION_FETCH_ANIMATIONS=1, or prefetch()). Until
+# that finishes - or if it fails or times out - the page renders without it.
+import json
+import os
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_DIR = os.path.join(BASE_DIR, "assets", "lottie")
+
+# Animation name -> original lottiefiles.com URL (used only when no file is bundled)
+ANIMATIONS = {
+    "loading": "https://assets10.lottiefiles.com/packages/lf20_usmfx6bp.json",
+    "celebration": "https://assets1.lottiefiles.com/packages/lf20_sk5h1kfn.json",
+}
+
+FETCH_REMOTE = os.environ.get("AGRIFUSION_FETCH_ANIMATIONS") == "1"
+FETCH_TIMEOUT = 3.0
+# Wait this long before trying a failed download again
+RETRY_SECONDS = 300
+
+_cache = {}
+_fetching = set()
+_failed = {}
+_lock = threading.Lock()
+
+
+def _read_bundled(name):
+    path = os.path.join(ASSET_DIR, name + ".json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_animation(name, fetch=FETCH_REMOTE):
+    """Animation JSON for `name`, or None if it is not available (yet)."""
+    data = _cache.get(name)
+    if data is not None:
+        return data
+
+    data = _read_bundled(name)
+    if data is not None:
+        with _lock:
+            _cache[name] = data
+        return data
+
+    if fetch:
+        prefetch([name])
+    return None
+
+
+def _fetch(name, url, timeout):
+    import requests  # only for animations that are not bundled
+
+    try:
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+    except (requests.RequestException, ValueError):
+        data = None
+    with _lock:
+        _fetching.discard(name)
+        if data is None:
+            _failed[name] = time.monotonic()
+        else:
+            _cache[name] = data
+
+
+def prefetch(names=None, timeout=FETCH_TIMEOUT):
+    """Start background downloads for animations that are neither cached
+    nor bundled. Returns the started threads; nothing waits for them."""
+    threads = []
+    for name in names or ANIMATIONS:
+        if name in _cache or name not in ANIMATIONS or _read_bundled(name) is not None:
+            continue
+        with _lock:
+            recently_failed = time.monotonic() - _failed.get(name, -RETRY_SECONDS) < RETRY_SECONDS
+            if name in _fetching or recently_failed:
+                continue
+            _fetching.add(name)
+        thread = threading.Thread(target=_fetch, args=(name, ANIMATIONS[name], timeout),
+                                  name=f"lottie-{name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def st_lottie(animation, **kwargs):
+    """streamlit_lottie.st_lottie, imported the first time an animation is shown."""
+    from streamlit_lottie import st_lottie as _st_lottie
+
+    return _st_lottie(animation, **kwargs)
+
+
+def cache_info():
+    with _lock:
+        return {"cached": sorted(_cache), "fetching": sorted(_fetching), "failed": sorted(_failed)}
@@ -0,0 +1,269 @@
+# Bulk scoring of uploaded lab sheets
+#
+# Files are read and scored chunk by chunk so memory stays bounded no matter
+# how many rows the upload has: each chunk is validated with vectorized
+# masks, predicted with one model call, and appended to the output file.
+import gzip
+import time
+
+import numpy as np
+
+from feature_schema import (
+    CROP_BOUNDS, CROP_FEATURES, FERT_BOUNDS, FERT_ENCODERS, FERT_FEATURES,
+    SOIL_BOUNDS, SOIL_FEATURES, SOIL_WARNINGS, fertility_labels, reverse_label_mapping,
+)
+from lazy_imports import lazy_module
+
+pd = lazy_module("pandas")  # imported on first use, not with the page
+
+DEFAULT_CHUNKSIZE = 50_000
+
+
+class BatchInputError(ValueError):
+    """Raised when an uploaded file cannot be scored at all (e.g. missing columns)."""
+
+
+def check_columns(columns, required):
+    missing = [col for col in required if col not in columns]
+    if missing:
+        raise BatchInputError(f"Missing required column(s): {', '.join(missing)}")
+
+
+def validate_bounds(chunk, bounds):
+    """Coerce the bounded columns to numbers and describe every bad value.
+
+    Returns the numeric frame and a Series of per-row error messages, each
+    terminated by "; " ("" for rows that can be scored). Use `finish_errors`
+    once all checks have been appended.
+    """
+    values = chunk[list(bounds)].apply(pd.to_numeric, errors="coerce")
+    errors = pd.Series("", index=chunk.index, dtype=object)
+    for col, (low, high) in bounds.items():
+        column = values[col]
+        missing = column.isna()
+        out_of_range = ~missing & ((column < low) | (column > high))
+        if missing.any():
+            errors[missing] = errors[missing] + f"{col} missing or not numeric; "
+        if out_of_range.any():
+            errors[out_of_range] = errors[out_of_range] + f"{col} outside {low}-{high}; "
+    return values, errors
+
+
+def finish_errors(errors):
+    return errors.str.rstrip("; ")
+
+
+def encode_categories(values, classes):
+    """Encode a column with a LabelEncoder's `classes_` in one vectorized pass.
+
+    LabelEncoder codes are positions in the sorted `classes_` array, so a
+    Categorical built on the same categories yields identical codes.
+    Unknown values come back as -1 instead of raising; that includes numbers
+    and blanks, which are compared as their text.
+    """
+    labels = pd.Series(values, dtype=object).astype(str).str.strip()
+    return pd.Categorical(labels, categories=classes).codes.astype(np.int64)
+
+
+def open_output(path, compress=False):
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def is_excel(source):
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    return str(name).lower().endswith((".xlsx", ".xlsm"))
+
+
+def iter_excel_chunks(source, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield DataFrames of at most `chunksize` rows from the first sheet.
+
+    openpyxl's read-only mode streams rows from the file instead of
+    building the whole workbook, unlike `pd.read_excel`.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(col).strip() if col is not None else "" for col in header]
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) == chunksize:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_chunks(source, chunksize=DEFAULT_CHUNKSIZE):
+    """Chunked reader for CSV files and (by file name) Excel workbooks."""
+    if is_excel(source):
+        return iter_excel_chunks(source, chunksize)
+    return pd.read_csv(source, chunksize=chunksize)
+
+
+def score_csv(source, output_path, required, score_chunk, chunksize=DEFAULT_CHUNKSIZE,
+              compress=False, progress=None, count_by=None):
+    """Stream a CSV (or Excel) file through `score_chunk` and write the scored
+    CSV to `output_path`.
+
+    `source` is a path or file object, `score_chunk(chunk)` returns
+    `(scored_chunk, n_valid_rows)` and `progress(rows_done)` is called after
+    every chunk. If `count_by` names an output column, the summary also
+    holds the number of rows per value of that column.
+    Returns a small summary dict.
+    """
+    start = time.perf_counter()
+    rows = scored_rows = 0
+    counts = {}
+
+    with open_output(output_path, compress) as out:
+        for i, chunk in enumerate(iter_chunks(source, chunksize)):
+            if i == 0:
+                check_columns(chunk.columns, required)
+            scored, n_valid = score_chunk(chunk)
+            scored.to_csv(out, header=(i == 0), index=False)
+            rows += len(chunk)
+            scored_rows += n_valid
+            if count_by:
+                for value, n in scored.loc[scored["error"] == "", count_by].value_counts().items():
+                    counts[value] = counts.get(value, 0) + int(n)
+            if progress:
+                progress(rows)
+
+    summary = {
+        "rows": rows,
+        "scored": scored_rows,
+        "rejected": rows - scored_rows,
+        "seconds": time.perf_counter() - start,
+    }
+    if count_by:
+        summary["counts"] = counts
+    return summary
+
+
+# ----------------- CROP RECOMMENDATION -----------------
+def score_crop_chunk(model, chunk):
+    """Append `predicted_crop` and `error` columns to one chunk of field rows."""
+    values, errors = validate_bounds(chunk, CROP_BOUNDS)
+    errors = finish_errors(errors)
+    valid = (errors == "").to_numpy()
+
+    predicted = np.full(len(chunk), "", dtype=object)
+    if valid.any():
+        codes = model.predict(values.loc[valid, CROP_FEATURES])
+        predicted[valid] = [reverse_label_mapping.get(code, "Unknown") for code in codes]
+
+    scored = chunk.copy()
+    scored["predicted_crop"] = predicted
+    scored["error"] = errors.to_numpy()
+    return scored, int(valid.sum())
+
+
+def score_crop_csv(model, source, output_path, **kwargs):
+    """Score a CSV of field rows with the crop model (see `score_csv`)."""
+    return score_csv(source, output_path, CROP_FEATURES,
+                     lambda chunk: score_crop_chunk(model, chunk), **kwargs)
+
+
+# ----------------- FERTILIZER RECOMMENDATION -----------------
+class FertilizerBatch:
+    """Vectorized fertilizer recommendations for whole tables of plots.
+
+    The encoder class tables are captured once, so each batch costs one
+    categorical encoding pass per column, one `model.predict` and one
+    `le_fert.inverse_transform`.
+    """
+
+    def __init__(self, model, encoders, le_fert):
+        self.model = model
+        self.classes = {col: np.asarray(encoders[col].classes_) for col in FERT_ENCODERS}
+        self.le_fert = le_fert
+
+    @classmethod
+    def from_registry(cls, registry, model=None):
+        """Batch scorer using the registry's encoders and, unless another
+        predictor is given, its fertilizer model."""
+        encoders = {col: registry.get(name) for col, name in FERT_ENCODERS.items()}
+        return cls(model or registry.get("fertilizer"), encoders, registry.get("le_fert"))
+
+    def encode(self, table):
+        """Numeric feature frame in model column order plus per-row error messages."""
+        values, errors = validate_bounds(table, FERT_BOUNDS)
+        for col, classes in self.classes.items():
+            codes = encode_categories(table[col].to_numpy(), classes)
+            unknown = codes < 0
+            if unknown.any():
+                bad = table.loc[unknown, col].astype(str)
+                errors[unknown] = errors[unknown] + f"unknown {col} '" + bad + "'; "
+            values[col] = codes
+        return values[FERT_FEATURES], finish_errors(errors)
+
+    def recommend(self, table):
+        """Return `table` with `Recommended Fertilizer` and `error` columns."""
+        features, errors = self.encode(table)
+        valid = (errors == "").to_numpy()
+
+        fertilizer = np.full(len(table), "", dtype=object)
+        if valid.any():
+            codes = self.model.predict(features[valid])
+            fertilizer[valid] = self.le_fert.inverse_transform(codes)
+
+        scored = table.copy()
+        scored["Recommended Fertilizer"] = fertilizer
+        scored["error"] = errors.to_numpy()
+        return scored, int(valid.sum())
+
+
+def score_fertilizer_csv(batch, source, output_path, **kwargs):
+    """Score a CSV of plots with a `FertilizerBatch` (see `score_csv`)."""
+    return score_csv(source, output_path, FERT_FEATURES, batch.recommend, **kwargs)
+
+
+# ----------------- SOIL FERTILITY -----------------
+def soil_warnings(values):
+    """Per-row nutrient warnings (same rules as the soil page), joined by "; "."""
+    warnings = pd.Series("", index=values.index, dtype=object)
+    for col, op, threshold, message in SOIL_WARNINGS:
+        hit = values[col] < threshold if op == "<" else values[col] > threshold
+        if hit.any():
+            warnings[hit] = warnings[hit] + message + "; "
+    return finish_errors(warnings)
+
+
+def score_soil_chunk(model, chunk):
+    """Append `fertility`, `fertility_label`, `warnings` and `error` columns."""
+    values, errors = validate_bounds(chunk, SOIL_BOUNDS)
+    errors = finish_errors(errors)
+    valid = (errors == "").to_numpy()
+
+    classes = np.full(len(chunk), -1, dtype=np.int64)
+    if valid.any():
+        # XGBoost scores the whole chunk in one batched booster call
+        classes[valid] = model.predict(values.loc[valid, SOIL_FEATURES])
+    label_names = {code: label for code, (label, _) in fertility_labels.items()}
+    labels = pd.Series(classes).map(label_names).fillna("❓ Unknown").to_numpy(dtype=object)
+    labels[~valid] = ""
+
+    scored = chunk.copy()
+    scored["fertility"] = np.where(valid, classes.astype(object), "")
+    scored["fertility_label"] = labels
+    scored["warnings"] = np.where(valid, soil_warnings(values).to_numpy(), "")
+    scored["error"] = errors.to_numpy()
+    return scored, int(valid.sum())
+
+
+def score_soil_file(model, source, output_path, **kwargs):
+    """Score a CSV or Excel export of lab samples with the soil model
+    (see `score_csv`). The summary counts samples per fertility label."""
+    return score_csv(source, output_path, SOIL_FEATURES,
+                     lambda chunk: score_soil_chunk(model, chunk),
+                     count_by="fertility_label", **kwargs)
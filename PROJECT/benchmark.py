@@ -0,0 +1,319 @@
+# Inference benchmarks for the shipped models and the notebook alternatives
+#
+#   python benchmark.py run [crop fertilizer soil] [--models shipped agm rf xgb svm]
+#                           [--sizes 1 100 10000 1000000] [--output results.json]
+#   python benchmark.py compare old.json new.json
+#
+# Subjects per task:
+#   shipped   the pickle the pages load (crop RF, fertilizer RF, soil XGBoost)
+#   agm       its .agm export (model_artifacts.py), when one is current
+#   rf/xgb/svm  the notebook candidates from train.py, fit on the whole dataset
+#
+# Every subject is measured in a fresh interpreter, so the load time is a
+# real cold load (including the model libraries the file pulls in) and the
+# peak RSS belongs to that model alone. Per subject the child reports the
+# load time, single-row predict latency (p50/p99), throughput at each batch
+# size, RSS right after loading and peak RSS (which includes the dataset
+# and the largest batch). Batches are rows of the task's dataset drawn with
+# replacement, passed as DataFrames like the pages do.
+#
+# Results go to one JSON file with the git commit, machine and library
+# versions, so runs from different commits can be put side by side with
+# `compare`. Only the standard library is imported at module level: the
+# child's first heavy import is the one being timed.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(BASE_DIR, "artifacts", "benchmarks")
+
+TASKS = ["crop", "fertilizer", "soil"]
+MODELS = ["shipped", "agm", "rf", "xgb", "svm"]
+SIZES = [1, 100, 10_000, 1_000_000]
+
+LATENCY_RUNS = 500
+WARMUP_RUNS = 20
+# Each batch size is repeated until this much time was spent (at least once)
+MIN_BATCH_SECONDS = 0.5
+SEED = 42
+
+# Scalar metrics `compare` reports (besides throughput at every size)
+COMPARED = ["load_seconds", "latency_p50_ms", "latency_p99_ms", "peak_rss_mb"]
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unknown)."""
+    # VmHWM starts over at exec; ru_maxrss would carry over the parent's peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2**20
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _library_versions():
+    versions = {"python": platform.python_version()}
+    for module in ["numpy", "pandas", "sklearn", "xgboost", "numba"]:
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    return versions
+
+
+# ----------------- CHILD: ONE SUBJECT -----------------
+def load_subject(model, path):
+    """The model object for a subject file, loaded the way its format is."""
+    if model == "agm":
+        from model_artifacts import load_artifact
+        return load_artifact(path).model
+    import joblib
+    return joblib.load(path)
+
+
+def measure(task, model, path, sizes, latency_runs=LATENCY_RUNS, seed=SEED):
+    """All metrics of one subject. Meant to run in a fresh process."""
+    start = time.perf_counter()
+    estimator = load_subject(model, path)
+    load_seconds = time.perf_counter() - start
+    rss_after_load = _peak_rss_mb()
+
+    import numpy as np
+    from train import load_task
+
+    X, _, _ = load_task(task)
+    rng = np.random.default_rng(seed)
+
+    row = X.iloc[[0]]
+    for _ in range(WARMUP_RUNS):
+        estimator.predict(row)
+    times = np.empty(latency_runs)
+    for i in range(latency_runs):
+        row = X.iloc[[i % len(X)]]
+        start = time.perf_counter()
+        estimator.predict(row)
+        times[i] = time.perf_counter() - start
+
+    throughput = {}
+    for size in sizes:
+        batch = X.iloc[rng.integers(0, len(X), size)].reset_index(drop=True)
+        runs, spent, best = 0, 0.0, float("inf")
+        while runs == 0 or spent < MIN_BATCH_SECONDS:
+            start = time.perf_counter()
+            estimator.predict(batch)
+            elapsed = time.perf_counter() - start
+            best = min(best, elapsed)
+            spent += elapsed
+            runs += 1
+        throughput[str(size)] = {"rows_per_second": size / best, "best_seconds": best, "runs": runs}
+        del batch
+
+    return {
+        "task": task,
+        "model": model,
+        "estimator": type(estimator).__name__,
+        "file_bytes": os.path.getsize(path),
+        "load_seconds": load_seconds,
+        "latency_p50_ms": float(np.percentile(times, 50)) * 1000,
+        "latency_p99_ms": float(np.percentile(times, 99)) * 1000,
+        "latency_runs": latency_runs,
+        "throughput": throughput,
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+# ----------------- PARENT -----------------
+def subject_files(tasks, models, workdir, seed=SEED):
+    """[(task, model, path)] for every subject that exists. The notebook
+    candidates are fit here once and pickled into `workdir`."""
+    subjects = []
+    for task in tasks:
+        for model in models:
+            if model == "shipped":
+                from model_registry import ARTIFACTS
+                path = os.path.join(BASE_DIR, ARTIFACTS[task])
+            elif model == "agm":
+                from model_artifacts import ArtifactError, artifact_path, file_sha256, read_header
+                from model_registry import ARTIFACTS
+                path = artifact_path(task)
+                if not os.path.exists(path):
+                    print(f"⚠️ {task}: no .agm export, skipped (python model_artifacts.py export)")
+                    continue
+                with open(path, "rb") as f:
+                    try:
+                        header, _ = read_header(f.read())
+                    except ArtifactError as e:
+                        print(f"⚠️ {task}: {e}, skipped")
+                        continue
+                if header["sources"].get(task, {}).get("sha256") != file_sha256(os.path.join(BASE_DIR, ARTIFACTS[task])):
+                    print(f"⚠️ {task}: .agm export is stale, skipped")
+                    continue
+            else:
+                import joblib
+                from train import load_task, make_candidate
+                X, y, _ = load_task(task)
+                path = os.path.join(workdir, f"{task}_{model}.pkl")
+                joblib.dump(make_candidate(model, seed).fit(X, y), path)
+            subjects.append((task, model, path))
+    return subjects
+
+
+def run(tasks=TASKS, models=MODELS, sizes=SIZES, latency_runs=LATENCY_RUNS, seed=SEED):
+    """Benchmark every subject in its own process; returns the results document."""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for task, model, path in subject_files(tasks, models, workdir, seed):
+            print(f"⏱️ {task}/{model} ...", flush=True)
+            cmd = [sys.executable, os.path.abspath(__file__), "_measure", task, model, path,
+                   "--latency-runs", str(latency_runs), "--seed", str(seed),
+                   "--sizes", *map(str, sizes)]
+            child = subprocess.run(cmd, cwd=BASE_DIR, capture_output=True, text=True)
+            if child.returncode != 0:
+                print(child.stderr, file=sys.stderr)
+                results.append({"task": task, "model": model, "error": child.stderr.strip().splitlines()[-1:]})
+                continue
+            results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "libraries": _library_versions(),
+            "sizes": sizes,
+            "latency_runs": latency_runs,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def _print_results(document):
+    sizes = [str(s) for s in document["meta"]["sizes"]]
+    print(f"\n{'subject':<20} {'load s':>8} {'p50 ms':>8} {'p99 ms':>8} {'load MB':>8} {'peak MB':>8} "
+          + " ".join(f"{'rows/s @' + s:>14}" for s in sizes))
+    for r in document["results"]:
+        name = f"{r['task']}/{r['model']}"
+        if "error" in r:
+            print(f"{name:<20} failed: {' '.join(r['error'])}")
+            continue
+        rates = " ".join(f"{r['throughput'][s]['rows_per_second']:14,.0f}" for s in sizes)
+        print(f"{name:<20} {r['load_seconds']:8.3f} {r['latency_p50_ms']:8.3f} {r['latency_p99_ms']:8.3f} "
+              f"{r['rss_after_load_mb'] or float('nan'):8.1f} {r['peak_rss_mb'] or float('nan'):8.1f} {rates}")
+
+
+def compare(old, new):
+    """Rows of (subject, metric, old, new, new/old) for the subjects in both runs."""
+    def metrics(document):
+        out = {}
+        for r in document["results"]:
+            if "error" in r:
+                continue
+            values = {key: r[key] for key in COMPARED}
+            for size, t in r["throughput"].items():
+                values[f"rows_per_second@{size}"] = t["rows_per_second"]
+            out[f"{r['task']}/{r['model']}"] = values
+        return out
+
+    before, after = metrics(old), metrics(new)
+    rows = []
+    for subject in before.keys() & after.keys():
+        for metric in before[subject].keys() & after[subject].keys():
+            a, b = before[subject][metric], after[subject][metric]
+            rows.append((subject, metric, a, b, b / a if a else float("nan")))
+    return sorted(rows)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(description="Benchmark model load time, latency, throughput and memory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="benchmark the models")
+    run_cmd.add_argument("tasks", nargs="*", metavar="task", help=f"any of {', '.join(TASKS)} (default: all)")
+    run_cmd.add_argument("--models", nargs="+", choices=MODELS, default=MODELS)
+    run_cmd.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    run_cmd.add_argument("--latency-runs", type=int, default=LATENCY_RUNS)
+    run_cmd.add_argument("--seed", type=int, default=SEED)
+    run_cmd.add_argument("--output", help="results file (default: artifacts/benchmarks/<commit>-<time>.json)")
+
+    compare_cmd = commands.add_parser("compare", help="compare two results files")
+    compare_cmd.add_argument("old")
+    compare_cmd.add_argument("new")
+
+    # Internal: one subject in a fresh process, JSON on stdout
+    measure_cmd = commands.add_parser("_measure")
+    measure_cmd.add_argument("task", choices=TASKS)
+    measure_cmd.add_argument("model", choices=MODELS)
+    measure_cmd.add_argument("path")
+    measure_cmd.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    measure_cmd.add_argument("--latency-runs", type=int, default=LATENCY_RUNS)
+    measure_cmd.add_argument("--seed", type=int, default=SEED)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "_measure":
+        print(json.dumps(measure(args.task, args.model, args.path, args.sizes, args.latency_runs, args.seed)))
+        return 0
+
+    if args.command == "compare":
+        with open(args.old, encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        print(f"{old['meta']['commit']} -> {new['meta']['commit']}")
+        print(f"{'subject':<20} {'metric':<24} {'old':>14} {'new':>14} {'new/old':>8}")
+        for subject, metric, a, b, ratio in compare(old, new):
+            print(f"{subject:<20} {metric:<24} {a:14.4f} {b:14.4f} {ratio:8.2f}")
+        return 0
+
+    unknown = set(args.tasks) - set(TASKS)
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(sorted(unknown))}")
+    document = run(args.tasks or TASKS, args.models, args.sizes, args.latency_runs, args.seed)
+    _print_results(document)
+
+    output = args.output
+    if not output:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(BENCH_DIR, f"{document['meta']['commit'] or 'nogit'}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
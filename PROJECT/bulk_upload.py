@@ -0,0 +1,168 @@
+# Streamlit upload -> score -> download flow shared by the bulk modes
+# of the prediction pages
+#
+# Scored files and report zips are written to one temp directory per
+# session, which is deleted when the session's state is dropped (the
+# session ended or expired) or the server exits. Directories a killed
+# server left behind are swept when this module is first imported.
+import os
+import shutil
+import tempfile
+import time
+import weakref
+
+import streamlit as st
+
+from reports import PART_SIZE, write_report_zip
+
+OUTPUT_ROOT = os.path.join(tempfile.gettempdir(), "agrifusion-bulk")
+# Leftover session directories older than this are removed
+MAX_AGE_HOURS = 24
+
+
+class _SessionDir:
+    """Temp directory deleted together with the session state holding it."""
+
+    def __init__(self, root=OUTPUT_ROOT):
+        os.makedirs(root, exist_ok=True)
+        self.path = tempfile.mkdtemp(dir=root)
+        weakref.finalize(self, shutil.rmtree, self.path, True)
+
+
+def session_dir():
+    """This session's output directory."""
+    owner = st.session_state.get("_bulk_output_dir")
+    if owner is None or not os.path.isdir(owner.path):
+        owner = st.session_state["_bulk_output_dir"] = _SessionDir()
+    return owner.path
+
+
+def remove_stale_outputs(root=OUTPUT_ROOT, max_age_hours=MAX_AGE_HOURS):
+    """Delete the session directories under `root` untouched for `max_age_hours`."""
+    cutoff = time.time() - max_age_hours * 3600
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+remove_stale_outputs()
+
+
+def render_bulk_scoring(key, columns, score_file, file_stem, disabled=False, file_types=("csv",),
+                        report=None):
+    """Render an uploader, a score button and a download for the scored file.
+
+    `score_file(upload, output_path, compress, progress)` writes the scored
+    CSV and returns the summary dict from `batch_scoring.score_csv`.
+    The result path is kept in session state so the download survives reruns.
+    With a `report` kind (see `reports.REPORT_KINDS`) the scored rows can
+    also be turned into a zip of PDF reports.
+    Returns the summary of the last scored file, or None.
+    """
+    st.markdown(f"Upload a {' or '.join(t.upper() for t in file_types)} file with the columns `{', '.join(columns)}`. "
+                "Rows outside the form ranges are kept and flagged in an `error` column.")
+    uploaded = st.file_uploader("Lab sheet", type=list(file_types), key=f"{key}_upload")
+    compress = st.checkbox("Compress the scored file (gzip)", value=True, key=f"{key}_compress")
+
+    if st.button("Score File", key=f"{key}_score", disabled=disabled or uploaded is None):
+        # Drop the previous result file before writing a new one
+        for state in (f"{key}_output", f"{key}_reports"):
+            old_path = st.session_state.pop(state, None)
+            if old_path and os.path.exists(old_path):
+                os.remove(old_path)
+
+        suffix = ".csv.gz" if compress else ".csv"
+        with tempfile.NamedTemporaryFile(suffix=suffix, dir=session_dir(), delete=False) as tmp:
+            output_path = tmp.name
+
+        from batch_scoring import BatchInputError
+
+        progress_text = st.empty()
+        try:
+            summary = score_file(
+                uploaded, output_path, compress,
+                lambda rows: progress_text.text(f"Scored {rows:,} rows...")
+            )
+            st.session_state[f"{key}_output"] = output_path
+            st.session_state[f"{key}_summary"] = summary
+        except BatchInputError as e:
+            os.remove(output_path)
+            st.error(f"❌ {e}")
+        except Exception as e:
+            os.remove(output_path)
+            st.error(f"Error during bulk scoring: {e}")
+        progress_text.empty()
+
+    output_path = st.session_state.get(f"{key}_output")
+    if not output_path or not os.path.exists(output_path):
+        return None
+
+    summary = st.session_state[f"{key}_summary"]
+    st.success(f"✅ Scored {summary['scored']:,} of {summary['rows']:,} rows "
+               f"in {summary['seconds']:.1f}s ({summary['rejected']:,} flagged).")
+    gzipped = output_path.endswith(".gz")
+    with open(output_path, "rb") as f:
+        st.download_button(
+            "📥 Download Scored File",
+            f,
+            file_stem + (".csv.gz" if gzipped else ".csv"),
+            "application/gzip" if gzipped else "text/csv",
+            key=f"{key}_download"
+        )
+    if report:
+        render_bulk_reports(key, output_path, report, summary["rows"], file_stem)
+    return summary
+
+
+def render_bulk_reports(key, scored_path, kind, rows, file_stem):
+    """Render PDF reports for every row of a scored file on a process pool,
+    with a progress bar, a cancel button and a download for the zip."""
+    st.markdown("**📄 PDF reports for every row**")
+    layout = st.radio("Layout", ["One PDF per row", f"Multi-page PDFs ({PART_SIZE:,} rows each)"],
+                      horizontal=True, key=f"{key}_report_layout")
+
+    if st.button("Generate Reports", key=f"{key}_report_start"):
+        old_path = st.session_state.pop(f"{key}_reports", None)
+        if old_path and os.path.exists(old_path):
+            os.remove(old_path)
+        with tempfile.NamedTemporaryFile(suffix=".zip", dir=session_dir(), delete=False) as tmp:
+            zip_path = tmp.name
+
+        bar = st.progress(0.0, text="Starting report workers...")
+        # Any click reruns the page, which stops this run and the pool with it
+        st.button("✖ Cancel", key=f"{key}_report_cancel")
+        finished = False
+        try:
+            report_summary = write_report_zip(
+                scored_path, zip_path, kind, per_field=layout.startswith("One"),
+                progress=lambda done: bar.progress(min(done / max(rows, 1), 1.0),
+                                                   text=f"Rendered {done:,} of {rows:,} reports...")
+            )
+            st.session_state[f"{key}_reports"] = zip_path
+            st.session_state[f"{key}_reports_summary"] = report_summary
+            finished = True
+        except Exception as e:
+            st.error(f"Error while generating reports: {e}")
+        finally:
+            if not finished and os.path.exists(zip_path):
+                os.remove(zip_path)
+        bar.empty()
+    elif st.session_state.get(f"{key}_report_cancel"):
+        st.info("Report generation cancelled.")
+
+    zip_path = st.session_state.get(f"{key}_reports")
+    if not zip_path or not os.path.exists(zip_path):
+        return
+    report_summary = st.session_state[f"{key}_reports_summary"]
+    st.success(f"✅ {report_summary['files']:,} PDF file(s) for {report_summary['fields']:,} rows "
+               f"in {report_summary['seconds']:.1f}s ({report_summary['bytes'] / 1e6:.1f} MB zipped).")
+    with open(zip_path, "rb") as f:
+        st.download_button("📦 Download Reports (zip)", f, file_stem + "_Reports.zip", "application/zip",
+                           key=f"{key}_report_download")
@@ -0,0 +1,132 @@
+# Precomputed aggregates behind the analytics dashboards
+#
+# Every dataset is grouped once by its label (and, for the fertilizer data,
+# soil and crop type). Per group we keep the row count, the feature sums,
+# the matrix of feature cross-products and histogram counts over fixed
+# bins. Those add up across groups, so any filter on the group columns is
+# answered - class shares, means per class, correlations, histograms -
+# from a few hundred rows of aggregates without touching the data again.
+# The data comes from data_store.load_dataset, so pyarrow is optional here.
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_dataset, source_path, source_stamp
+
+HIST_BINS = 30
+
+# Dataset -> (label column, extra filter columns, numeric features)
+DASHBOARDS = {
+    "soil": ("fertility", [], ["N", "P", "K", "Ph", "EC", "OC", "S", "Zn", "Fe", "Cu", "Mn", "B"]),
+    "fertilizer": ("Fertilizer Name", ["Soil Type", "Crop Type"],
+                   ["Temperature", "Humidity", "Moisture", "Nitrogen", "Phosphorous", "Potassium"]),
+    "crop": ("label", [], ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]),
+}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class DatasetAggregates:
+    """Sufficient statistics of one dataset per group of its filter columns."""
+
+    def __init__(self, label, filters, features, groups, counts, sums, cross, edges, hist):
+        self.label = label
+        self.filters = filters
+        self.features = features
+        self.groups = groups        # one row per group: label and filter values
+        self.counts = counts        # (groups,)
+        self.sums = sums            # (groups, features)
+        self.cross = cross          # (groups, features, features)
+        self.edges = edges          # feature -> bin edges
+        self.hist = hist            # (groups, features, bins)
+
+    @classmethod
+    def from_frame(cls, frame, label, filters, features, bins=HIST_BINS):
+        keys = [label] + filters
+        grouped = frame.groupby(keys, observed=True, sort=True)
+        codes = grouped.ngroup().to_numpy()
+        groups = grouped.size().reset_index()[keys]
+        n_groups = len(groups)
+
+        X = frame[features].to_numpy(dtype=np.float64)
+        counts = np.bincount(codes, minlength=n_groups)
+        sums = np.stack([np.bincount(codes, X[:, j], n_groups) for j in range(len(features))], axis=1)
+        # One matrix product per group over its (contiguous, after sorting) rows
+        order = np.argsort(codes, kind="stable")
+        bounds = np.r_[0, np.cumsum(counts)]
+        X_sorted = X[order]
+        cross = np.stack([X_sorted[a:b].T @ X_sorted[a:b] for a, b in zip(bounds[:-1], bounds[1:])])
+
+        edges, hist = {}, np.zeros((n_groups, len(features), bins), dtype=np.int64)
+        for j, feature in enumerate(features):
+            edges[feature] = np.histogram_bin_edges(X[:, j], bins=bins)
+            # Right edge goes into the last bin, as in np.histogram
+            idx = np.clip(np.searchsorted(edges[feature], X[:, j], side="right") - 1, 0, bins - 1)
+            hist[:, j, :] = np.bincount(codes * bins + idx, minlength=n_groups * bins).reshape(n_groups, bins)
+        return cls(label, filters, features, groups, counts, sums, cross, edges, hist)
+
+    def options(self, column):
+        return sorted(self.groups[column].unique())
+
+    def select(self, **selected):
+        """Group mask for column -> allowed values (None or empty: all)."""
+        mask = np.ones(len(self.groups), dtype=bool)
+        for column, values in selected.items():
+            if values:
+                mask &= self.groups[column].isin(values).to_numpy()
+        return mask
+
+    def class_counts(self, mask):
+        counts = pd.Series(self.counts[mask], index=self.groups.loc[mask, self.label].to_numpy())
+        return counts.groupby(level=0).sum().rename("rows").rename_axis(self.label)
+
+    def class_means(self, mask, features=None):
+        """Mean of `features` per label value over the selected groups."""
+        labels = self.groups.loc[mask, self.label].to_numpy()
+        sums = pd.DataFrame(self.sums[mask], columns=self.features).groupby(labels).sum()
+        counts = pd.Series(self.counts[mask]).groupby(labels).sum()
+        means = sums.div(counts, axis=0).rename_axis(self.label)
+        return means[features or self.features]
+
+    def correlation(self, mask):
+        n = self.counts[mask].sum()
+        if n < 2:
+            return pd.DataFrame(np.nan, index=self.features, columns=self.features)
+        s = self.sums[mask].sum(axis=0)
+        cov = (self.cross[mask].sum(axis=0) - np.outer(s, s) / n) / (n - 1)
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.outer(std, std)
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.features, columns=self.features)
+
+    def histogram(self, mask, feature, by_class=True):
+        """Long table of bin start/end and row counts (per label value)."""
+        j = self.features.index(feature)
+        edges = self.edges[feature]
+        counts = self.hist[mask, j, :]
+        labels = self.groups.loc[mask, self.label].to_numpy() if by_class else np.full(mask.sum(), "all")
+        per_class = pd.DataFrame(counts).groupby(labels).sum()
+        table = per_class.rename_axis(self.label).reset_index().melt(
+            id_vars=self.label, var_name="bin", value_name="rows")
+        bins = table["bin"].to_numpy(dtype=np.int64)
+        table["from"] = edges[bins]
+        table["to"] = edges[bins + 1]
+        return table[table["rows"] > 0].drop(columns="bin")
+
+
+def dashboard_aggregates(name):
+    """Aggregates of a dataset, computed once per process (and again only
+    when the dataset's source file changes)."""
+    stamp = source_stamp(source_path(name))
+    cached = _cache.get(name)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with _lock:
+        cached = _cache.get(name)
+        if cached is None or cached[0] != stamp:
+            label, filters, features = DASHBOARDS[name]
+            frame = load_dataset(name, [label] + filters + features)
+            cached = _cache[name] = (stamp, DatasetAggregates.from_frame(frame, label, filters, features))
+    return cached[1]
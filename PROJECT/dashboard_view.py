@@ -0,0 +1,111 @@
+# Streamlit layout shared by the three analytics dashboards
+#
+# Filters only pick groups of the precomputed aggregates (dashboard_data.py);
+# every chart is drawn from those sums, never from the rows themselves.
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from dashboard_data import DASHBOARDS, dashboard_aggregates
+
+# Features shown in the "average per class" chart by default
+MEAN_FEATURES = {
+    "soil": ["N", "P", "K"],
+    "fertilizer": ["Nitrogen", "Phosphorous", "Potassium"],
+    "crop": ["N", "P", "K"],
+}
+
+
+def _class_chart(counts, label):
+    table = counts.reset_index()
+    return alt.Chart(table).mark_bar().encode(
+        x=alt.X("rows:Q", title="Rows"),
+        y=alt.Y(f"{label}:N", sort="-x", title=None),
+        color=alt.Color(f"{label}:N", legend=None),
+        tooltip=[f"{label}:N", "rows:Q"],
+    )
+
+
+def _means_chart(means, label):
+    table = means.reset_index().melt(id_vars=label, var_name="feature", value_name="mean")
+    return alt.Chart(table).mark_bar().encode(
+        x=alt.X(f"{label}:N", title=None, axis=alt.Axis(labelAngle=-45)),
+        xOffset="feature:N",
+        y=alt.Y("mean:Q", title="Average value"),
+        color=alt.Color("feature:N", title="Feature"),
+        tooltip=[f"{label}:N", "feature:N", alt.Tooltip("mean:Q", format=".2f")],
+    )
+
+
+def _correlation_chart(corr):
+    table = corr.rename_axis("row").reset_index().melt(id_vars="row", var_name="column", value_name="r")
+    order = list(corr.index)
+    base = alt.Chart(table).encode(
+        x=alt.X("column:N", sort=order, title=None),
+        y=alt.Y("row:N", sort=order, title=None),
+    )
+    cells = base.mark_rect().encode(
+        color=alt.Color("r:Q", scale=alt.Scale(scheme="yellowgreenblue", domain=[-1, 1]), title="r"),
+        tooltip=["row:N", "column:N", alt.Tooltip("r:Q", format=".2f")],
+    )
+    text = base.mark_text(fontSize=10).encode(text=alt.Text("r:Q", format=".2f"))
+    return cells + text
+
+
+def _histogram_chart(hist, label, feature):
+    return alt.Chart(hist).mark_bar().encode(
+        x=alt.X("from:Q", bin="binned", title=feature),
+        x2="to:Q",
+        y=alt.Y("rows:Q", stack=True, title="Rows"),
+        color=alt.Color(f"{label}:N", title=None),
+        tooltip=[f"{label}:N", alt.Tooltip("from:Q", format=".2f"), alt.Tooltip("to:Q", format=".2f"), "rows:Q"],
+    )
+
+
+def render_dashboard(name):
+    """Filters, headline numbers and the four charts for one dataset."""
+    try:
+        agg = dashboard_aggregates(name)
+    except Exception as e:
+        st.error(f"❌ Could not load the {name} dataset: {e}")
+        return
+    label, filters, features = DASHBOARDS[name]
+
+    filter_columns = st.columns(1 + len(filters))
+    selected = {}
+    for col, column in zip(filter_columns, [label] + filters):
+        with col:
+            selected[column] = st.multiselect(column, agg.options(column), key=f"{name}_filter_{column}",
+                                              placeholder="All")
+    mask = agg.select(**selected)
+    if not mask.any():
+        st.info("No rows match these filters.")
+        return
+
+    counts = agg.class_counts(mask)
+    metric_columns = st.columns(3)
+    metric_columns[0].metric("Rows", f"{int(counts.sum()):,}")
+    metric_columns[1].metric(f"{label} values", f"{len(counts):,}")
+    metric_columns[2].metric("Most common", str(counts.idxmax()))
+
+    left, right = st.columns(2)
+    with left:
+        st.subheader("📊 Rows per class")
+        st.altair_chart(_class_chart(counts, label), use_container_width=True)
+    with right:
+        st.subheader("🧪 Average per class")
+        shown = st.multiselect("Features", features, default=MEAN_FEATURES[name], key=f"{name}_mean_features")
+        if shown:
+            st.altair_chart(_means_chart(agg.class_means(mask, shown), label), use_container_width=True)
+
+    left, right = st.columns(2)
+    with left:
+        st.subheader("🔗 Correlation matrix")
+        st.altair_chart(_correlation_chart(agg.correlation(mask)), use_container_width=True)
+    with right:
+        st.subheader("📈 Distribution")
+        feature = st.selectbox("Feature", features, key=f"{name}_hist_feature")
+        st.altair_chart(_histogram_chart(agg.histogram(mask, feature), label, feature), use_container_width=True)
+
+    with st.expander("📋 Averages table"):
+        st.dataframe(pd.concat([counts, agg.class_means(mask)], axis=1).round(2), use_container_width=True)
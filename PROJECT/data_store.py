@@ -0,0 +1,214 @@
+# Bundled datasets as typed, memory-mapped Arrow files
+#
+# The CSVs stay the source of truth. Each one is converted into an
+# uncompressed Arrow IPC file under artifacts/data/ - on first load, or
+# ahead of time with
+#
+#   python data_store.py build [--source name=path.csv ...]
+#
+# The CSV is streamed batch by batch, so converting a production export
+# needs no more memory than one batch. Numeric columns get fixed narrow
+# types; labels and soil/crop types become dictionary (categorical)
+# columns. Loading memory-maps the file and materializes only the requested
+# columns, so a projection of a large dataset costs only what it touches.
+#
+# A file is rebuilt when its source CSV's size or mtime no longer match the
+# ones recorded in its metadata. Without pyarrow, `load_dataset` falls back
+# to reading the CSV with the same dtypes.
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pyarrow is optional; loads then parse the CSV
+    pa = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "artifacts", "data")
+
+CATEGORY = "category"
+
+# Dataset name -> (source CSV, column -> type). Column order is the CSV's.
+DATASETS = {
+    "crop": ("Crop_recommendation.csv", {
+        "N": "int16", "P": "int16", "K": "int16",
+        "temperature": "float64", "humidity": "float64", "ph": "float64", "rainfall": "float64",
+        "label": CATEGORY,
+    }),
+    "fertilizer": ("Fertilizer Prediction (1).csv", {
+        "Temperature": "int16", "Humidity": "int16", "Moisture": "int16",
+        "Soil Type": CATEGORY, "Crop Type": CATEGORY,
+        "Nitrogen": "int16", "Potassium": "int16", "Phosphorous": "int16",
+        "Fertilizer Name": CATEGORY,
+    }),
+    "soil": ("Modified_Soil_Fertility_Labeled (2).csv", {
+        "N": "int16", "P": "float64", "K": "int16", "Ph": "float64", "EC": "float64", "OC": "float64",
+        "S": "float64", "Zn": "float64", "Fe": "float64", "Cu": "float64", "Mn": "float64", "B": "float64",
+        "fertility": CATEGORY,
+    }),
+}
+
+BLOCK_SIZE = 16 << 20   # bytes of CSV per converted batch
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def source_path(name):
+    return os.path.join(BASE_DIR, DATASETS[name][0])
+
+
+def dataset_path(name):
+    return os.path.join(DATA_DIR, name + ".arrow")
+
+
+def dataset_columns(name):
+    return list(DATASETS[name][1])
+
+
+def _arrow_type(dtype):
+    if dtype == CATEGORY:
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+
+def source_stamp(source):
+    stat = os.stat(source)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class _CategoryEncoder:
+    """Re-encodes each batch's dictionary column against one append-only
+    dictionary, which the IPC file format can store as deltas."""
+
+    def __init__(self):
+        self.values = []
+        self.positions = {}
+
+    def encode(self, column):
+        local = column.dictionary.to_pylist()
+        for value in local:
+            if value not in self.positions:
+                self.positions[value] = len(self.values)
+                self.values.append(value)
+        # Trailing 0 is what null slots (filled with index len(local)) map to
+        mapping = np.array([self.positions[v] for v in local] + [0], dtype=np.int32)
+        indices = column.indices
+        valid = indices.is_valid().to_numpy(zero_copy_only=False)
+        codes = mapping[indices.fill_null(len(local)).to_numpy(zero_copy_only=False)]
+        return pa.DictionaryArray.from_arrays(pa.array(codes, mask=~valid),
+                                              pa.array(self.values, pa.string()))
+
+
+def build_dataset(name, source=None, output=None, block_size=BLOCK_SIZE):
+    """Convert a dataset's CSV (or `source`, a CSV with the same columns)
+    into a typed Arrow IPC file. Returns (path, rows)."""
+    source = source or source_path(name)
+    output = output or dataset_path(name)
+    types = DATASETS[name][1]
+    column_types = {col: _arrow_type(dtype) for col, dtype in types.items()}
+
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, include_columns=list(types)),
+    )
+    schema = reader.schema.with_metadata({
+        "agrifusion.source": json.dumps({"file": os.path.basename(source), **source_stamp(source)}),
+    })
+    encoders = {col: _CategoryEncoder() for col, dtype in types.items() if dtype == CATEGORY}
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    rows = 0
+    options = pa_ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    with pa_ipc.new_file(output + ".tmp", schema, options=options) as writer:
+        for batch in reader:
+            columns = [encoders[col].encode(batch.column(col)) if col in encoders else batch.column(col)
+                       for col in schema.names]
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+            rows += batch.num_rows
+    os.replace(output + ".tmp", output)
+    return output, rows
+
+
+def _is_current(name, path):
+    try:
+        with pa.memory_map(path) as source:
+            metadata = pa_ipc.open_file(source).schema.metadata or {}
+        recorded = json.loads(metadata[b"agrifusion.source"])
+    except (OSError, KeyError, ValueError, pa.ArrowInvalid):
+        return False
+    return {k: recorded.get(k) for k in ("size", "mtime_ns")} == source_stamp(source_path(name))
+
+
+def load_table(name, columns=None, path=None):
+    """Arrow table of a dataset, memory-mapped (zero-copy) and projected to
+    `columns`. Without `path` (a file written by `build_dataset`), the
+    bundled dataset's file is built or rebuilt when needed. Needs pyarrow;
+    `load_dataset` does not."""
+    if pa is None:
+        raise ImportError("pyarrow is not installed: use load_dataset, which reads the CSV instead")
+    with _lock:
+        if path is not None:
+            stamp, key = source_stamp(path), path
+        else:
+            stamp, key = source_stamp(source_path(name)), name
+        cached = _tables.get(key)
+        if cached is None or cached[0] != stamp:
+            if path is None:
+                path = dataset_path(name)
+                if not _is_current(name, path):
+                    build_dataset(name)
+            cached = _tables[key] = (stamp, pa_ipc.open_file(pa.memory_map(path)).read_all())
+    table = cached[1]
+    return table.select(columns) if columns is not None else table
+
+
+def load_dataset(name, columns=None, path=None):
+    """DataFrame of a dataset (all columns, or just `columns`), with the
+    fixed numeric dtypes and categorical labels. Categories are sorted, so
+    category codes match a LabelEncoder fitted on the same column."""
+    types = DATASETS[name][1]
+    columns = list(columns) if columns is not None else list(types)
+    if pa is None:
+        frame = pd.read_csv(path or source_path(name), usecols=columns,
+                            dtype={col: types[col] for col in columns})[columns]
+    else:
+        frame = load_table(name, columns, path).to_pandas()
+    for col in columns:
+        if types[col] == CATEGORY:
+            frame[col] = frame[col].cat.reorder_categories(sorted(frame[col].cat.categories))
+    return frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the bundled CSV datasets to typed Arrow files")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--source", action="append", default=[], metavar="NAME=CSV",
+                        help="convert another CSV with a dataset's columns (e.g. a production export)")
+    parser.add_argument("--output-dir", default=DATA_DIR)
+    args = parser.parse_args(argv)
+    if pa is None:
+        print("❌ pyarrow is not installed")
+        return 1
+
+    sources = dict(item.split("=", 1) for item in args.source) or {name: None for name in DATASETS}
+    for name, source in sources.items():
+        start = time.perf_counter()
+        path, rows = build_dataset(name, source, os.path.join(args.output_dir, name + ".arrow"))
+        print(f"✅ {path}: {rows:,} rows, {os.path.getsize(path):,} bytes "
+              f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+# Precomputed fertilizer decisions over the form's discrete input space
+#
+#   python decision_grid.py build [--climate-csv FILE] [--max-slices N]
+#
+# A tree only compares a feature against its own split thresholds, so every
+# input lying between the same pair of thresholds on every feature gets the
+# same answer from the forest. The grid stores the fertilizer model's class
+# for every (soil type, crop type, Nitrogen interval, Potassium interval,
+# Phosphorous interval) cell of a climate slice - one Temperature x Humidity
+# x Moisture interval cell. Integer nutrient values collapse onto those
+# intervals (101 x 51 x 51 values -> 44 x 22 x 54 cells).
+#
+# Neighbouring cells and climates mostly share their answers, so the classes
+# are stored as a two-level table: each distinct run of Phosphorous cells is
+# kept once in `rows`, each distinct Potassium x Phosphorous plane once in
+# `planes` (as row numbers), and `cells` names the plane of every
+# (slice, soil, crop, Nitrogen) cell. The ~90 slices of the shipped
+# fertilizer model take about 7 MB instead of 270 MB.
+#
+# Slices are built for the climates that actually occur (by default those in
+# the training data, plus the form defaults). A lookup is a few threshold
+# searches and three array indexes; rows from a climate without a slice go
+# to the live model. Grid answers are identical to the model's.
+import argparse
+import bisect
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from feature_schema import FERT_FEATURES
+from model_artifacts import ARTIFACT_DIR, ArtifactError, load_artifact, write_artifact
+from tree_engine import as_flat_forest, with_early_exit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GRID_PATH = os.path.join(ARTIFACT_DIR, "fertilizer_grid.agm")
+
+CLIMATE_FEATURES = ["Temperature", "Humidity", "Moisture"]
+CODE_FEATURES = ["Soil Type", "Crop Type"]
+
+# Default values of the climate inputs on Pages/fertilizer.py
+FORM_CLIMATE = (30.0, 50.0, 40.0)
+
+
+def _as_rows(X):
+    if hasattr(X, "columns"):
+        if list(X.columns) != FERT_FEATURES:
+            X = X[FERT_FEATURES]
+        X = X.to_numpy(dtype=np.float32)
+    X = np.asarray(X, dtype=np.float32)
+    # Same float32 -> float64 comparison as the trees
+    return np.atleast_2d(X).astype(np.float64)
+
+
+class DecisionGrid:
+    """Fertilizer class for every cell of the prebuilt climate slices.
+
+    `thresholds[f]` holds the sorted split thresholds of feature f (None for
+    the encoded categorical columns, which index the grid by code).
+    `slice_index[t, h, m]` maps climate interval cells to a slice or -1.
+    The class of cell (s, soil, crop, n, k, p) is
+    `rows[planes[cells[s, soil, crop, n], k], p]`. Rows the grid does not
+    cover are passed to `fallback.predict`.
+    """
+
+    def __init__(self, thresholds, slice_index, cells, planes, rows, classes, fallback=None):
+        self.thresholds = thresholds
+        self.slice_index = slice_index
+        self.cells = cells
+        self.planes = planes
+        self.rows = rows
+        self.classes_ = classes
+        self.fallback = fallback
+        self.feature_names_in_ = np.asarray(FERT_FEATURES, dtype=object)
+        self.n_features_in_ = len(FERT_FEATURES)
+        # Rows answered by the grid / the fallback; sessions predict concurrently
+        self.counts = {"grid": 0, "fallback": 0}
+        self._lock = threading.Lock()
+        # Plain lists for the bisect-based one-row path
+        self._threshold_lists = [None if t is None else t.tolist() for t in thresholds]
+        self._climate_cols = [FERT_FEATURES.index(name) for name in CLIMATE_FEATURES]
+        self._code_cols = [(FERT_FEATURES.index(name), size)
+                           for name, size in zip(CODE_FEATURES, cells.shape[1:3])]
+        self._cell_cols = [FERT_FEATURES.index(name) for name in
+                           CODE_FEATURES + ["Nitrogen", "Potassium", "Phosphorous"]]
+
+    @property
+    def n_slices(self):
+        return self.cells.shape[0]
+
+    @property
+    def n_cells(self):
+        return self.cells.size * self.planes.shape[1] * self.rows.shape[1]
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.cells, self.planes, self.rows, self.slice_index))
+
+    def _count(self, grid, fallback=0):
+        with self._lock:
+            self.counts["grid"] += grid
+            self.counts["fallback"] += fallback
+
+    def _codes(self, s, soil, crop, n, k, p):
+        return self.rows[self.planes[self.cells[s, soil, crop, n], k], p]
+
+    def locate(self, X):
+        """Grid position of every row: (slice, soil, crop, N, K, P) indices and
+        a mask of rows the grid covers."""
+        X = _as_rows(X)
+        index = []
+        for f, name in enumerate(FERT_FEATURES):
+            if self.thresholds[f] is None:
+                index.append(X[:, f].astype(np.int64))
+            else:
+                index.append(np.searchsorted(self.thresholds[f], X[:, f], side="left"))
+        climate = [index[FERT_FEATURES.index(name)] for name in CLIMATE_FEATURES]
+        slices = self.slice_index[tuple(climate)]
+        covered = (slices >= 0) & ~np.isnan(X).any(axis=1)
+        for name, size in zip(CODE_FEATURES, self.cells.shape[1:3]):
+            codes = X[:, FERT_FEATURES.index(name)]
+            covered &= (codes >= 0) & (codes < size) & (codes == np.floor(codes))
+        cell = [np.where(covered, i, 0) for i in
+                [slices] + [index[FERT_FEATURES.index(name)] for name in
+                            CODE_FEATURES + ["Nitrogen", "Potassium", "Phosphorous"]]]
+        return tuple(cell), covered
+
+    def _lookup_row(self, row):
+        """Class code of one row (Python floats), or None when the grid does not cover it."""
+        if any(x != x for x in row):  # NaN
+            return None
+        for f, size in self._code_cols:
+            if not (0 <= row[f] < size and row[f] == int(row[f])):
+                return None
+        index = [int(x) if t is None else bisect.bisect_left(t, x)
+                 for t, x in zip(self._threshold_lists, row)]
+        t, h, m = self._climate_cols
+        s = self.slice_index[index[t], index[h], index[m]]
+        if s < 0:
+            return None
+        soil, crop, n, k, p = self._cell_cols
+        return self._codes(s, index[soil], index[crop], index[n], index[k], index[p])
+
+    def predict(self, X):
+        rows = _as_rows(X)
+        if len(rows) == 1:
+            code = self._lookup_row(rows[0].tolist())
+            if code is not None:
+                self._count(1)
+                return self.classes_[[code]]
+        cell, covered = self.locate(rows)
+        codes = self._codes(*cell)
+        predicted = self.classes_[codes]
+        missed = ~covered
+        if missed.any():
+            if self.fallback is None:
+                raise ValueError(f"{int(missed.sum())} rows fall outside the decision grid")
+            subset = X.iloc[np.flatnonzero(missed)] if hasattr(X, "iloc") else rows[missed]
+            predicted = predicted.copy()
+            predicted[missed] = self.fallback.predict(subset)
+        self._count(int(covered.sum()), int(missed.sum()))
+        return predicted
+
+
+def _split_thresholds(forest):
+    internal = forest.left != np.arange(len(forest.left))
+    return [np.unique(forest.threshold[internal & (forest.feature == f)])
+            for f in range(forest.n_features_in_)]
+
+
+def _representatives(thresholds):
+    # Interval i holds the x with thresholds[i-1] < x <= thresholds[i];
+    # thresholds[i] itself (or anything above the last one) stands for it
+    return np.append(thresholds, thresholds[-1] + 1.0 if len(thresholds) else 0.0)
+
+
+def _fill(forest, node, box, axes, proba):
+    """Add the leaf values of the subtree at `node` to their boxes of `proba`."""
+    while forest.left[node] != node:
+        axis = axes[forest.feature[node]]
+        split = int(np.searchsorted(axis, forest.threshold[node], side="right"))
+        f = forest.feature[node]
+        lo, hi = box[f]
+        if split <= lo:
+            node = forest.right[node]
+        elif split >= hi:
+            node = forest.left[node]
+        else:
+            left_box = list(box)
+            left_box[f] = (lo, split)
+            _fill(forest, forest.left[node], left_box, axes, proba)
+            box = list(box)
+            box[f] = (split, hi)
+            node = forest.right[node]
+    region = tuple(slice(lo, hi) for lo, hi in box)
+    # Leaves are mostly pure; adding 0.0 would not change any sum
+    for c in np.flatnonzero(forest.value[node]):
+        proba[c][region] += forest.value[node, c]
+
+
+def build_slice(forest, axes):
+    """Class codes over the lattice spanned by `axes` (one sorted array of
+    representative values per feature), exactly as forest.predict gives them."""
+    shape = [len(axis) for axis in axes]
+    proba = np.zeros([forest.value.shape[1]] + shape, dtype=np.float64)
+    box = [(0, n) for n in shape]
+    # Trees are added one after another, like ForestClassifier.predict_proba
+    for root in forest.roots:
+        _fill(forest, int(root), box, axes, proba)
+    proba /= forest.n_trees
+    return np.argmax(proba, axis=0).astype(np.uint8)
+
+
+class _Interner:
+    """Numbers the distinct rows of the arrays passed to `ids`, in order of
+    first appearance, and keeps one copy of each."""
+
+    def __init__(self):
+        self.seen = {}
+        self.items = []
+
+    def ids(self, array):
+        array = np.ascontiguousarray(array)
+        keys = array.view(np.dtype((np.void, array.shape[1] * array.itemsize))).ravel()
+        distinct, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        ids = np.empty(len(distinct), dtype=np.int64)
+        for i, (key, at) in enumerate(zip(distinct, first)):
+            key = key.tobytes()
+            if key not in self.seen:
+                self.seen[key] = len(self.items)
+                self.items.append(array[at])
+            ids[i] = self.seen[key]
+        return ids[inverse.ravel()]
+
+    def table(self, width, dtype):
+        if not self.items:
+            return np.zeros((0, width), dtype=dtype)
+        return np.stack(self.items).astype(dtype)
+
+
+def _index_dtype(n):
+    return np.min_scalar_type(max(n - 1, 0))
+
+
+def build_grid(model, n_soil, n_crop, climates):
+    """DecisionGrid over every soil/crop code and nutrient interval for the
+    climate interval cells containing `climates` [(T, H, M), ...]."""
+    forest = as_flat_forest(model)
+    thresholds = _split_thresholds(forest)
+    for name in CODE_FEATURES:
+        thresholds[FERT_FEATURES.index(name)] = None
+    climate_cols = [FERT_FEATURES.index(name) for name in CLIMATE_FEATURES]
+
+    slice_index = np.full([len(thresholds[f]) + 1 for f in climate_cols], -1, dtype=np.int32)
+    cells = []
+    for climate in climates:
+        key = tuple(int(np.searchsorted(thresholds[f], np.float64(np.float32(v)), side="left"))
+                    for f, v in zip(climate_cols, climate))
+        if slice_index[key] < 0:
+            slice_index[key] = len(cells)
+            cells.append(key)
+
+    row_table, plane_table, slices = _Interner(), _Interner(), []
+    for key in cells:
+        axes = []
+        for f, name in enumerate(FERT_FEATURES):
+            if name in CLIMATE_FEATURES:
+                reps = _representatives(thresholds[f])
+                axes.append(reps[key[CLIMATE_FEATURES.index(name)]:][:1])
+            elif thresholds[f] is None:
+                axes.append(np.arange((n_soil, n_crop)[CODE_FEATURES.index(name)], dtype=np.float64))
+            else:
+                axes.append(_representatives(thresholds[f]))
+        # Climate axes have length 1 within a slice
+        codes = build_slice(forest, axes)[0, 0, 0]
+        n_k, n_p = codes.shape[-2:]
+        row_ids = row_table.ids(codes.reshape(-1, n_p)).reshape(-1, n_k)
+        slices.append(plane_table.ids(row_ids).reshape(codes.shape[:-2]))
+
+    n_nitrogen = len(thresholds[FERT_FEATURES.index("Nitrogen")]) + 1
+    n_k, n_p = (len(thresholds[FERT_FEATURES.index(name)]) + 1
+                for name in ["Potassium", "Phosphorous"])
+    rows = row_table.table(n_p, np.uint8)
+    planes = plane_table.table(n_k, _index_dtype(len(rows)))
+    cells = (np.stack(slices) if slices else np.zeros((0, n_soil, n_crop, n_nitrogen)))
+    cells = cells.astype(_index_dtype(len(planes)))
+    return DecisionGrid(thresholds, slice_index, cells, planes, rows,
+                        np.asarray(forest.classes_), fallback=forest)
+
+
+def export_grid(grid, path, sources):
+    arrays = {"slice_index": grid.slice_index, "cells": grid.cells, "planes": grid.planes,
+              "rows": grid.rows, "classes": grid.classes_}
+    for name, thresholds in zip(FERT_FEATURES, grid.thresholds):
+        if thresholds is not None:
+            arrays[f"thresholds:{name}"] = thresholds
+    return write_artifact(path, "decision_grid", arrays, {}, {}, sources)
+
+
+def grid_from_arrays(arrays):
+    if "cells" not in arrays:
+        raise ArtifactError("Decision grid is in an old format: run `python decision_grid.py build`")
+    thresholds = [arrays.get(f"thresholds:{name}") for name in FERT_FEATURES]
+    return DecisionGrid(thresholds, arrays["slice_index"], arrays["cells"], arrays["planes"],
+                        arrays["rows"], arrays["classes"])
+
+
+def with_decision_grid(registry, path=GRID_PATH):
+    """`build` for registry.derive / cached_predictor: the decision grid,
+    backed by the flat forest (with early exit), when a grid built from the
+    current fertilizer pickle exists; otherwise just the flat forest."""
+    early_exit = with_early_exit("fertilizer", FERT_FEATURES)
+
+    def build(model):
+        forest = early_exit(model)
+        if not os.path.exists(path):
+            return forest
+        # `build` checked the file's checksum; the pages map it as it is
+        try:
+            artifact = load_artifact(path, verify=False)
+        except ArtifactError:
+            return forest
+        # The grid holds the exact forest's answers: a stale grid, or one
+        # under a compressed forest (whose version names its artifact), is unused
+        source = artifact.source_sha256("fertilizer") or ""
+        if source[:12] != registry.model_version("fertilizer"):
+            return forest
+        grid = artifact.model
+        grid.fallback = forest
+        return grid
+
+    return build
+
+
+def climates_from_csv(path=None, max_slices=None):
+    """Distinct (Temperature, Humidity, Moisture) rows of a CSV (by default
+    the fertilizer dataset), most frequent first."""
+    import pandas as pd
+    from data_store import load_dataset
+
+    if path is None:
+        counts = load_dataset("fertilizer", CLIMATE_FEATURES).value_counts()
+    else:
+        counts = pd.read_csv(path, usecols=CLIMATE_FEATURES).value_counts()
+    climates = [tuple(float(v) for v in row) for row in counts.index]
+    return climates[:max_slices] if max_slices else climates
+
+
+def main(argv=None):
+    from model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Build the fertilizer decision grid")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--climate-csv", default=None,
+                        help="CSV whose Temperature/Humidity/Moisture rows get a slice "
+                             "(default: the fertilizer dataset)")
+    parser.add_argument("--max-slices", type=int, default=None)
+    parser.add_argument("--output", default=GRID_PATH)
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(artifact_dir=None)
+    climates = [FORM_CLIMATE] + climates_from_csv(args.climate_csv, args.max_slices)
+    start = time.perf_counter()
+    grid = build_grid(registry.get("fertilizer"), len(registry.get("le_soil").classes_),
+                      len(registry.get("le_crop").classes_), climates)
+    path = export_grid(grid, args.output, {name: registry.path(name)
+                                           for name in ["fertilizer", "le_soil", "le_crop"]})
+    # Serving maps the grid without hashing it, so check it once here
+    load_artifact(path)
+    print(f"✅ {path}: {grid.n_slices} climate slices, {grid.n_cells:,} cells "
+          f"({len(grid.planes):,} distinct planes, {len(grid.rows):,} distinct rows), "
+          f"{os.path.getsize(path):,} bytes in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
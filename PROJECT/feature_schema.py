@@ -0,0 +1,130 @@
+# Feature order, label mappings and input bounds shared by the pages,
+# the batch scorers and anything else that feeds the models.
+
+# ----------------- CROP RECOMMENDATION -----------------
+# Column order the crop model was trained on (Crop_recommendation.csv)
+CROP_FEATURES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+
+# (min, max) accepted by the number_input widgets on Pages/Crop.py
+CROP_BOUNDS = {
+    "N": (0, 150),
+    "P": (5, 150),
+    "K": (5, 250),
+    "temperature": (5.0, 45.0),
+    "humidity": (14.3, 99.98),
+    "ph": (3.5, 9.9),
+    "rainfall": (20.2, 298.6),
+}
+
+# Display names of the crop inputs (as labelled on Pages/Crop.py)
+CROP_LABELS = {
+    "N": "Nitrogen (Kg/Ha)",
+    "P": "Phosphorus (Kg/Ha)",
+    "K": "Potassium (Kg/Ha)",
+    "temperature": "Temperature (°C)",
+    "humidity": "Humidity (%)",
+    "ph": "Soil pH",
+    "rainfall": "Rainfall (mm)",
+}
+
+# Label mapping - must match the LabelEncoder used in "Crop Recommendation.ipynb",
+# which numbers the crops in alphabetical order
+label_mapping = {
+    'apple': 0, 'banana': 1, 'blackgram': 2, 'chickpea': 3, 'coconut': 4, 'coffee': 5,
+    'cotton': 6, 'grapes': 7, 'jute': 8, 'kidneybeans': 9, 'lentil': 10, 'maize': 11,
+    'mango': 12, 'mothbeans': 13, 'mungbean': 14, 'muskmelon': 15, 'orange': 16, 'papaya': 17,
+    'pigeonpeas': 18, 'pomegranate': 19, 'rice': 20, 'watermelon': 21
+}
+reverse_label_mapping = {v: k.capitalize() for k, v in label_mapping.items()}
+
+# ----------------- FERTILIZER RECOMMENDATION -----------------
+# Column order the fertilizer model was trained on (Fertilizer Prediction (1).csv)
+FERT_FEATURES = [
+    'Temperature', 'Humidity', 'Moisture', 'Soil Type', 'Crop Type',
+    'Nitrogen', 'Potassium', 'Phosphorous'
+]
+
+# Categorical columns -> registry name of the LabelEncoder that encodes them
+FERT_ENCODERS = {
+    "Soil Type": "le_soil",
+    "Crop Type": "le_crop",
+}
+
+# Crop model labels -> the "Crop Type" the fertilizer model knows (le_crop).
+# Crops without an entry have no fertilizer training data.
+CROP_TO_FERT_CROP = {
+    "rice": "Paddy",
+    "maize": "Maize",
+    "cotton": "Cotton",
+    "chickpea": "Pulses",
+    "kidneybeans": "Pulses",
+    "pigeonpeas": "Pulses",
+    "mothbeans": "Pulses",
+    "mungbean": "Pulses",
+    "blackgram": "Pulses",
+    "lentil": "Pulses",
+}
+
+# (min, max) accepted by the number_input widgets on Pages/fertilizer.py
+FERT_BOUNDS = {
+    "Temperature": (10.0, 50.0),
+    "Humidity": (10.0, 90.0),
+    "Moisture": (10.0, 80.0),
+    "Nitrogen": (0, 100),
+    "Potassium": (0, 50),
+    "Phosphorous": (0, 50),
+}
+
+# ----------------- SOIL FERTILITY -----------------
+# Column order the soil model was trained on (Modified_Soil_Fertility_Labeled (2).csv)
+SOIL_FEATURES = ["N", "P", "K", "Ph", "EC", "OC", "S", "Zn", "Fe", "Cu", "Mn", "B"]
+
+# (min, max) accepted by the number_input widgets on Pages/stream_soil.py
+SOIL_BOUNDS = {
+    "N": (6.0, 383.0),
+    "P": (2.9, 125.0),
+    "K": (11.0, 887.0),
+    "Ph": (0.9, 11.15),
+    "EC": (0.1, 0.95),
+    "OC": (0.1, 24.0),
+    "S": (0.64, 31.0),
+    "Zn": (0.07, 42.0),
+    "Fe": (0.21, 44.0),
+    "Cu": (0.09, 3.02),
+    "Mn": (0.11, 31.0),
+    "B": (0.06, 2.82),
+}
+
+# Soil-lab N, P and K are on a different scale from the crop and fertilizer
+# datasets (soil K runs to 887, the crop data's to 205, the fertilizer
+# data's to 19). The field pipeline maps a soil reading linearly from the
+# range of the soil dataset onto the range of the other dataset:
+# nutrient -> ((soil min, soil max), (target min, target max)).
+# This is a heuristic, not a unit conversion: the datasets do not record
+# how their values were measured, so there is no agronomic formula between
+# them. The field page says so and shows the values each model was given.
+SOIL_TO_CROP_NPK = {
+    "N": ((6.0, 383.0), (0.0, 140.0)),
+    "P": ((2.9, 125.0), (5.0, 145.0)),
+    "K": ((11.0, 887.0), (5.0, 205.0)),
+}
+SOIL_TO_FERT_NPK = {
+    "N": ((6.0, 383.0), (4.0, 42.0)),
+    "P": ((2.9, 125.0), (0.0, 42.0)),
+    "K": ((11.0, 887.0), (0.0, 19.0)),
+}
+
+# Labels
+fertility_labels = {
+    0: ("🚫 Low Fertility", "red"),
+    1: ("✅ Moderate Fertility", "orange"),
+    2: ("🌟 High Fertility", "green")
+}
+
+# Same suggestions the soil page shows under a result: (column, "<" or ">", threshold, message)
+SOIL_WARNINGS = [
+    ("N", "<", 50, "Low Nitrogen: Add compost or urea"),
+    ("P", "<", 20, "Low Phosphorus: Apply Single Super Phosphate"),
+    ("Ph", "<", 6, "Acidic Soil: Add lime"),
+    ("Ph", ">", 8, "Alkaline Soil: Add gypsum or sulfur"),
+]
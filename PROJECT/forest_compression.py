@@ -0,0 +1,302 @@
+# Accuracy-constrained compression of the random forests
+#
+#   python forest_compression.py [crop|fertilizer] [--tolerance 0.005]
+#                                [--output path.agm] [--install] [--report report.json]
+#
+# The shipped forests have 100 full-depth trees. This tool keeps the fewest
+# trees and the shallowest depth that hold accuracy on the notebook's
+# held-out rows to within `tolerance` of the full forest:
+#
+#   trees   ranked once by greedy forward selection: each step adds the tree
+#           that makes the partial forest agree most with the full forest's
+#           predictions on every dataset row (no labels involved)
+#   depth   every tree is cut at depth d; a node at depth d becomes a leaf
+#           with the class distribution of the training rows that reached it
+#
+# For every depth the smallest number of (ranked) trees that meets the
+# tolerance is a candidate; the candidate with the fewest nodes wins. A
+# candidate must also agree with the full forest on `min_agreement` of all
+# dataset rows, so a tiny subset cannot win by fitting the few hundred
+# held-out rows.
+#
+# The result is a FlatForest with compact arrays: leaves are numbered first,
+# so class probabilities are stored for leaves only (float32), node indices
+# use the smallest unsigned type that fits and feature ids are uint8.
+# Thresholds are float32 rounded *down*: inputs are float32 (see
+# tree_engine.py), and x <= t holds for a float32 x exactly when x is at
+# most the largest float32 not above t, so every split decides as before.
+#
+# The compressed forest is written as an .agm artifact. With --install it
+# replaces artifacts/<task>.agm, which the registry then serves instead of
+# the pickle (model_artifacts.py verify will report the pruned rows). Its
+# model version is the pickle's hash plus the artifact's, so cached answers
+# of the exact forest are not reused, and the fertilizer decision grid and
+# rules (built from the exact forest) are set aside.
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from model_artifacts import ARTIFACT_DIR, MODEL_ENCODERS, artifact_path, export_model, load_artifact
+from model_registry import ARTIFACTS, BASE_DIR, ModelRegistry
+from tree_engine import FlatForest, as_flat_forest
+
+# Held-out split of the training notebook: task -> (test size, stratified)
+HOLDOUT = {
+    "crop": (0.2, False),
+    "fertilizer": (0.35, True),
+}
+SEED = 42
+TOLERANCE = 0.005
+MIN_AGREEMENT = 0.99
+LATENCY_RUNS = 300
+
+
+def _index_dtype(n):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def node_depths(forest):
+    """(depth of every node, tree of every node)."""
+    n = len(forest.feature)
+    depth = np.full(n, -1, dtype=np.int32)
+    frontier = forest.roots.astype(np.int64)
+    level = 0
+    while len(frontier):
+        depth[frontier] = level
+        internal = frontier[forest.left[frontier] != frontier]
+        frontier = np.concatenate([forest.left[internal], forest.right[internal]]).astype(np.int64)
+        level += 1
+    tree = np.searchsorted(forest.roots, np.arange(n), side="right") - 1
+    return depth, tree
+
+
+def nodes_by_depth(forest, X):
+    """Node reached in every tree after 0..max_depth steps, (depth, rows, trees)."""
+    X = forest._prepare(X)
+    rows = np.arange(len(X))[:, None]
+    node = np.broadcast_to(forest.roots, (len(X), forest.n_trees)).astype(np.int64)
+    out = [node]
+    for _ in range(forest.max_depth):
+        go_left = X[rows, forest.feature[node]] <= forest.threshold[node]
+        node = np.where(go_left, forest.left[node], forest.right[node])
+        out.append(node)
+    return np.stack(out)
+
+
+def rank_trees(votes, target):
+    """Greedy forward selection: tree order in which each prefix agrees most
+    with `target`. `votes` is (rows, trees, classes) per-tree probabilities."""
+    n_rows, n_trees, _ = votes.shape
+    total = np.zeros(votes[:, 0, :].shape)
+    remaining = list(range(n_trees))
+    order = []
+    for _ in range(n_trees):
+        candidate = total[:, None, :] + votes[:, remaining, :]
+        agreement = (candidate.argmax(axis=2) == target[:, None]).sum(axis=0)
+        best = remaining.pop(int(np.argmax(agreement)))
+        order.append(best)
+        total += votes[:, best, :]
+    return np.asarray(order)
+
+
+def prefix_accuracy(votes, order, y):
+    """Accuracy of the first k ranked trees, for k = 1..trees."""
+    totals = np.cumsum(votes[:, order, :], axis=1)
+    return (totals.argmax(axis=2) == y[:, None]).mean(axis=0)
+
+
+def prune_forest(forest, trees, depth):
+    """The given trees of `forest`, cut at `depth`, with compact arrays."""
+    node_depth, node_tree = node_depths(forest)
+    keep = np.isin(node_tree, trees) & (node_depth <= depth)
+    is_leaf = keep & ((forest.left == np.arange(len(keep))) | (node_depth == depth))
+    internal = keep & ~is_leaf
+    # Leaves first: only they need a row of class probabilities
+    old = np.concatenate([np.flatnonzero(is_leaf), np.flatnonzero(internal)])
+    n_leaves, n_nodes = int(is_leaf.sum()), len(old)
+    new = np.full(len(keep), -1, dtype=np.int64)
+    new[old] = np.arange(n_nodes)
+
+    index = _index_dtype(n_nodes - 1)
+    own = np.arange(n_nodes)
+    leaf = own < n_leaves
+    threshold = forest.threshold[old].astype(np.float32)
+    too_high = threshold.astype(np.float64) > forest.threshold[old]
+    threshold[too_high] = np.nextafter(threshold[too_high], np.float32(-np.inf))
+    return FlatForest(
+        feature=np.where(leaf, 0, forest.feature[old]).astype(_index_dtype(forest.n_features_in_ - 1)),
+        threshold=np.where(leaf, 0, threshold).astype(np.float32),
+        left=np.where(leaf, own, new[forest.left[old]]).astype(index),
+        right=np.where(leaf, own, new[forest.right[old]]).astype(index),
+        value=np.ascontiguousarray(forest.value[old[:n_leaves]], dtype=np.float32),
+        roots=new[forest.roots[trees]].astype(index),
+        max_depth=min(depth, forest.max_depth),
+        classes=forest.classes_,
+        feature_names=forest.feature_names_in_,
+    )
+
+
+def search(forest, X_all, X_test, y_test, tolerance=TOLERANCE, min_agreement=MIN_AGREEMENT):
+    """(baseline accuracy, candidates, chosen): per depth the fewest ranked
+    trees within `tolerance` of the full forest's test accuracy, and the
+    smallest of those candidates."""
+    node_depth, node_tree = node_depths(forest)
+    full_test = forest.predict(X_test)
+    baseline = float((full_test == y_test).mean())
+    class_index = {c: i for i, c in enumerate(forest.classes_)}
+    y_codes = np.array([class_index[c] for c in y_test])
+
+    # Trees are ranked once, against the full forest on all rows
+    all_nodes = nodes_by_depth(forest, X_all)
+    full_all = forest.predict_proba(X_all).argmax(axis=1)
+    order = rank_trees(forest.value[all_nodes[-1]], full_all)
+
+    test_nodes = nodes_by_depth(forest, X_test)
+    candidates = []
+    for depth in range(1, forest.max_depth + 1):
+        accuracy = prefix_accuracy(forest.value[test_nodes[depth]], order, y_codes)
+        agreement = prefix_accuracy(forest.value[all_nodes[depth]], order, full_all)
+        within = np.flatnonzero((accuracy >= baseline - tolerance - 1e-12) & (agreement >= min_agreement))
+        if not len(within):
+            continue
+        k = int(within[0]) + 1
+        trees = np.sort(order[:k])
+        nodes = int((np.isin(node_tree, trees) & (node_depth <= depth)).sum())
+        candidates.append({"depth": depth, "trees": k, "nodes": nodes,
+                           "test_accuracy": float(accuracy[k - 1]),
+                           "agreement": float(agreement[k - 1]), "tree_ids": trees.tolist()})
+    chosen = min(candidates, key=lambda c: (c["nodes"], -c["test_accuracy"]))
+    return baseline, candidates, chosen
+
+
+def _latency(model, X, runs=LATENCY_RUNS):
+    """(median single-row predict seconds, batch predict seconds per row)."""
+    row = X.iloc[:1]
+    model.predict(row)  # compile / warm up
+    times = []
+    for i in range(runs):
+        row = X.iloc[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        model.predict(row)
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    model.predict(X)
+    return float(np.median(times)), (time.perf_counter() - start) / len(X)
+
+
+def _summary(name, model, X_all, X_test, y_test, reference):
+    latency, per_row = _latency(model, X_all)
+    return {
+        "model": name,
+        "trees": int(model.n_trees) if hasattr(model, "n_trees") else len(model.estimators_),
+        "nodes": int(len(model.feature)) if isinstance(model, FlatForest) else None,
+        "bytes": int(model.nbytes) if isinstance(model, FlatForest) else None,
+        "test_accuracy": float((model.predict(X_test) == y_test).mean()),
+        "agreement": float((model.predict(X_all) == reference).mean()),
+        "predict_ms": latency * 1000,
+        "batch_us_per_row": per_row * 1e6,
+    }
+
+
+def compress(task, tolerance=TOLERANCE, min_agreement=MIN_AGREEMENT, seed=SEED):
+    """Compressed FlatForest of a task's shipped forest plus a report dict."""
+    import joblib
+    from sklearn.model_selection import train_test_split
+
+    from train import load_task
+
+    pickle_path = os.path.join(BASE_DIR, ARTIFACTS[task])
+    model = joblib.load(pickle_path)
+    forest = as_flat_forest(model)
+    X, y, _ = load_task(task)
+    test_size, stratified = HOLDOUT[task]
+    _, X_test, _, y_test = train_test_split(X, y, test_size=test_size, random_state=seed,
+                                            stratify=y if stratified else None)
+
+    baseline, candidates, chosen = search(forest, X, X_test, y_test, tolerance, min_agreement)
+    compressed = prune_forest(forest, np.asarray(chosen["tree_ids"]), chosen["depth"])
+
+    reference = forest.predict(X)
+    report = {
+        "task": task,
+        "tolerance": tolerance,
+        "min_agreement": min_agreement,
+        "baseline_test_accuracy": baseline,
+        "pickle_bytes": os.path.getsize(pickle_path),
+        "test_rows": len(X_test),
+        "candidates": [{k: v for k, v in c.items() if k != "tree_ids"} for c in candidates],
+        "chosen": chosen,
+        "models": [
+            _summary("sklearn", model, X, X_test, y_test, reference),
+            _summary("flat", forest, X, X_test, y_test, reference),
+            _summary("compressed", compressed, X, X_test, y_test, reference),
+        ],
+    }
+    return compressed, report
+
+
+def _print_report(report):
+    print(f"\n🌳 {report['task']}: full forest test accuracy {report['baseline_test_accuracy']:.4f} "
+          f"on {report['test_rows']} held-out rows, tolerance {report['tolerance']}")
+    print(f"{'depth':>5} {'trees':>6} {'nodes':>7} {'test acc':>9} {'agree':>7}")
+    for c in report["candidates"]:
+        marker = " *" if c["depth"] == report["chosen"]["depth"] else ""
+        print(f"{c['depth']:5d} {c['trees']:6d} {c['nodes']:7d} {c['test_accuracy']:9.4f} {c['agreement']:7.4f}{marker}")
+    print(f"\n{'model':<11} {'trees':>5} {'nodes':>7} {'size KB':>9} {'test acc':>9} {'agree':>7} "
+          f"{'predict ms':>11} {'batch us/row':>13}")
+    for m in report["models"]:
+        size = (m["bytes"] if m["bytes"] is not None else report["pickle_bytes"]) / 1024
+        nodes = f"{m['nodes']:7d}" if m["nodes"] is not None else f"{'-':>7}"
+        print(f"{m['model']:<11} {m['trees']:5d} {nodes} {size:9.1f} {m['test_accuracy']:9.4f} "
+              f"{m['agreement']:7.4f} {m['predict_ms']:11.3f} {m['batch_us_per_row']:13.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prune and quantize a shipped random forest")
+    parser.add_argument("task", nargs="?", choices=list(HOLDOUT), default="crop")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed drop in held-out accuracy (default: %(default)s)")
+    parser.add_argument("--min-agreement", type=float, default=MIN_AGREEMENT,
+                        help="required agreement with the full forest on all rows (default: %(default)s)")
+    parser.add_argument("--output", help="artifact path (default: artifacts/<task>_compressed.agm)")
+    parser.add_argument("--install", action="store_true",
+                        help="also replace artifacts/<task>.agm, so the pages serve the compressed forest")
+    parser.add_argument("--report", help="write the trade-off report as JSON")
+    args = parser.parse_args(argv)
+
+    compressed, report = compress(args.task, args.tolerance, args.min_agreement)
+    _print_report(report)
+
+    output = args.output or os.path.join(ARTIFACT_DIR, f"{args.task}_compressed.agm")
+    sources = {args.task: os.path.join(BASE_DIR, ARTIFACTS[args.task])}
+    meta = {"compression": {k: report["chosen"][k] for k in ("depth", "trees", "nodes", "test_accuracy")}
+            | {"tolerance": args.tolerance, "min_agreement": args.min_agreement}}
+    # Encoders travel inside the model's artifact, as in an ordinary export
+    registry = ModelRegistry(artifact_dir=None)
+    encoders = {name: registry.get(name) for name in MODEL_ENCODERS[args.task]}
+    sources.update({name: registry.path(name) for name in encoders})
+    export_model(compressed, output, encoders, sources, meta)
+    load_artifact(output)
+    report["artifact_bytes"] = os.path.getsize(output)
+    print(f"\n✅ {output} ({report['artifact_bytes']:,} bytes)")
+    if args.install:
+        target = artifact_path(args.task)
+        shutil.copyfile(output, target + ".tmp")
+        os.replace(target + ".tmp", target)
+        print(f"✅ installed as {target}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+# Headless HTTP inference service for the three AgriFusion models
+#
+#   python inference_service.py --port 8000 --workers 8
+#
+#   POST /crop        {"N": 90, "P": 42, "K": 43, "temperature": 20.9, ...}
+#   POST /fertilizer  {"Temperature": 26, "Soil Type": "Sandy", ...}
+#   POST /soil        {"N": 138, "P": 8.6, "K": 560, "Ph": 7.46, ...}
+#   POST /pipeline    one field record -> fertility, crop and fertilizer
+#   GET  /health      loaded models, their load times and prediction cache counters
+#
+# A request body is either one record (JSON object) or a list of records.
+# Records use the same column names, bounds and encoders as the pages and
+# the bulk upload modes, so every interface returns the same answers.
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pandas as pd
+
+from batch_scoring import (
+    BatchInputError, FertilizerBatch, check_columns, score_crop_chunk, score_soil_chunk,
+)
+from feature_schema import CROP_FEATURES, FERT_FEATURES, SOIL_FEATURES
+from model_registry import registry
+from pipeline import PIPELINE_FEATURES, FieldPipeline
+from prediction_cache import cached_predictor, prediction_cache
+from rule_model import with_rule_model
+from tree_engine import EarlyExitForest, reset_trees_evaluated, trees_evaluated, with_early_exit
+
+
+class InferenceService:
+    """Maps an endpoint and a JSON payload to a status code and JSON body."""
+
+    def __init__(self, registry=registry):
+        self.registry = registry
+        # Requests are small, so the forests run on the flat-array engine and
+        # stop at the trees that settle each answer (fertilizer: the same
+        # distilled rules / decision grid as the page, so both share cache
+        # entries); every model sits behind the shared prediction cache
+        crop = cached_predictor(registry, "crop", with_early_exit("crop", CROP_FEATURES))
+        soil = cached_predictor(registry, "soil")
+        fertilizer = FertilizerBatch.from_registry(
+            registry, model=cached_predictor(registry, "fertilizer", with_rule_model(registry)))
+        pipeline = FieldPipeline(soil, crop, fertilizer)
+        self.forests = {"crop": _early_exit(crop), "fertilizer": _early_exit(fertilizer.model)}
+        # endpoint -> (required columns, scorer returning (scored frame, n_valid), output columns)
+        self.endpoints = {
+            "/crop": (CROP_FEATURES, lambda df: score_crop_chunk(crop, df), ["predicted_crop"]),
+            "/fertilizer": (FERT_FEATURES, fertilizer.recommend, ["Recommended Fertilizer"]),
+            "/soil": (SOIL_FEATURES, lambda df: score_soil_chunk(soil, df),
+                      ["fertility", "fertility_label", "warnings"]),
+            # Partial results are useful here, so stage errors are returned, not raised
+            "/pipeline": (PIPELINE_FEATURES, lambda df: (pipeline.run(df)[0].assign(error=""), len(df)),
+                          ["fertility_label", "warnings", "soil_error", "predicted_crop", "crop_error",
+                           "Crop Type", "Recommended Fertilizer", "fertilizer_error"]),
+        }
+
+    def health(self):
+        return 200, {"status": "ok", "models": self.registry.stats(),
+                     "prediction_cache": prediction_cache.stats(),
+                     "early_exit": {name: forest.stats() for name, forest in self.forests.items()
+                                    if forest is not None}}
+
+    def predict(self, endpoint, payload):
+        if endpoint not in self.endpoints:
+            return 404, {"error": f"Unknown endpoint '{endpoint}'"}
+        single = isinstance(payload, dict)
+        records = [payload] if single else payload
+        if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+            return 400, {"error": "Body must be a JSON object or a non-empty list of objects"}
+
+        required, score, outputs = self.endpoints[endpoint]
+        table = pd.DataFrame.from_records(records)
+        try:
+            check_columns(table.columns, required)
+        except BatchInputError as e:
+            return 400, {"error": str(e)}
+
+        scored, _ = score(table)
+        results = []
+        for row in scored[outputs + ["error"]].to_dict("records"):
+            error = row.pop("error")
+            results.append({"error": error} if error else row)
+
+        if single:
+            return (422 if "error" in results[0] else 200), results[0]
+        return 200, results
+
+
+def _early_exit(model):
+    """The EarlyExitForest behind a served model (inside its cache / grid
+    wrappers), or None."""
+    while model is not None and not isinstance(model, EarlyExitForest):
+        model = getattr(model, "model", None) or getattr(model, "fallback", None)
+    return model
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    service = None
+    server_version = "AgriFusion/1.0"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.respond(*self.service.health(), start=time.perf_counter())
+        else:
+            self.respond(404, {"error": f"Unknown endpoint '{self.path}'"}, start=time.perf_counter())
+
+    def do_POST(self):
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            self.respond(400, {"error": "Body is not valid JSON"}, start=start)
+            return
+
+        model_start = time.perf_counter()
+        reset_trees_evaluated()
+        try:
+            status, body = self.service.predict(self.path, payload)
+        except Exception as e:
+            status, body = 500, {"error": f"Error during prediction: {e}"}
+        self.respond(status, body, start=start, model_seconds=time.perf_counter() - model_start,
+                     trees=trees_evaluated())
+
+    def respond(self, status, body, start, model_seconds=None, trees=None):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if model_seconds is not None:
+            self.send_header("X-Model-Time-Ms", f"{model_seconds * 1000:.3f}")
+        if trees is not None:
+            # Forest trees evaluated for this request (0 when served from the cache)
+            self.send_header("X-Trees-Evaluated", str(trees))
+        self.send_header("X-Process-Time-Ms", f"{(time.perf_counter() - start) * 1000:.3f}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Keep stdout quiet under load; errors still go through log_error
+        pass
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that handles each connection on a fixed-size worker pool."""
+
+    daemon_threads = True
+
+    def __init__(self, address, handler, workers=8):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agrifusion-worker")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def make_server(host="127.0.0.1", port=8000, workers=8, service=None):
+    """Build the server with all models loaded up front (port 0 picks a free port)."""
+    handler = type("Handler", (RequestHandler,), {"service": service or InferenceService()})
+    return PooledHTTPServer((host, port), handler, workers=workers)
+
+
+def post_json(url, payload, timeout=10):
+    """Small local client: POST `payload` and return (status, body, headers)."""
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"}, method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read()), dict(response.headers)
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read()), dict(e.headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AgriFusion HTTP inference service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--cache-db", help="SQLite file that keeps cached predictions across restarts")
+    args = parser.parse_args()
+
+    if args.cache_db:
+        prediction_cache.attach_disk(args.cache_db)
+
+    server = make_server(args.host, args.port, args.workers)
+    print(f"🌱 AgriFusion inference service on http://{args.host}:{server.server_port} "
+          f"({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
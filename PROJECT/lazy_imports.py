@@ -0,0 +1,186 @@
+# Deferred imports and import-time accounting for the pages
+#
+#   python lazy_imports.py [home.py Pages/Crop.py ...] [--json]
+#
+# A page's top-level imports run before anything is painted, so pages only
+# import what the first paint needs. Heavy libraries that are used later
+# (pandas for the prediction input, altair for charts, ...) are bound with
+# `lazy_module`: a placeholder module that does the real import on first
+# attribute access. Every import that goes through here is timed.
+#
+# home.py starts `prefetch` once the landing page is out: a background
+# thread imports the model and data libraries, so they are usually loaded by
+# the time a visitor opens a prediction page.
+#
+# The CLI measures what each page's top-level imports cost in a fresh
+# interpreter (on top of streamlit itself) and names the heaviest ones.
+import argparse
+import ast
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import types
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Imported in the background after the landing page is painted
+PREFETCH_MODULES = [
+    "numpy", "pandas", "altair", "model_registry", "batch_scoring", "prediction_cache",
+    "tree_engine", "decision_grid", "rule_model", "bulk_upload", "reports",
+]
+PREFETCH = os.environ.get("AGRIFUSION_PREFETCH", "1") != "0"
+
+_import_times = {}
+_lock = threading.Lock()
+_prefetch_started = False
+
+
+def timed_import(name):
+    """Import `name`; the first import of a module in this process is timed."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        _import_times.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+class LazyModule(types.ModuleType):
+    """Stands in for a module until one of its attributes is used."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = self.__dict__["_module"] = timed_import(self.__name__)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_module(name):
+    """The module itself when it is already imported, else a LazyModule."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def import_times():
+    """Module -> seconds its first import took in this process (via this module)."""
+    with _lock:
+        return dict(_import_times)
+
+
+def _prefetch(names):
+    for name in names:
+        try:
+            timed_import(name)
+        except Exception:
+            # A broken optional module surfaces on the page that needs it
+            pass
+
+
+def prefetch(names=None):
+    """Import `names` (default PREFETCH_MODULES) on a background thread, once
+    per process. Returns the thread, or None if it was already started."""
+    global _prefetch_started
+    with _lock:
+        if _prefetch_started:
+            return None
+        _prefetch_started = True
+    thread = threading.Thread(target=_prefetch, args=(list(names or PREFETCH_MODULES),),
+                              name="import-prefetch", daemon=True)
+    thread.start()
+    return thread
+
+
+# ----------------- MEASUREMENT -----------------
+def page_imports(path):
+    """Source of the top-level import statements of a page script."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    nodes = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in nodes)
+
+
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+streamlit_seconds = time.perf_counter() - start
+before = set(sys.modules)
+start = time.perf_counter()
+exec(compile(sys.argv[1], "<page imports>", "exec"), {"__name__": "__page__"})
+print(json.dumps({"streamlit_seconds": streamlit_seconds, "imports_seconds": time.perf_counter() - start,
+                  "modules": len(set(sys.modules) - before)}))
+"""
+
+
+def measure_page(path, top=5):
+    """Import cost of a page's top-level imports in a fresh interpreter."""
+    child = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD, page_imports(path)],
+                           cwd=BASE_DIR, capture_output=True, text=True,
+                           env={**os.environ, "PYTHONPATH": BASE_DIR})
+    if child.returncode != 0:
+        raise RuntimeError(f"{path}: {child.stderr.strip().splitlines()[-1]}")
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+
+    # Direct (unindented) imports after streamlit, by cumulative microseconds
+    heaviest, seen_streamlit = [], False
+    for line in child.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  "):
+            continue
+        name = name.strip()
+        if name == "streamlit":
+            seen_streamlit = True
+        elif seen_streamlit and cumulative.strip().isdigit():
+            heaviest.append((name, int(cumulative) / 1e6))
+    heaviest.sort(key=lambda item: -item[1])
+    return {"page": os.path.relpath(path, BASE_DIR), **result, "heaviest": heaviest[:top]}
+
+
+def default_pages():
+    pages = [os.path.join(BASE_DIR, "home.py")]
+    page_dir = os.path.join(BASE_DIR, "Pages")
+    pages += sorted(os.path.join(page_dir, name) for name in os.listdir(page_dir) if name.endswith(".py"))
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import cost of each page")
+    parser.add_argument("pages", nargs="*", help="page scripts (default: home.py and Pages/*.py)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = [measure_page(os.path.abspath(path)) for path in (args.pages or default_pages())]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'page':<28} {'streamlit s':>11} {'imports s':>10} {'modules':>8}  heaviest")
+    for r in results:
+        heaviest = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in r["heaviest"][:3])
+        print(f"{r['page']:<28} {r['streamlit_seconds']:11.2f} {r['imports_seconds']:10.2f} "
+              f"{r['modules']:8d}  {heaviest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
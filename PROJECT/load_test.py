@@ -0,0 +1,473 @@
+# Concurrent-session load test of the prediction pages
+#
+#   python load_test.py [crop fertilizer soil] [--sessions 50] [--submits 5]
+#                       [--think 0] [--jitter 0.05] [--replay inputs.jsonl]
+#                       [--record inputs.jsonl] [--output report.json]
+#
+# Every simulated farmer is a streamlit.testing AppTest session on its own
+# thread: it opens a page (Pages/Crop.py, fertilizer.py or stream_soil.py),
+# then fills in and submits the form `--submits` times. Form values are rows
+# drawn from the bundled CSVs (optionally jittered by up to `--jitter` of
+# the value, and kept within the form's bounds), or the records of a
+# `--replay` log in order. `--record` writes the inputs of a run in that
+# log format, one JSON object per line:
+#
+#   {"page": "crop", "inputs": {"N": 90, "P": 42, ..., "rainfall": 202.9}}
+#
+# AppTest runs the page scripts in this process, so the process CPU time
+# and RSS are the server's (plus the harness' own small share). Like one
+# `streamlit run` server, all sessions share a Runtime and a script cache;
+# each page is opened once before the sessions start (reported as its cold
+# start), so first imports and model loads are not raced or timed. The
+# report gives page-load and submit (rerun) latency percentiles per page,
+# errors, CPU, RSS, and the micro-batcher and prediction cache counters.
+#
+# Everything runs offline: sockets to anything but localhost are refused
+# (and counted), and remote animation downloads are switched off.
+import argparse
+import contextlib
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# page -> (script, dataset, submit button label, form label -> input name)
+PAGES = {
+    "crop": ("Pages/Crop.py", "crop", "Predict Crop", {
+        "Nitrogen content (Kg/Ha)": "N",
+        "Phosphorus content (Kg/Ha)": "P",
+        "Potassium content (Kg/Ha)": "K",
+        "Temperature (°C)": "temperature",
+        "Humidity (%)": "humidity",
+        "Soil pH": "ph",
+        "Rainfall (mm)": "rainfall",
+    }),
+    "fertilizer": ("Pages/fertilizer.py", "fertilizer", "🚀 Get Fertilizer Recommendation", {
+        "🌡️ Temperature (°C)": "Temperature",
+        "💧 Humidity (%)": "Humidity",
+        "🏞️ Soil Moisture (%)": "Moisture",
+        "🏔️ Soil Type": "Soil Type",
+        "🌾 Crop Type": "Crop Type",
+        "🟢 Nitrogen (N)": "Nitrogen",
+        "🟡 Potassium (K)": "Potassium",
+        "🔴 Phosphorous (P)": "Phosphorous",
+    }),
+    "soil": ("Pages/stream_soil.py", "soil", "🚀 Analyze Soil", {
+        "Nitrogen (N) [kg/ha]": "N",
+        "Phosphorus (P) [kg/ha]": "P",
+        "Potassium (K) [kg/ha]": "K",
+        "pH [0-14]": "Ph",
+        "Electrical Conductivity (EC) [dS/m]": "EC",
+        "Organic Carbon (OC) [%]": "OC",
+        "Sulfur (S) [ppm]": "S",
+        "Zinc (Zn) [ppm]": "Zn",
+        "Iron (Fe) [ppm]": "Fe",
+        "Copper (Cu) [ppm]": "Cu",
+        "Manganese (Mn) [ppm]": "Mn",
+        "Boron (B) [ppm]": "B",
+    }),
+}
+
+# Markdown every successful submit of the page renders
+RESULT_MARKERS = {
+    "crop": "Recommended Crop for You",
+    "fertilizer": "RECOMMENDED FERTILIZER",
+    "soil": "Soil Fertility Result",
+}
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+# ----------------- OFFLINE -----------------
+@contextlib.contextmanager
+def block_network():
+    """Refuse every connection and name lookup that is not for localhost in
+    this process while the block runs. Yields the list the refused
+    (host, port) pairs go to."""
+    refused = []
+    connect, connect_ex, getaddrinfo = socket.socket.connect, socket.socket.connect_ex, socket.getaddrinfo
+
+    def is_remote(sock, address):
+        return sock.family in (socket.AF_INET, socket.AF_INET6) and address[0] not in LOCAL_HOSTS
+
+    def guarded_connect(sock, address):
+        if is_remote(sock, address):
+            refused.append(list(address[:2]))
+            raise ConnectionRefusedError(f"load test is offline: {address[0]}")
+        return connect(sock, address)
+
+    def guarded_connect_ex(sock, address):
+        if is_remote(sock, address):
+            refused.append(list(address[:2]))
+            return 111  # ECONNREFUSED
+        return connect_ex(sock, address)
+
+    def guarded_getaddrinfo(host, *args, **kwargs):
+        if host not in LOCAL_HOSTS and host is not None:
+            refused.append([host, args[0] if args else None])
+            raise socket.gaierror(f"load test is offline: {host}")
+        return getaddrinfo(host, *args, **kwargs)
+
+    socket.socket.connect = guarded_connect
+    socket.socket.connect_ex = guarded_connect_ex
+    socket.getaddrinfo = guarded_getaddrinfo
+    try:
+        yield refused
+    finally:
+        socket.socket.connect, socket.socket.connect_ex = connect, connect_ex
+        socket.getaddrinfo = getaddrinfo
+
+
+# ----------------- SHARED SERVER STATE -----------------
+@contextlib.contextmanager
+def share_server_state():
+    """Make concurrent AppTests behave like sessions of one server.
+
+    `AppTest.run` changes process-wide state for the length of one run:
+    it installs its own mock Runtime singleton, and it turns on the
+    "global.appTest" option (under which widgets record what the test
+    client needs to read them back) by patching `config.get_option`. Both
+    are undone when the run returns, i.e. in the middle of every other
+    session's run. Each run also compiles the page afresh, while `ast.parse`
+    is not safe to run on several threads at once (Python 3.11).
+
+    So the Runtime stays available once one has been installed, the option
+    is on for the whole process, and all runs share one ScriptCache, which
+    compiles each script once under its lock. All of it is put back when
+    the block exits.
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import build_mock_config_get_option
+
+    saved = [(Runtime, "instance", Runtime.__dict__["instance"]),
+             (Runtime, "exists", Runtime.__dict__["exists"]),
+             (config, "get_option", config.get_option),
+             (app_test, "patch_config_options", app_test.patch_config_options),
+             (app_test, "ScriptCache", app_test.ScriptCache),
+             (local_script_runner, "ScriptCache", local_script_runner.ScriptCache)]
+    last = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+            return cls._instance
+        if "runtime" not in last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last["runtime"]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or "runtime" in last)
+    # With a Runtime around, every harness thread would warn that it has no session
+    logger = logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context")
+
+    def quiet(record):
+        return "missing ScriptRunContext" not in record.getMessage()
+
+    logger.addFilter(quiet)
+
+    config.get_option = build_mock_config_get_option({"global.appTest": True})
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    try:
+        yield
+    finally:
+        for owner, attr, value in saved:
+            setattr(owner, attr, value)
+        logger.removeFilter(quiet)
+
+
+def _rss_mb():
+    """Current resident set size of this process in MB (None if unknown)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    return None
+
+
+class ResourceMonitor:
+    """Samples this process' RSS every `interval` seconds and its CPU time."""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-test-monitor", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = _rss_mb()
+            if rss is not None:
+                self.samples.append(rss)
+
+    def __enter__(self):
+        self.rss_start = _rss_mb()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.cpu_seconds = time.process_time() - self.cpu_start
+        self.wall_seconds = time.perf_counter() - self.wall_start
+        self.rss_end = _rss_mb()
+
+    def report(self):
+        return {
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            # Above 100% means more than one core was busy
+            "cpu_percent": 100.0 * self.cpu_seconds / self.wall_seconds if self.wall_seconds else 0.0,
+            "rss_start_mb": self.rss_start,
+            "rss_peak_mb": max(self.samples, default=self.rss_end),
+            "rss_end_mb": self.rss_end,
+        }
+
+
+# ----------------- INPUTS -----------------
+def _bounds(page):
+    from feature_schema import CROP_BOUNDS, FERT_BOUNDS, SOIL_BOUNDS
+
+    return {"crop": CROP_BOUNDS, "fertilizer": FERT_BOUNDS, "soil": SOIL_BOUNDS}[page]
+
+
+def sample_inputs(page, n, jitter=0.0, seed=0):
+    """`n` form inputs for `page`: random rows of its CSV, numeric values
+    scaled by a random factor within 1 +/- jitter, clipped to the form bounds."""
+    from data_store import load_dataset
+
+    _, dataset, _, fields = PAGES[page]
+    data = load_dataset(dataset, list(fields.values()))
+    rng = np.random.default_rng(seed)
+    bounds = _bounds(page)
+    inputs = []
+    for i in rng.integers(0, len(data), n):
+        record = {}
+        for name, value in data.iloc[int(i)].items():
+            if name in bounds:
+                low, high = bounds[name]
+                value = float(np.clip(value * (1 + rng.uniform(-jitter, jitter)), low, high))
+                value = int(round(value)) if isinstance(low, int) else round(value, 2)
+            record[name] = value if isinstance(value, (int, float)) else str(value)
+        inputs.append(record)
+    return inputs
+
+
+def read_log(path):
+    """page -> list of input records from a replay log."""
+    records = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                records.setdefault(entry["page"], []).append(entry["inputs"])
+    return records
+
+
+def write_log(path, inputs):
+    with open(path, "w", encoding="utf-8") as f:
+        for page, records in inputs.items():
+            for record in records:
+                f.write(json.dumps({"page": page, "inputs": record}) + "\n")
+
+
+# ----------------- SESSIONS -----------------
+def fill_form(at, page, record):
+    """Set the page's form widgets (found by label) to `record`."""
+    fields = PAGES[page][3]
+    widgets = {w.label: w for w in list(at.number_input) + list(at.selectbox)}
+    for label, name in fields.items():
+        widget = widgets[label]
+        if hasattr(widget, "select"):
+            widget.select(record[name])
+        elif isinstance(widget.value, int):
+            widget.set_value(int(round(record[name])))
+        else:
+            widget.set_value(float(record[name]))
+
+
+def _page_errors(at):
+    return [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+
+
+def run_session(page, records, submits, think, timeout, result):
+    """One farmer: open `page` and submit its form with `submits` records."""
+    from streamlit.testing.v1 import AppTest
+
+    script, _, button, _ = PAGES[page]
+    try:
+        start = time.perf_counter()
+        at = AppTest.from_file(os.path.join(BASE_DIR, script), default_timeout=timeout).run()
+        result["load"].append(time.perf_counter() - start)
+        result["errors"] += _page_errors(at)
+        for i in range(submits):
+            fill_form(at, page, records[i % len(records)])
+            [b for b in at.button if b.label == button][0].click()
+            start = time.perf_counter()
+            at.run()
+            result["submit"].append(time.perf_counter() - start)
+            errors = _page_errors(at)
+            if not errors and not any(RESULT_MARKERS[page] in m.value for m in at.markdown):
+                errors = ["submit rendered no result"]
+            result["errors"] += errors
+            if think:
+                time.sleep(think)
+    except Exception as e:
+        # Raised by the test client itself; the rest of the session is lost
+        result["errors"].append(f"session aborted: {type(e).__name__}: {e}")
+
+
+def _percentiles(seconds):
+    if not seconds:
+        return {}
+    ms = np.asarray(seconds) * 1000.0
+    return {"p50": float(np.percentile(ms, 50)), "p90": float(np.percentile(ms, 90)),
+            "p95": float(np.percentile(ms, 95)), "p99": float(np.percentile(ms, 99)),
+            "max": float(ms.max())}
+
+
+def warm_up(pages, timeout=120.0):
+    """Open each page once, one after another; page -> seconds taken."""
+    from streamlit.testing.v1 import AppTest
+
+    cold = {}
+    for page in pages:
+        start = time.perf_counter()
+        at = AppTest.from_file(os.path.join(BASE_DIR, PAGES[page][0]), default_timeout=timeout).run()
+        cold[page] = time.perf_counter() - start
+        errors = _page_errors(at)
+        if errors:
+            raise RuntimeError(f"{page} page failed to load: {errors[0]}")
+    return cold
+
+
+def load_test(pages, sessions, submits, inputs, think=0.0, timeout=120.0):
+    """Run `sessions` concurrent sessions per page; returns the report."""
+    from micro_batch import batcher_stats
+    from prediction_cache import prediction_cache
+
+    cold = warm_up(pages, timeout)
+    results = {page: [] for page in pages}
+    threads = []
+    for page in pages:
+        records = inputs[page]
+        for s in range(sessions):
+            # Each session takes its own stretch of the input records
+            own = [records[(s * submits + i) % len(records)] for i in range(submits)]
+            result = {"load": [], "submit": [], "errors": []}
+            results[page].append(result)
+            threads.append(threading.Thread(target=run_session, name=f"{page}-session-{s}",
+                                            args=(page, own, submits, think, timeout, result)))
+
+    with ResourceMonitor() as monitor:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    report = {"sessions_per_page": sessions, "submits_per_session": submits, "think_seconds": think,
+              "pages": {}, "process": monitor.report()}
+    for page, page_results in results.items():
+        submit = [s for r in page_results for s in r["submit"]]
+        errors = [e for r in page_results for e in r["errors"]]
+        report["pages"][page] = {
+            "cold_start_ms": cold[page] * 1000.0,
+            "submits": len(submit),
+            "submits_per_second": len(submit) / monitor.wall_seconds if monitor.wall_seconds else 0.0,
+            "load_ms": _percentiles([s for r in page_results for s in r["load"]]),
+            "submit_ms": _percentiles(submit),
+            "errors": len(errors),
+            "error_samples": sorted(set(errors))[:5],
+        }
+    report["micro_batch"] = batcher_stats()
+    report["prediction_cache"] = prediction_cache.stats()
+    return report
+
+
+def _print_report(report):
+    process = report["process"]
+    print(f"{report['sessions_per_page']} sessions per page x {report['submits_per_session']} submits "
+          f"in {process['wall_seconds']:.1f}s\n")
+    print(f"{'page':<11} {'cold ms':>8} {'submits':>7} {'/s':>6} {'load p50':>9} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6}")
+    for page, r in report["pages"].items():
+        s = r["submit_ms"] or dict.fromkeys(["p50", "p90", "p95", "p99", "max"], float("nan"))
+        print(f"{page:<11} {r['cold_start_ms']:8.0f} {r['submits']:7d} {r['submits_per_second']:6.1f} "
+              f"{r['load_ms'].get('p50', float('nan')):9.0f} {s['p50']:8.0f} {s['p90']:8.0f} "
+              f"{s['p95']:8.0f} {s['p99']:8.0f} {s['max']:8.0f} {r['errors']:6d}")
+        for message in r["error_samples"]:
+            print(f"{'':<11} ! {message[:150]}")
+    print(f"\nCPU {process['cpu_seconds']:.1f}s ({process['cpu_percent']:.0f}% of one core), "
+          f"RSS {process['rss_start_mb']:.0f} -> peak {process['rss_peak_mb']:.0f} MB")
+    for name, s in report["micro_batch"].items():
+        print(f"micro-batch {name}: {s['requests']} requests in {s['batches']} batches "
+              f"(mean {s['mean_batch_size']:.1f}); batch sizes {s['batch_size_histogram']}")
+    cache = report["prediction_cache"]
+    print(f"prediction cache: {cache['hit_rate']:.0%} hits of {cache['hits'] + cache['disk_hits'] + cache['misses']}")
+    print(f"network calls refused: {len(report['network_refused'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent farmers on the prediction pages")
+    parser.add_argument("pages", nargs="*", metavar="page", help=f"any of {', '.join(PAGES)} (default: all)")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent sessions per page")
+    parser.add_argument("--submits", type=int, default=5, help="form submits per session")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds between a session's submits")
+    parser.add_argument("--jitter", type=float, default=0.05,
+                        help="relative noise on the CSV values (0 for the exact rows)")
+    parser.add_argument("--replay", help="JSONL input log to replay instead of sampling the CSVs")
+    parser.add_argument("--record", help="write the inputs used to this JSONL log")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds allowed per page run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args(argv)
+    unknown = set(args.pages) - set(PAGES)
+    if unknown:
+        parser.error(f"unknown page(s): {', '.join(sorted(unknown))}")
+    pages = args.pages or list(PAGES)
+
+    # Before any page imports animations.py
+    os.environ["AGRIFUSION_FETCH_ANIMATIONS"] = "0"
+    sys.path.insert(0, BASE_DIR)
+
+    if args.replay:
+        inputs = read_log(args.replay)
+        missing = [page for page in pages if not inputs.get(page)]
+        if missing:
+            parser.error(f"{args.replay} has no records for: {', '.join(missing)}")
+    else:
+        inputs = {page: sample_inputs(page, args.sessions * args.submits, args.jitter, args.seed)
+                  for page in pages}
+    if args.record:
+        write_log(args.record, {page: inputs[page] for page in pages})
+
+    with block_network() as refused, share_server_state():
+        report = load_test(pages, args.sessions, args.submits, inputs, args.think, args.timeout)
+    report["network_refused"] = refused
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ {args.output}")
+    return 0 if all(r["errors"] == 0 for r in report["pages"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
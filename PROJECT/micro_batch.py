@@ -0,0 +1,278 @@
+# Cross-session micro-batching of single-row predictions
+#
+#   python micro_batch.py [crop|fertilizer|soil] [--sessions 200] [--requests 20]
+#
+# Every Streamlit session runs its script on its own thread, and a form
+# submit is one `predict` call on one row. For the tree ensembles most of
+# such a call is fixed overhead (input checks, dispatch, XGBoost's DMatrix),
+# and concurrent calls queue on the GIL anyway.
+#
+# A MicroBatcher sits in front of one model. Callers put their rows on a
+# queue and wait on a Future; a worker thread takes the first request, keeps
+# collecting for up to BATCH_WAIT_MS (or until BATCH_MAX_ROWS rows), runs a
+# single `predict` on the stacked rows and resolves every caller's Future
+# with its own slice. A request on an idle server waits at most
+# BATCH_WAIT_MS. If a batched call fails, its requests are retried one by
+# one so an error only reaches the caller whose rows caused it.
+#
+# `stats()` reports the queue depth each request found and the size of each
+# batch as power-of-two histograms. AGRIFUSION_BATCH_MS=0 turns batching
+# off. The CLI compares direct calls with batched ones for N concurrent
+# sessions.
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+BATCH_WAIT_MS = float(os.environ.get("AGRIFUSION_BATCH_MS", "2"))
+BATCH_MAX_ROWS = int(os.environ.get("AGRIFUSION_BATCH_ROWS", "256"))
+
+TASKS = ["crop", "fertilizer", "soil"]
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def _bucket(n):
+    """Lower bound of n's power-of-two histogram bucket (1, 2, 4, 8, ...)."""
+    return 1 << (max(int(n), 1).bit_length() - 1)
+
+
+class _Request:
+    __slots__ = ("rows", "n_rows", "columns", "future", "enqueued")
+
+    def __init__(self, X):
+        columns = getattr(X, "columns", None)
+        self.columns = None if columns is None else tuple(columns)
+        # Converted on the caller's thread; the worker only stacks arrays
+        self.rows = np.atleast_2d(X.to_numpy(dtype=np.float64) if columns is not None
+                                  else np.asarray(X, dtype=np.float64))
+        self.n_rows = len(self.rows)
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """Runs `model.predict` on batches of concurrently submitted rows.
+
+    `predict(X)` blocks until the batch holding X has been scored and
+    returns X's predictions, so the batcher can stand in for the model.
+    """
+
+    def __init__(self, model, name, max_wait_ms=BATCH_WAIT_MS, max_rows=BATCH_MAX_ROWS):
+        self.model = model
+        self.name = name
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._counts = {"requests": 0, "rows": 0, "batches": 0, "retried": 0, "max_queue_depth": 0}
+        self._queue_depths = {}
+        self._batch_sizes = {}
+        # EarlyExitForest: credit the trees evaluated to the calling thread
+        self._counted = hasattr(model, "predict_counted")
+
+    def submit(self, X):
+        """Queue X (a DataFrame or 2-D array); returns a Future of its predictions."""
+        request = _Request(X)
+        depth = self._queue.qsize()
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=f"micro-batch-{self.name}",
+                                                daemon=True)
+                self._worker.start()
+            self._counts["requests"] += 1
+            self._counts["rows"] += request.n_rows
+            self._counts["max_queue_depth"] = max(self._counts["max_queue_depth"], depth)
+            self._queue_depths[_bucket(depth + 1)] = self._queue_depths.get(_bucket(depth + 1), 0) + 1
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, X):
+        predictions, trees = self.submit(X).result()
+        if trees:
+            from tree_engine import add_trees_evaluated
+
+            add_trees_evaluated(trees)
+        return predictions
+
+    # ----------------- WORKER -----------------
+    def _collect(self, first):
+        batch, rows = [first], first.n_rows
+        deadline = first.enqueued + self.max_wait
+        while rows < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            rows += request.n_rows
+        return batch
+
+    def _predict(self, requests):
+        """Predictions for the stacked rows of `requests` (same columns)."""
+        X = requests[0].rows if len(requests) == 1 else np.vstack([r.rows for r in requests])
+        if requests[0].columns is not None:
+            import pandas as pd
+
+            # One frame per batch, so models still see their feature names
+            X = pd.DataFrame(X, columns=list(requests[0].columns))
+        if self._counted:
+            return self.model.predict_counted(X)
+        return self.model.predict(X), None
+
+    def _resolve(self, requests):
+        try:
+            predictions, trees = self._predict(requests)
+        except Exception as e:
+            if len(requests) == 1:
+                requests[0].future.set_exception(e)
+                return
+            with self._lock:
+                self._counts["retried"] += len(requests)
+            for request in requests:
+                self._resolve([request])
+            return
+        start = 0
+        for request in requests:
+            end = start + request.n_rows
+            request.future.set_result((predictions[start:end],
+                                       0 if trees is None else int(np.sum(trees[start:end]))))
+            start = end
+
+    def _run(self):
+        while True:
+            batch = self._collect(self._queue.get())
+            with self._lock:
+                self._counts["batches"] += 1
+                self._batch_sizes[_bucket(len(batch))] = self._batch_sizes.get(_bucket(len(batch)), 0) + 1
+            # Rows can only be stacked with rows of the same columns
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.columns, []).append(request)
+            for requests in groups.values():
+                self._resolve(requests)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            counts["queue_depth_histogram"] = dict(sorted(self._queue_depths.items()))
+            counts["batch_size_histogram"] = dict(sorted(self._batch_sizes.items()))
+        counts["queue_depth"] = self._queue.qsize()
+        counts["mean_batch_size"] = counts["requests"] / counts["batches"] if counts["batches"] else 0.0
+        counts["max_wait_ms"] = self.max_wait * 1000.0
+        counts["max_rows"] = self.max_rows
+        return counts
+
+    def __getattr__(self, attr):
+        # classes_, cache_tag, explain, n_trees ... come from the model
+        return getattr(self.model, attr)
+
+
+def micro_batched(name, model):
+    """`model` behind a MicroBatcher registered as `name` (or `model` itself
+    when AGRIFUSION_BATCH_MS is 0)."""
+    if BATCH_WAIT_MS <= 0:
+        return model
+    batcher = MicroBatcher(model, name)
+    with _batchers_lock:
+        _batchers[name] = batcher
+    return batcher
+
+
+def batcher_stats():
+    """Model name -> MicroBatcher.stats() for every batcher in this process."""
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {name: batcher.stats() for name, batcher in batchers.items()}
+
+
+# ----------------- LOAD TEST -----------------
+def _session_rows(task, n):
+    from train import load_task
+
+    X, _, _ = load_task(task)
+    X = X.reset_index(drop=True)
+    return [X.iloc[[i % len(X)]] for i in range(n)]
+
+
+def _served_model(registry, task):
+    from decision_grid import with_decision_grid
+    from feature_schema import CROP_FEATURES
+    from tree_engine import with_early_exit
+
+    model = registry.get(task)
+    if task == "crop":
+        return with_early_exit("crop", CROP_FEATURES)(model)
+    if task == "fertilizer":
+        return with_decision_grid(registry)(model)
+    return model
+
+
+def load_test(model, rows, sessions, requests):
+    """Requests per second and latency percentiles (ms) for `sessions`
+    threads each predicting `requests` single rows one after another."""
+    latencies = [[] for _ in range(sessions)]
+    barrier = threading.Barrier(sessions + 1)
+
+    def session(i):
+        barrier.wait()
+        for j in range(requests):
+            start = time.perf_counter()
+            model.predict(rows[(i * requests + j) % len(rows)])
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    flat = np.concatenate([np.asarray(l) for l in latencies]) * 1000.0
+    return {"throughput": len(flat) / elapsed, "p50": float(np.percentile(flat, 50)),
+            "p95": float(np.percentile(flat, 95)), "p99": float(np.percentile(flat, 99))}
+
+
+def main(argv=None):
+    from model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Compare direct and micro-batched predictions under load")
+    parser.add_argument("tasks", nargs="*", metavar="task", help=f"any of {', '.join(TASKS)} (default: all)")
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent sessions (threads)")
+    parser.add_argument("--requests", type=int, default=20, help="single-row predictions per session")
+    parser.add_argument("--wait-ms", type=float, default=BATCH_WAIT_MS or 2.0)
+    parser.add_argument("--max-rows", type=int, default=BATCH_MAX_ROWS)
+    args = parser.parse_args(argv)
+    unknown = set(args.tasks) - set(TASKS)
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(sorted(unknown))}")
+
+    registry = ModelRegistry(artifact_dir=None)
+    print(f"{args.sessions} sessions x {args.requests} requests, "
+          f"batches of up to {args.wait_ms:g} ms / {args.max_rows} rows\n")
+    print(f"{'model':<11} {'mode':<8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for task in args.tasks or TASKS:
+        model = _served_model(registry, task)
+        rows = _session_rows(task, args.sessions * args.requests)
+        model.predict(rows[0])  # compile / warm up outside the timing
+        batcher = MicroBatcher(model, task, args.wait_ms, args.max_rows)
+        for mode, subject in [("direct", model), ("batched", batcher)]:
+            r = load_test(subject, rows, args.sessions, args.requests)
+            print(f"{task:<11} {mode:<8} {r['throughput']:9.0f} {r['p50']:8.2f} {r['p95']:8.2f} {r['p99']:8.2f}")
+        s = batcher.stats()
+        print(f"{'':<11} mean batch {s['mean_batch_size']:.1f} requests; "
+              f"batch sizes {s['batch_size_histogram']}; queue depths {s['queue_depth_histogram']}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
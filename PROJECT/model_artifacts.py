@@ -0,0 +1,338 @@
+# Memory-mappable model artifacts (.agm) that replace the pickles at start-up
+#
+#   python model_artifacts.py export     # pickles -> artifacts/*.agm
+#   python model_artifacts.py verify     # compare artifact vs pickle predictions
+#
+# File layout (little-endian):
+#   8 bytes   magic b"AGRIFUSN"
+#   4 bytes   format version (uint32)
+#   8 bytes   header length (uint64)
+#   header    UTF-8 JSON: model kind, metadata, encoder class tables, the
+#             hashes of the pickles it was exported from, the array table
+#             {name: dtype, shape, offset} and a SHA-256 of the data
+#   data      raw array buffers, each aligned to 64 bytes
+#
+# Loading maps the file read-only and wraps the buffers as NumPy views, so
+# a forest is usable without unpickling or copying its node arrays, and
+# worker processes on one host share the same page-cache pages. Every part
+# of the file is checked against its size before it is mapped, so a damaged
+# file raises ArtifactError and callers fall back to the pickle.
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from tree_engine import FlatForest
+
+MAGIC = b"AGRIFUSN"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+SUFFIX = ".agm"
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACT_DIR = os.path.join(BASE_DIR, "artifacts")
+
+# Model -> encoder artifacts stored inside it (the class tables travel with the model)
+MODEL_ENCODERS = {
+    "crop": [],
+    "fertilizer": ["le_soil", "le_crop", "le_fert"],
+    "soil": [],
+}
+ENCODER_OWNERS = {enc: model for model, encs in MODEL_ENCODERS.items() for enc in encs}
+
+_PREFIX = struct.Struct("<8sIQ")
+_FOREST_ARRAYS = ["feature", "threshold", "left", "right", "value", "roots"]
+
+
+class ArtifactError(ValueError):
+    """Raised for files that are not valid, current, intact .agm artifacts."""
+
+
+class LabelTable:
+    """LabelEncoder stand-in backed by a stored class table."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def transform(self, values):
+        values = np.asarray(values)
+        codes = np.searchsorted(self.classes_, values)
+        codes = np.clip(codes, 0, len(self.classes_) - 1)
+        unknown = self.classes_[codes] != values
+        if unknown.any():
+            raise ValueError(f"y contains previously unseen labels: {values[unknown].tolist()}")
+        return codes
+
+    def inverse_transform(self, codes):
+        return self.classes_[np.asarray(codes, dtype=np.int64)]
+
+
+class Artifact:
+    """A loaded artifact: the ready-to-use model, its encoders and header."""
+
+    def __init__(self, path, header, model, encoders):
+        self.path = path
+        self.header = header
+        self.model = model
+        self.encoders = encoders
+
+    def source_sha256(self, name):
+        """Hash of the pickle that registry entry `name` was exported from."""
+        return self.header["sources"].get(name, {}).get("sha256")
+
+
+def _align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _pack(kind, arrays, meta, encoders, sources):
+    """Serialize arrays + metadata into the .agm byte layout."""
+    table = {}
+    chunks = []
+    offset = 0
+    digest = hashlib.sha256()
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        data = array.tobytes()
+        padding = b"\0" * (_align(offset + len(data)) - offset - len(data))
+        table[name] = {"dtype": array.dtype.str, "shape": list(array.shape),
+                       "offset": offset, "nbytes": len(data)}
+        chunks += [data, padding]
+        digest.update(data)
+        offset += len(data) + len(padding)
+
+    checksum = digest.hexdigest()
+    header = {
+        "kind": kind,
+        "sha256": checksum,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "sources": {name: {"file": os.path.basename(path), "sha256": file_sha256(path)}
+                    for name, path in sources.items()},
+        "meta": meta,
+        "encoders": {name: [str(c) for c in classes] for name, classes in encoders.items()},
+        "arrays": table,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    # Pad the header so the data section starts on an aligned offset
+    data_start = _align(_PREFIX.size + len(header_bytes))
+    header_bytes += b" " * (data_start - _PREFIX.size - len(header_bytes))
+    return _PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)) + header_bytes + b"".join(chunks)
+
+
+def export_model(model, path, encoders=None, sources=None, meta=None):
+    """Write a fitted sklearn forest or XGBoost classifier (plus the class
+    tables of its encoders) as an .agm artifact. `sources` maps registry
+    names to the pickles they came from; their hashes let loaders detect a
+    stale export. `meta` is extra metadata for the header."""
+    encoders = {name: enc.classes_ for name, enc in (encoders or {}).items()}
+    if hasattr(model, "get_booster"):
+        import tempfile
+
+        # XGBoost's own UBJSON format keeps the sklearn wrapper attributes
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = os.path.join(tmp, "model.ubj")
+            model.save_model(tmp_path)
+            with open(tmp_path, "rb") as f:
+                raw = np.frombuffer(f.read(), dtype=np.uint8)
+        kind, arrays, model_meta = "xgboost", {"booster": raw}, {}
+    else:
+        forest = model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+        kind = "flat_forest"
+        arrays = {name: getattr(forest, name) for name in _FOREST_ARRAYS}
+        # Object arrays (string labels) cannot be stored as raw buffers
+        classes = forest.classes_
+        arrays["classes"] = classes.astype(str) if classes.dtype == object else classes
+        model_meta = {
+            "max_depth": forest.max_depth,
+            "feature_names": (None if forest.feature_names_in_ is None
+                              else [str(c) for c in forest.feature_names_in_]),
+        }
+
+    return write_artifact(path, kind, arrays, {**model_meta, **(meta or {})}, encoders, sources)
+
+
+def write_artifact(path, kind, arrays, meta, encoders=None, sources=None):
+    """Write named arrays and metadata as an .agm file of the given kind."""
+    data = _pack(kind, arrays, meta, encoders or {}, sources or {})
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)  # readers never see a half-written artifact
+    return path
+
+
+_HEADER_KEYS = ("kind", "sha256", "sources", "meta", "encoders", "arrays")
+
+
+def read_header(buffer):
+    if len(buffer) < _PREFIX.size:
+        raise ArtifactError("File is too small to be an artifact")
+    magic, version, header_len = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ArtifactError("Not an AgriFusion model artifact")
+    if version != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact format version {version} (expected {FORMAT_VERSION})")
+    if header_len > len(buffer) - _PREFIX.size:
+        raise ArtifactError("Artifact header is truncated")
+    try:
+        header = json.loads(bytes(buffer[_PREFIX.size:_PREFIX.size + header_len]))
+    except ValueError as e:  # also JSONDecodeError and UnicodeDecodeError
+        raise ArtifactError(f"Artifact header is not valid JSON: {e}") from None
+    if not isinstance(header, dict) or any(key not in header for key in _HEADER_KEYS):
+        raise ArtifactError("Artifact header is incomplete")
+    return header, _PREFIX.size + header_len
+
+
+def _array(buffer, data_start, name, spec):
+    """View of one array of the data section, checked against the file size."""
+    try:
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(int(n) for n in spec["shape"])
+        offset, nbytes = int(spec["offset"]), int(spec["nbytes"])
+    except (KeyError, TypeError, ValueError):
+        raise ArtifactError(f"Malformed entry for array '{name}'") from None
+    count = int(np.prod(shape))
+    if dtype.hasobject or dtype.itemsize == 0 or min(shape, default=0) < 0 or offset < 0:
+        raise ArtifactError(f"Malformed entry for array '{name}'")
+    if nbytes != count * dtype.itemsize or data_start + offset + nbytes > len(buffer):
+        raise ArtifactError(f"Array '{name}' does not fit in the file (truncated artifact?)")
+    if count == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + offset).reshape(shape)
+
+
+def load_artifact(path, verify=True):
+    """Map an .agm file and return an `Artifact` whose model is ready to predict.
+    Raises ArtifactError for anything that is not an intact artifact."""
+    with open(path, "rb") as f:
+        # mmap refuses empty files
+        if os.fstat(f.fileno()).st_size < _PREFIX.size:
+            raise ArtifactError(f"{path} is too small to be an artifact")
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header, data_start = read_header(buffer)
+    if not isinstance(header["arrays"], dict):
+        raise ArtifactError(f"Malformed array table in {path}")
+
+    arrays = {}
+    digest = hashlib.sha256() if verify else None
+    for name, spec in header["arrays"].items():
+        array = arrays[name] = _array(buffer, data_start, name, spec)
+        if digest:
+            digest.update(memoryview(array).cast("B"))
+    if digest and digest.hexdigest() != header["sha256"]:
+        raise ArtifactError(f"Checksum mismatch in {path}: file is corrupt or was modified")
+
+    try:
+        model = _build_model(header, arrays)
+        encoders = {name: LabelTable(classes) for name, classes in header["encoders"].items()}
+    except ArtifactError:
+        raise
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ArtifactError(f"{path} does not hold a valid {header['kind']} model: {e!r}") from None
+    return Artifact(path, header, model, encoders)
+
+
+def _build_model(header, arrays):
+    meta = header["meta"]
+    if header["kind"] == "flat_forest":
+        names = meta.get("feature_names")
+        model = FlatForest(
+            *(arrays[name] for name in _FOREST_ARRAYS),
+            max_depth=meta["max_depth"],
+            classes=arrays["classes"],
+            feature_names=None if names is None else np.asarray(names, dtype=object),
+        )
+    elif header["kind"] == "xgboost":
+        from xgboost import XGBClassifier
+
+        model = XGBClassifier()
+        model.load_model(bytearray(arrays["booster"]))
+    elif header["kind"] == "decision_grid":
+        from decision_grid import grid_from_arrays
+
+        model = grid_from_arrays(arrays)
+    elif header["kind"] == "rule_list":
+        from rule_model import rules_from_arrays
+
+        model = rules_from_arrays(arrays, header["encoders"])
+    else:
+        raise ArtifactError(f"Unknown artifact kind '{header['kind']}'")
+    return model
+
+
+def artifact_path(name, artifact_dir=ARTIFACT_DIR):
+    """Path of the artifact holding registry entry `name` (encoders live in their model's file)."""
+    return os.path.join(artifact_dir, ENCODER_OWNERS.get(name, name) + SUFFIX)
+
+
+def export_all(registry, artifact_dir=ARTIFACT_DIR):
+    paths = []
+    for name, encoder_names in MODEL_ENCODERS.items():
+        encoders = {enc: registry.get(enc) for enc in encoder_names}
+        sources = {entry: registry.path(entry) for entry in [name] + encoder_names}
+        path = export_model(registry.get(name), artifact_path(name, artifact_dir),
+                            encoders, sources)
+        paths.append(path)
+    return paths
+
+
+def verify_all(registry, datasets, artifact_dir=ARTIFACT_DIR):
+    """Predict every dataset row with pickle and artifact; return mismatch counts."""
+    mismatches = {}
+    for name, X in datasets.items():
+        artifact = load_artifact(artifact_path(name, artifact_dir))
+        expected = registry.get(name).predict(X)
+        mismatches[name] = int((np.asarray(artifact.model.predict(X)) != expected).sum())
+    return mismatches
+
+
+def main(argv=None):
+    from data_store import load_dataset
+    from feature_schema import CROP_FEATURES, FERT_FEATURES, SOIL_FEATURES
+    from model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Export or verify .agm model artifacts")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--dir", default=ARTIFACT_DIR, help="artifact directory")
+    args = parser.parse_args(argv)
+
+    # Always read the pickles here, never previously exported artifacts
+    registry = ModelRegistry(artifact_dir=None)
+    if args.command == "export":
+        for path in export_all(registry, args.dir):
+            with open(path, "rb") as f:
+                header, _ = read_header(f.read())
+            print(f"✅ {path} ({os.path.getsize(path):,} bytes, sha256 {header['sha256'][:12]})")
+        return 0
+
+    fert = load_dataset("fertilizer", FERT_FEATURES)
+    for col, enc in [("Soil Type", "le_soil"), ("Crop Type", "le_crop")]:
+        fert[col] = registry.get(enc).transform(fert[col].astype(str))
+    datasets = {
+        "crop": load_dataset("crop", CROP_FEATURES),
+        "fertilizer": fert,
+        "soil": load_dataset("soil", SOIL_FEATURES),
+    }
+    mismatches = verify_all(registry, datasets, args.dir)
+    for name, n in mismatches.items():
+        print(f"{'✅' if n == 0 else '❌'} {name}: {n} mismatching predictions")
+    return 0 if not any(mismatches.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+# Shared model registry for all AgriFusion pages
+#
+# Every page imports the same `registry` object. Streamlit re-executes the
+# page scripts on each interaction, but imported modules stay in
+# sys.modules, so each pickle is unpickled at most once per server process.
+#
+# When `python model_artifacts.py export` has been run, models are mapped
+# from the .agm artifacts in artifacts/ instead of being unpickled, as long
+# as each artifact was exported from the pickle currently on disk. A model
+# installed by `forest_compression.py --install` answers differently from
+# its pickle, so its version names the compressed artifact as well.
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from model_artifacts import (
+    ARTIFACT_DIR, ENCODER_OWNERS, ArtifactError, artifact_path, file_sha256, load_artifact,
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Artifact name -> pickle file (relative to the project folder)
+ARTIFACTS = {
+    "crop": "crop_recommendation_model.pkl",
+    "fertilizer": "fertilizer_model.pkl",
+    "soil": "soil_fertility_model.pkl",
+    "le_soil": "le_soil.pkl",
+    "le_crop": "le_crop.pkl",
+    "le_fert": "le_fert.pkl",
+}
+
+
+def object_size(obj, _seen=None):
+    """Approximate in-memory size of a fitted model, following NumPy buffers
+    and the state of extension objects such as sklearn trees."""
+    if _seen is None:
+        _seen = {}
+    if id(obj) in _seen:
+        return 0
+    # Keep a reference so temporary __getstate__ results are not freed and
+    # their ids reused while we are still walking
+    _seen[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        size = sys.getsizeof(obj)
+        if obj.base is None:
+            return size
+        if isinstance(obj.base, np.ndarray):
+            return size + object_size(obj.base, _seen)
+        # View over a buffer owned by an extension object (e.g. a sklearn Tree)
+        return size + obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(object_size(k, _seen) + object_size(v, _seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(object_size(item, _seen) for item in obj)
+    if hasattr(obj, "save_raw"):
+        # XGBoost Booster: the trees live in native memory behind a handle
+        return size + len(obj.save_raw())
+    if hasattr(obj, "__dict__"):
+        return size + object_size(vars(obj), _seen)
+    if hasattr(obj, "__getstate__"):
+        try:
+            state = obj.__getstate__()
+        except Exception:
+            return size
+        if state is not obj:
+            return size + object_size(state, _seen)
+    return size
+
+
+class ModelRegistry:
+    """Lazily loads each artifact on first use and keeps one copy per process."""
+
+    def __init__(self, artifacts=None, base_dir=BASE_DIR, artifact_dir=ARTIFACT_DIR):
+        self.artifacts = dict(ARTIFACTS if artifacts is None else artifacts)
+        self.base_dir = base_dir
+        self.artifact_dir = artifact_dir
+        self._objects = {}
+        self._derived = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        # One lock per artifact / derived object: a slow load or build only
+        # holds up sessions waiting for that same object
+        self._key_locks = {}
+
+    def path(self, name: str) -> str:
+        if name not in self.artifacts:
+            raise KeyError(f"Unknown artifact '{name}'. Known: {sorted(self.artifacts)}")
+        return os.path.join(self.base_dir, self.artifacts[name])
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def get(self, name: str):
+        # Fast path: already loaded, no locking needed
+        obj = self._objects.get(name)
+        if obj is not None:
+            return obj
+
+        with self._key_lock(name):
+            # Another session may have loaded it while we waited
+            obj = self._objects.get(name)
+            if obj is not None:
+                return obj
+
+            start = time.perf_counter()
+            obj, path, info = self._load(name)
+            load_seconds = time.perf_counter() - start
+
+            stats = {
+                **info,
+                "path": path,
+                "file_bytes": os.path.getsize(path),
+                "memory_bytes": object_size(obj),
+                "load_seconds": load_seconds,
+                "loaded_at": time.time(),
+            }
+            with self._lock:
+                self._stats[name] = stats
+                self._objects[name] = obj
+            return obj
+
+    def _load(self, name):
+        """Load `name` from its .agm artifact when it is current, else from the pickle."""
+        pickle_path = self.path(name)
+        if self.artifact_dir:
+            path = artifact_path(name, self.artifact_dir)
+            if os.path.exists(path):
+                try:
+                    artifact = load_artifact(path)
+                except ArtifactError:
+                    artifact = None
+                source_sha = artifact and artifact.source_sha256(name)
+                pickle_sha = file_sha256(pickle_path) if os.path.exists(pickle_path) else source_sha
+                if source_sha and pickle_sha == source_sha:
+                    if name in ENCODER_OWNERS:
+                        return artifact.encoders[name], path, {"format": "agm", "model_version": source_sha[:12]}
+                    version = source_sha[:12]
+                    if "compression" in artifact.header["meta"]:
+                        version += "+compressed-" + artifact.header["sha256"][:8]
+                    return artifact.model, path, {"format": "agm", "model_version": version}
+
+        import joblib  # only needed when there is no current .agm artifact
+
+        obj = joblib.load(pickle_path)
+        return obj, pickle_path, {"format": "pickle", "model_version": file_sha256(pickle_path)[:12]}
+
+    def model_version(self, name: str) -> str:
+        """Short hash of the trained model's pickle, whichever format it was
+        loaded from (plus the artifact's hash for a compressed forest)."""
+        self.get(name)
+        return self._stats[name]["model_version"]
+
+    def derive(self, name: str, kind: str, build):
+        """Cache `build(model)` - e.g. a compiled form of a model - once per
+        process. `build` may use the registry (other models, other derived
+        objects), just not the object it is building."""
+        key = (name, kind)
+        obj = self._derived.get(key)
+        if obj is not None:
+            return obj
+
+        model = self.get(name)
+        with self._key_lock(key):
+            obj = self._derived.get(key)
+            if obj is None:
+                obj = build(model)
+                with self._lock:
+                    self._derived[key] = obj
+            return obj
+
+    def get_many(self, *names):
+        return tuple(self.get(name) for name in names)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._objects
+
+    def preload(self, names=None):
+        for name in names or self.artifacts:
+            self.get(name)
+
+    def stats(self):
+        """Load time and approximate memory size for every loaded artifact."""
+        with self._lock:
+            return {name: dict(info) for name, info in self._stats.items()}
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+            self._derived.clear()
+            self._stats.clear()
+
+
+# Process-wide instance shared by every page
+registry = ModelRegistry()
@@ -0,0 +1,171 @@
+# Soil -> crop -> fertilizer in one pass per stage
+#
+# One field record carries every input once; N, P and K, pH, temperature
+# and humidity are shared between the models. N, P and K are soil-lab
+# readings: the soil model takes them as they are, and the crop and
+# fertilizer models get them mapped onto their own datasets' scales
+# (SOIL_TO_CROP_NPK, SOIL_TO_FERT_NPK - a heuristic rescaling, not a unit
+# conversion). PIPELINE_BOUNDS are the readings every stage accepts.
+# `mapped_npk` gives the values each model is given. For a batch of fields each stage runs as one
+# vectorized call:
+#
+#   soil        fertility class + nutrient warnings   (soil model)
+#   crop        recommended crop                      (crop model)
+#   fertilizer  fertilizer for that crop              (fertilizer model, crop
+#               type encoded with le_crop)
+#
+# Each stage keeps its own bounds checks; a row rejected by one stage still
+# goes through the others unless it depends on them (no crop -> no
+# fertilizer). Crops the fertilizer model was not trained on get an empty
+# `Crop Type` and no fertilizer, without an error.
+import math
+import time
+
+import numpy as np
+
+from batch_scoring import (
+    FertilizerBatch, check_columns, finish_errors, score_crop_chunk, score_csv, score_soil_chunk,
+)
+from decision_grid import with_decision_grid
+from feature_schema import (
+    CROP_BOUNDS, CROP_TO_FERT_CROP, FERT_BOUNDS, FERT_FEATURES, SOIL_BOUNDS, SOIL_FEATURES,
+    SOIL_TO_CROP_NPK, SOIL_TO_FERT_NPK,
+)
+from lazy_imports import lazy_module
+from tree_engine import as_flat_forest
+
+pd = lazy_module("pandas")  # imported on first use, not with the page
+
+# Columns of a field record
+PIPELINE_FEATURES = SOIL_FEATURES + ["temperature", "humidity", "rainfall", "Moisture", "Soil Type"]
+
+STAGES = ["soil", "crop", "fertilizer"]
+
+# Fertilizer model column of each soil-lab nutrient
+FERT_NPK_COLUMNS = {"N": "Nitrogen", "P": "Phosphorous", "K": "Potassium"}
+
+
+def rescale(values, scale):
+    """Map `values` linearly from scale[0] = (min, max) onto scale[1]."""
+    (low, high), (to_low, to_high) = scale
+    return to_low + (values - low) * (to_high - to_low) / (high - low)
+
+
+def mapped_npk(table):
+    """N, P and K of field records as the soil, crop and fertilizer models
+    get them: stage -> DataFrame with the model's column names."""
+    return {
+        "soil": table[["N", "P", "K"]],
+        "crop": pd.DataFrame({n: rescale(table[n], SOIL_TO_CROP_NPK[n]) for n in ["N", "P", "K"]}),
+        "fertilizer": pd.DataFrame({FERT_NPK_COLUMNS[n]: rescale(table[n], SOIL_TO_FERT_NPK[n])
+                                    for n in ["N", "P", "K"]}),
+    }
+
+
+def _soil_range(scale, bounds):
+    """Soil-lab readings that `scale` maps into `bounds`."""
+    low, high = rescale(np.asarray(bounds, dtype=float), scale[::-1])
+    return float(low), float(high)
+
+
+def _overlap(*ranges):
+    """Intersection of `ranges`, narrowed to two decimals for the form."""
+    low, high = max(r[0] for r in ranges), min(r[1] for r in ranges)
+    return (math.ceil(round(low * 100, 6)) / 100, math.floor(round(high * 100, 6)) / 100)
+
+
+# (min, max) of each field reading that all three stages accept
+PIPELINE_BOUNDS = {
+    **{nutrient: _overlap(SOIL_BOUNDS[nutrient],
+                          _soil_range(SOIL_TO_CROP_NPK[nutrient], CROP_BOUNDS[nutrient]),
+                          _soil_range(SOIL_TO_FERT_NPK[nutrient], FERT_BOUNDS[FERT_NPK_COLUMNS[nutrient]]))
+       for nutrient in ["N", "P", "K"]},
+    **{col: SOIL_BOUNDS[col] for col in SOIL_FEATURES[4:]},
+    "Ph": _overlap(SOIL_BOUNDS["Ph"], CROP_BOUNDS["ph"]),
+    "temperature": _overlap(CROP_BOUNDS["temperature"], FERT_BOUNDS["Temperature"]),
+    "humidity": _overlap(CROP_BOUNDS["humidity"], FERT_BOUNDS["Humidity"]),
+    "rainfall": CROP_BOUNDS["rainfall"],
+    "Moisture": FERT_BOUNDS["Moisture"],
+}
+
+
+class FieldPipeline:
+    """Runs the three models over a table of field records."""
+
+    def __init__(self, soil_model, crop_model, fertilizer):
+        self.soil_model = soil_model
+        self.crop_model = crop_model
+        self.fertilizer = fertilizer
+
+    @classmethod
+    def from_registry(cls, registry):
+        return cls(
+            registry.get("soil"),
+            registry.derive("crop", "flat", as_flat_forest),
+            FertilizerBatch.from_registry(
+                registry, model=registry.derive("fertilizer", "grid", with_decision_grid(registry))),
+        )
+
+    def run(self, table):
+        """Return (`table` with the results of every stage, seconds per stage)."""
+        check_columns(table.columns, PIPELINE_FEATURES)
+        table = table.reset_index(drop=True)
+        timings = {}
+
+        npk = mapped_npk(table)
+        start = time.perf_counter()
+        soil, _ = score_soil_chunk(self.soil_model, table[SOIL_FEATURES])
+        timings["soil"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        crop_input = table[["temperature", "humidity", "rainfall"]].assign(ph=table["Ph"], **npk["crop"])
+        crop, _ = score_crop_chunk(self.crop_model, crop_input)
+        timings["crop"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fert_crop = crop["predicted_crop"].str.lower().map(CROP_TO_FERT_CROP)
+        fert_input = pd.DataFrame({
+            "Temperature": table["temperature"],
+            "Humidity": table["humidity"],
+            "Moisture": table["Moisture"],
+            "Soil Type": table["Soil Type"],
+            "Crop Type": fert_crop.fillna(""),
+            **npk["fertilizer"],
+        })[FERT_FEATURES]
+        has_crop = fert_crop.notna().to_numpy()
+        fertilizer = np.full(len(table), "", dtype=object)
+        fert_errors = np.where(crop["error"] != "", "no crop recommendation", "").astype(object)
+        if has_crop.any():
+            scored, _ = self.fertilizer.recommend(fert_input[has_crop])
+            fertilizer[has_crop] = scored["Recommended Fertilizer"].to_numpy()
+            fert_errors[has_crop] = scored["error"].to_numpy()
+        timings["fertilizer"] = time.perf_counter() - start
+
+        result = table.copy()
+        result["fertility_label"] = soil["fertility_label"].to_numpy()
+        result["warnings"] = soil["warnings"].to_numpy()
+        result["soil_error"] = soil["error"].to_numpy()
+        result["predicted_crop"] = crop["predicted_crop"].to_numpy()
+        result["crop_error"] = crop["error"].to_numpy()
+        result["Crop Type"] = fert_crop.fillna("").to_numpy()
+        result["Recommended Fertilizer"] = fertilizer
+        result["fertilizer_error"] = fert_errors
+        timings["total"] = sum(timings[stage] for stage in STAGES)
+        return result, timings
+
+    def score_chunk(self, chunk):
+        """`score_csv` adapter: `error` lists the failed stages; a row counts
+        as scored when every stage succeeded."""
+        result, _ = self.run(chunk)
+        error = pd.Series("", index=result.index, dtype=object)
+        for stage in STAGES:
+            failed = result[f"{stage}_error"] != ""
+            error[failed] = error[failed] + stage + " stage failed; "
+        result["error"] = finish_errors(error).to_numpy()
+        return result, int((result["error"] == "").sum())
+
+
+def score_pipeline_csv(pipeline, source, output_path, **kwargs):
+    """Run a CSV (or Excel) file of field records through the pipeline (see `score_csv`)."""
+    return score_csv(source, output_path, PIPELINE_FEATURES, pipeline.score_chunk,
+                     count_by="predicted_crop", **kwargs)
@@ -0,0 +1,191 @@
+# Prediction cache shared by every page and the inference service
+#
+# Keys are (model name, model version, normalized feature row). The models
+# only ever see float32 inputs (sklearn trees and XGBoost both round to
+# float32), so rows are normalized to their float32 bytes: 50, 50.0 and
+# 50.000000001 share one entry and still get exactly the model's answer.
+#
+# Two tiers:
+#   memory  an LRU of at most `max_entries` rows per process
+#   disk    optional SQLite file that survives restarts; enable it with
+#           AGRIFUSION_PREDICTION_CACHE=/path/to/cache.sqlite (or
+#           `inference_service.py --cache-db`)
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from micro_batch import micro_batched
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+class PredictionCache:
+    """LRU prediction cache with an optional persistent SQLite tier."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, disk_path=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.disk_path = None
+        self._counts = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if disk_path:
+            self.attach_disk(disk_path)
+
+    def attach_disk(self, path):
+        """Persist entries to the SQLite file at `path` (created if missing)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " model TEXT, version TEXT, features BLOB, value TEXT,"
+            " PRIMARY KEY (model, version, features)) WITHOUT ROWID"
+        )
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+            self._db = db
+            self.disk_path = path
+
+    def prune(self, model, version):
+        """Drop on-disk entries of `model` from other trained versions.
+
+        Tagged variants of the same version ("<sha>+<tag>", see
+        `cached_predictor`) are kept: other processes sharing the file may
+        still serve them."""
+        base = version.split("+", 1)[0]
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM predictions WHERE model = ? AND version != ? AND substr(version, 1, ?) != ?",
+                    (model, base, len(base) + 1, base + "+"))
+
+    def _lookup(self, key):
+        # Caller holds the lock
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self._counts["hits"] += 1
+            return value
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT value FROM predictions WHERE model = ? AND version = ? AND features = ?", key
+            ).fetchone()
+            if row is not None:
+                value = json.loads(row[0])
+                self._remember(key, value)
+                self._counts["disk_hits"] += 1
+                return value
+        self._counts["misses"] += 1
+        return None
+
+    def _remember(self, key, value):
+        # Caller holds the lock
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counts["evictions"] += 1
+
+    def predict(self, model_name, version, predict, X):
+        """`predict(X)` row by row through the cache.
+
+        Rows that miss both tiers are predicted together in a single call
+        on the matching rows of `X` (a DataFrame or array)."""
+        rows = X.to_numpy(dtype=np.float32) if hasattr(X, "to_numpy") else np.asarray(X, dtype=np.float32)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        keys = [(model_name, version, row.tobytes()) for row in np.ascontiguousarray(rows)]
+
+        results = [None] * len(keys)
+        missing = {}  # key -> positions of rows needing a prediction
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in missing:
+                    missing[key].append(i)
+                    continue
+                value = self._lookup(key)
+                if value is None:
+                    missing[key] = [i]
+                else:
+                    results[i] = value
+
+        if missing:
+            first = [positions[0] for positions in missing.values()]
+            subset = X.iloc[first] if hasattr(X, "iloc") else np.asarray(X).reshape(len(keys), -1)[first]
+            values = [v.item() if hasattr(v, "item") else v for v in predict(subset)]
+            with self._lock:
+                for (key, positions), value in zip(missing.items(), values):
+                    self._remember(key, value)
+                    for i in positions:
+                        results[i] = value
+                if self._db is not None:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                        [key + (json.dumps(value),) for key, value in zip(missing, values)],
+                    )
+        return np.asarray(results)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            counts["entries"] = len(self._entries)
+            counts["max_entries"] = self.max_entries
+            counts["disk_path"] = self.disk_path
+        lookups = counts["hits"] + counts["disk_hits"] + counts["misses"]
+        counts["hit_rate"] = (counts["hits"] + counts["disk_hits"]) / lookups if lookups else 0.0
+        return counts
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            for name in self._counts:
+                self._counts[name] = 0
+            if disk and self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+
+
+class CachedModel:
+    """Wraps a fitted model so `predict` goes through a `PredictionCache`."""
+
+    def __init__(self, model, name, version, cache):
+        self.model = model
+        self.name = name
+        self.version = version
+        self.cache = cache
+
+    def predict(self, X):
+        return self.cache.predict(self.name, self.version, self.model.predict, X)
+
+    def __getattr__(self, attr):
+        # classes_, feature_names_in_, predict_proba ... come from the model
+        return getattr(self.model, attr)
+
+
+def cached_predictor(registry, name, build=None, batch=False):
+    """Registry model `name` (or `build(model)`, e.g. its flat forest) behind
+    the shared prediction cache, built once per process. With `batch`, cache
+    misses from concurrent sessions are predicted together (micro_batch.py)."""
+    def wrap(model):
+        served = build(model) if build else model
+        version = registry.model_version(name)
+        # A stand-in that may answer differently (e.g. distilled rules) gets its own entries
+        tag = getattr(served, "cache_tag", None)
+        if tag:
+            version = f"{version}+{tag}"
+        prediction_cache.prune(name, version)
+        if batch:
+            served = micro_batched(name, served)
+        return CachedModel(served, name, version, prediction_cache)
+
+    return registry.derive(name, "batched" if batch else "cached", wrap)
+
+
+# Process-wide instance shared by every page
+prediction_cache = PredictionCache(disk_path=os.environ.get("AGRIFUSION_PREDICTION_CACHE"))
@@ -0,0 +1,223 @@
+# PDF reports for single predictions and for whole scored files
+#
+# A single prediction's report is rendered only when its download button is
+# clicked (Streamlit calls the deferred `data` callable), in PDF, CSV or
+# JSON. Rendered files are cached per process by a hash of the report
+# content, so downloading the same report again costs nothing.
+#
+# A bulk job reads a scored CSV (the output of `batch_scoring.score_csv`) in
+# chunks, renders the reports on a process pool and appends every finished
+# PDF to a zip file on disk, so only the reports of the tasks in flight are
+# ever held in memory. Workers are started with "spawn": forking the
+# multi-threaded Streamlit server is not safe.
+import functools
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from lazy_imports import lazy_module
+
+pd = lazy_module("pandas")  # imported on first use, not with the page
+
+# Report kind -> (title, scored column used in the file names)
+REPORT_KINDS = {
+    "soil": ("Soil Fertility Report", "fertility_label"),
+    "fertilizer": ("Fertilizer Recommendation Report", "Recommended Fertilizer"),
+    "field": ("Field Analysis Report", "predicted_crop"),
+}
+
+# Format -> (MIME type, button label)
+REPORT_FORMATS = {
+    "pdf": ("application/pdf", "📄 PDF"),
+    "csv": ("text/csv", "📊 CSV"),
+    "json": ("application/json", "🧾 JSON"),
+}
+# Rendered single reports kept per process
+MAX_CACHED_REPORTS = 512
+
+# Fields per worker task when writing one PDF per field
+TASK_SIZE = 50
+# Fields per file when writing multi-page PDFs
+PART_SIZE = 500
+READ_CHUNKSIZE = 5_000
+
+
+def _latin1(value):
+    # The core PDF fonts only cover latin-1 (emoji labels, stray unicode)
+    return str(value).encode("latin-1", "ignore").decode("latin-1").strip()
+
+
+def add_report_page(pdf, title, data):
+    pdf.add_page()
+    pdf.set_font("Arial", size=16)
+    pdf.cell(200, 10, txt=title, ln=1, align="C")
+    pdf.ln(10)
+    pdf.set_font("Arial", size=12)
+    for key, value in data.items():
+        pdf.cell(200, 8, txt=_latin1(f"{key}: {value}"), ln=1)
+        pdf.ln(2)
+
+
+def report_pdf(kind, records):
+    """PDF bytes with one report page per record (a dict of label -> value)."""
+    from fpdf import FPDF  # only when a report is actually rendered
+
+    title = REPORT_KINDS[kind][0]
+    pdf = FPDF()
+    for data in records:
+        add_report_page(pdf, title, data)
+    return pdf.output(dest="S").encode("latin1")
+
+
+def _slug(value):
+    return re.sub(r"[^A-Za-z0-9]+", "_", _latin1(value)).strip("_") or "report"
+
+
+def _render_task(kind, first_row, records, per_field):
+    """Worker: [(file name, PDF bytes)] for one slice of the scored file."""
+    if not per_field:
+        last_row = first_row + len(records) - 1
+        return [(f"{kind}_reports_{first_row:06d}-{last_row:06d}.pdf", report_pdf(kind, records))]
+    label_column = REPORT_KINDS[kind][1]
+    return [(f"{first_row + i:06d}_{_slug(data.get(label_column) or 'flagged')}.pdf", report_pdf(kind, [data]))
+            for i, data in enumerate(records)]
+
+
+def _report_records(chunk):
+    records = chunk.to_dict("records")
+    for data in records:
+        if not data.get("error"):
+            data.pop("error", None)
+    return records
+
+
+def _iter_tasks(source, per_field, chunksize=READ_CHUNKSIZE):
+    """(first row number, records) slices of the scored file, 1-based rows."""
+    size = TASK_SIZE if per_field else PART_SIZE
+    row = 1
+    pending = []
+    # Read as text so reports show the values exactly as in the scored file
+    for chunk in pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False):
+        pending.extend(_report_records(chunk))
+        while len(pending) >= size:
+            yield row, pending[:size]
+            row += size
+            pending = pending[size:]
+    if pending:
+        yield row, pending
+
+
+def write_report_zip(source, zip_path, kind, per_field=True, workers=None, progress=None):
+    """Render a report for every row of the scored file `source` into the
+    zip file `zip_path`: one PDF per field, or multi-page PDFs of PART_SIZE
+    fields. `progress(fields_done)` is called as tasks finish.
+
+    Returns a summary dict. If the caller is interrupted (e.g. the page is
+    rerun to cancel), queued tasks are dropped and the exception propagates.
+    """
+    if kind not in REPORT_KINDS:
+        raise ValueError(f"Unknown report kind '{kind}'")
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    fields = files = 0
+    in_flight = deque()
+
+    pool = ProcessPoolExecutor(workers, mp_context=get_context("spawn"))
+    try:
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+
+            def collect(future, n_records):
+                nonlocal fields, files
+                for name, pdf in future.result():
+                    archive.writestr(name, pdf)
+                    files += 1
+                fields += n_records
+                if progress:
+                    progress(fields)
+
+            for first_row, records in _iter_tasks(source, per_field):
+                in_flight.append((pool.submit(_render_task, kind, first_row, records, per_field), len(records)))
+                # Keep a couple of tasks per worker queued, no more
+                if len(in_flight) >= 2 * workers:
+                    collect(*in_flight.popleft())
+            while in_flight:
+                collect(*in_flight.popleft())
+    finally:
+        pool.shutdown(wait=not in_flight, cancel_futures=True)
+
+    return {"fields": fields, "files": files, "bytes": os.path.getsize(zip_path),
+            "seconds": time.perf_counter() - start}
+
+
+# ----------------- SINGLE REPORTS -----------------
+_rendered = OrderedDict()
+_rendered_lock = threading.Lock()
+_render_stats = {"hits": 0, "renders": 0}
+
+
+def report_hash(kind, data):
+    """Content hash of a report: same kind and same values -> same file."""
+    payload = json.dumps([kind, data], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _render(kind, data, fmt):
+    if fmt == "pdf":
+        return report_pdf(kind, [data])
+    if fmt == "csv":
+        out = io.StringIO()
+        pd.DataFrame([data]).to_csv(out, index=False)
+        return out.getvalue().encode("utf-8")
+    if fmt == "json":
+        return json.dumps({"report": REPORT_KINDS[kind][0], **data}, indent=2, default=str,
+                          ensure_ascii=False).encode("utf-8")
+    raise ValueError(f"Unknown report format '{fmt}'")
+
+
+def render_report(kind, data, fmt="pdf"):
+    """Bytes of a single-record report in `fmt`, cached by content hash."""
+    key = (fmt, report_hash(kind, data))
+    with _rendered_lock:
+        if key in _rendered:
+            _rendered.move_to_end(key)
+            _render_stats["hits"] += 1
+            return _rendered[key]
+    content = _render(kind, data, fmt)
+    with _rendered_lock:
+        _rendered[key] = content
+        _render_stats["renders"] += 1
+        while len(_rendered) > MAX_CACHED_REPORTS:
+            _rendered.popitem(last=False)
+    return content
+
+
+def report_cache_info():
+    with _rendered_lock:
+        return {**_render_stats, "entries": len(_rendered)}
+
+
+def render_report_downloads(kind, data, file_stem, use_container_width=False):
+    """One download button per format. Nothing is rendered until a button
+    is clicked, and a click does not rerun the page."""
+    import streamlit as st
+
+    data = dict(data)
+    for fmt, col in zip(REPORT_FORMATS, st.columns(len(REPORT_FORMATS))):
+        mime, label = REPORT_FORMATS[fmt]
+        with col:
+            st.download_button(
+                label,
+                functools.partial(render_report, kind, data, fmt),
+                f"{file_stem}.{fmt}",
+                mime,
+                on_click="ignore",
+                use_container_width=use_container_width
+            )
@@ -0,0 +1,400 @@
+# Readable fertilizer rules distilled from the random forest
+#
+#   python rule_model.py build [--max-depth 7] [--min-agreement 0.99] [--samples 400000]
+#   python rule_model.py show
+#
+# The forest's 100 trees cannot be audited by hand. This tool samples the
+# form's whole input domain (every soil and crop type, the FERT_BOUNDS
+# ranges, climate values at the form's 0.01 step), labels the samples with
+# the forest and fits one shallow decision tree to those labels. Every leaf
+# of that tree is a box over the inputs, i.e. a rule such as
+#
+#   IF Crop Type is Paddy AND Nitrogen >= 26 THEN Urea
+#
+# A second, independent sample measures each rule's agreement with the
+# forest. Only rules that agree on at least `min_agreement` of their inputs
+# are kept; sibling rules with the same answer are merged. Inputs no kept
+# rule covers (and inputs outside the form's domain) go to the fallback -
+# the decision grid or the flat forest - so the rules are a fast path, not a
+# replacement. A third sample reports the coverage and agreement that are
+# stored with the rules.
+#
+# The rules are written as an .agm artifact of kind "rule_list". The
+# fertilizer page and the inference service use them only while the artifact
+# was built from the current fertilizer pickle and its measured agreement
+# meets MIN_AGREEMENT (`with_rule_model`).
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from decision_grid import with_decision_grid
+from feature_schema import FERT_BOUNDS, FERT_FEATURES
+from model_artifacts import ARTIFACT_DIR, ArtifactError, load_artifact, write_artifact
+from tree_engine import as_flat_forest
+
+RULES_PATH = os.path.join(ARTIFACT_DIR, "fertilizer_rules.agm")
+
+CODE_FEATURES = {"Soil Type": "le_soil", "Crop Type": "le_crop"}
+
+MAX_DEPTH = 7
+MIN_AGREEMENT = 0.99
+# Rules supported by fewer selection samples than this are not trusted
+MIN_SUPPORT = 200
+SAMPLES = 400_000
+SEED = 42
+
+
+def _as_rows(X):
+    if hasattr(X, "columns"):
+        if list(X.columns) != FERT_FEATURES:
+            X = X[FERT_FEATURES]
+        X = X.to_numpy(dtype=np.float32)
+    # float32 like the trees the rules were fitted from
+    return np.atleast_2d(np.asarray(X, dtype=np.float32)).astype(np.float64)
+
+
+def domain_bounds(n_soil, n_crop):
+    """(low, high) per feature of the form's inputs, both inclusive."""
+    low, high = [], []
+    for name in FERT_FEATURES:
+        if name in CODE_FEATURES:
+            lo, hi = 0, (n_soil if name == "Soil Type" else n_crop) - 1
+        else:
+            lo, hi = FERT_BOUNDS[name]
+        low.append(lo)
+        high.append(hi)
+    return np.asarray(low, dtype=np.float64), np.asarray(high, dtype=np.float64)
+
+
+def sample_domain(n, n_soil, n_crop, rng):
+    """`n` uniform draws of what the form can submit."""
+    low, high = domain_bounds(n_soil, n_crop)
+    columns = []
+    for f, name in enumerate(FERT_FEATURES):
+        if name in CODE_FEATURES or isinstance(FERT_BOUNDS[name][0], int):
+            columns.append(rng.integers(int(low[f]), int(high[f]) + 1, n))
+        else:
+            columns.append(np.round(rng.uniform(low[f], high[f], n), 2))
+    return _as_rows(np.column_stack(columns))
+
+
+class RuleModel:
+    """Ordered IF-THEN rules over the fertilizer inputs.
+
+    Rule r matches a row when low[r, f] < x[f] <= high[r, f] for every
+    feature f; rules do not overlap. Rows no rule matches, and rows outside
+    [domain_low, domain_high] or with unknown soil/crop codes, are passed to
+    `fallback.predict`.
+    """
+
+    def __init__(self, low, high, rule_class, classes, domain_low, domain_high,
+                 coverage=None, agreement=None, names=None, fallback=None):
+        self.low = low
+        self.high = high
+        self.rule_class = rule_class
+        self.classes_ = classes
+        self.domain_low = domain_low
+        self.domain_high = domain_high
+        self.coverage = coverage
+        self.agreement = agreement
+        # {"le_soil": [...], "le_crop": [...], "le_fert": [...]} for describe()
+        self.names = names or {}
+        self.fallback = fallback
+        # Distinguishes rule answers from forest answers in the prediction cache
+        self.cache_tag = None
+        self.feature_names_in_ = np.asarray(FERT_FEATURES, dtype=object)
+        self.n_features_in_ = len(FERT_FEATURES)
+        # Rows answered by a rule / the fallback; sessions predict concurrently
+        self.counts = {"rules": 0, "fallback": 0}
+        self._lock = threading.Lock()
+        self._code_cols = [FERT_FEATURES.index(name) for name in CODE_FEATURES]
+        # Plain lists for the one-row path
+        self._boxes = [list(zip(lo, hi)) for lo, hi in zip(low.tolist(), high.tolist())]
+        self._domain = list(zip(domain_low.tolist(), domain_high.tolist()))
+
+    @property
+    def n_rules(self):
+        return len(self.rule_class)
+
+    def _count(self, rules, fallback=0):
+        with self._lock:
+            self.counts["rules"] += rules
+            self.counts["fallback"] += fallback
+
+    def _match_row(self, row):
+        """match() for one row of Python floats."""
+        for x, (lo, hi) in zip(row, self._domain):
+            if not lo <= x <= hi:  # also False for NaN
+                return -1
+        for f in self._code_cols:
+            if row[f] != int(row[f]):
+                return -1
+        for r, box in enumerate(self._boxes):
+            for x, (lo, hi) in zip(row, box):
+                if not lo < x <= hi:
+                    break
+            else:
+                return r
+        return -1
+
+    def match(self, X):
+        """Index of the rule each row falls under, -1 for none."""
+        rows = _as_rows(X)
+        if len(rows) == 1:
+            return np.array([self._match_row(rows[0].tolist())], dtype=np.int64)
+        in_domain = ((rows >= self.domain_low) & (rows <= self.domain_high)).all(axis=1)
+        for f in self._code_cols:
+            in_domain &= rows[:, f] == np.floor(rows[:, f])
+        matched = np.full(len(rows), -1, dtype=np.int64)
+        # Chunks keep the rows x rules x features comparison small
+        for start in range(0, len(rows), 4096):
+            chunk = rows[start:start + 4096, None, :]
+            inside = ((chunk > self.low) & (chunk <= self.high)).all(axis=2)
+            hit = inside.any(axis=1)
+            matched[start:start + 4096][hit] = inside[hit].argmax(axis=1)
+        matched[~in_domain] = -1
+        return matched
+
+    def predict(self, X):
+        rows = _as_rows(X)
+        matched = self.match(rows)
+        if len(rows) == 1 and matched[0] >= 0:
+            self._count(1)
+            return self.classes_[self.rule_class[matched]]
+        covered = matched >= 0
+        predicted = self.classes_[self.rule_class[np.where(covered, matched, 0)]]
+        missed = ~covered
+        if missed.any():
+            if self.fallback is None:
+                raise ValueError(f"{int(missed.sum())} rows are not covered by a rule")
+            subset = X.iloc[np.flatnonzero(missed)] if hasattr(X, "iloc") else rows[missed]
+            predicted = predicted.copy()
+            predicted[missed] = self.fallback.predict(subset)
+        self._count(int(covered.sum()), int(missed.sum()))
+        return predicted
+
+    def explain(self, X):
+        """The rule behind the prediction for the first row of X, or None
+        when that row was answered by the fallback."""
+        r = int(self.match(X)[0])
+        return None if r < 0 else self.describe(r)
+
+    def describe(self, r):
+        """Rule r as text, e.g. 'IF Crop Type is Paddy AND Nitrogen >= 26 THEN Urea'."""
+        conditions = []
+        for f, name in enumerate(FERT_FEATURES):
+            lo, hi = self.low[r, f], self.high[r, f]
+            if name in CODE_FEATURES:
+                labels = self.names.get(CODE_FEATURES[name])
+                values = [labels[c] if labels else str(c) for c in range(int(self.domain_high[f]) + 1)]
+                inside = [v for c, v in enumerate(values) if lo < c <= hi]
+                outside = [v for c, v in enumerate(values) if not lo < c <= hi]
+                # Whichever list is shorter
+                if outside and len(outside) < len(inside):
+                    conditions.append(f"{name} is not {outside[0]}" if len(outside) == 1 else
+                                      f"{name} is neither {', '.join(outside[:-1])} nor {outside[-1]}")
+                elif outside:
+                    conditions.append(f"{name} is {' or '.join(inside)}")
+                continue
+            integer = isinstance(FERT_BOUNDS[name][0], int)
+            if integer and np.floor(lo) + 1 == np.floor(hi):
+                conditions.append(f"{name} = {int(np.floor(hi))}")
+                continue
+            if lo >= self.domain_low[f]:
+                conditions.append(f"{name} >= {int(np.floor(lo)) + 1}" if integer else f"{name} > {lo:g}")
+            if hi < self.domain_high[f]:
+                conditions.append(f"{name} <= {int(np.floor(hi))}" if integer else f"{name} <= {hi:g}")
+        label = self.classes_[self.rule_class[r]]
+        fert_names = self.names.get("le_fert")
+        answer = fert_names[int(label)] if fert_names else str(label)
+        return f"IF {' AND '.join(conditions) or 'any input'} THEN {answer}"
+
+    def rules(self):
+        """Every rule as text, with its share of the domain and agreement."""
+        lines = []
+        for r in range(self.n_rules):
+            line = f"{r + 1:3d}. {self.describe(r)}"
+            if self.coverage is not None:
+                line += f"  [{self.coverage[r]:.1%} of inputs, {self.agreement[r]:.2%} agreement]"
+            lines.append(line)
+        return lines
+
+
+# ----------------- DISTILLATION -----------------
+def _collect(tree, node, low, high, keep, rules):
+    """Append the kept leaves under `node` as (low, high, value index) boxes.
+    Returns the value index when the whole subtree is kept leaves with one
+    answer (so the caller can merge it with its sibling), else None."""
+    if tree.children_left[node] < 0:
+        if not keep[node]:
+            return None
+        answer = int(np.argmax(tree.value[node, 0]))
+        rules.append((low.copy(), high.copy(), answer))
+        return answer
+    f, t = tree.feature[node], tree.threshold[node]
+    start = len(rules)
+    left_high = high.copy()
+    left_high[f] = min(high[f], t)
+    left = _collect(tree, tree.children_left[node], low, left_high, keep, rules)
+    right_low = low.copy()
+    right_low[f] = max(low[f], t)
+    right = _collect(tree, tree.children_right[node], right_low, high, keep, rules)
+    if left is not None and left == right:
+        del rules[start:]
+        rules.append((low.copy(), high.copy(), left))
+        return left
+    return None
+
+
+def distill(forest, n_soil, n_crop, max_depth=MAX_DEPTH, min_agreement=MIN_AGREEMENT,
+            samples=SAMPLES, seed=SEED):
+    """RuleModel (without fallback) fitted to `forest` over the form domain,
+    plus the evaluation report."""
+    from sklearn.tree import DecisionTreeClassifier
+
+    rng = np.random.default_rng(seed)
+    X_fit, X_select, X_eval = (sample_domain(samples, n_soil, n_crop, rng) for _ in range(3))
+    y_fit, y_select, y_eval = (forest.predict(X) for X in (X_fit, X_select, X_eval))
+
+    student = DecisionTreeClassifier(max_depth=max_depth, random_state=seed).fit(X_fit, y_fit)
+    tree = student.tree_
+    leaves = student.apply(X_select)
+    agrees = student.predict(X_select) == y_select
+    support = np.bincount(leaves, minlength=tree.node_count)
+    leaf_agreement = np.bincount(leaves, agrees, minlength=tree.node_count) / np.maximum(support, 1)
+    keep = (support >= MIN_SUPPORT) & (leaf_agreement >= min_agreement)
+
+    boxes = []
+    n_features = len(FERT_FEATURES)
+    _collect(tree, 0, np.full(n_features, -np.inf), np.full(n_features, np.inf), keep, boxes)
+    domain_low, domain_high = domain_bounds(n_soil, n_crop)
+    classes = np.asarray(forest.classes_)
+    # student.classes_ holds forest classes; store indices into `classes`
+    to_forest = np.searchsorted(classes, student.classes_)
+    model = RuleModel(
+        np.array([b[0] for b in boxes]).reshape(-1, n_features),
+        np.array([b[1] for b in boxes]).reshape(-1, n_features),
+        to_forest[np.array([b[2] for b in boxes], dtype=np.int64)].astype(np.uint8),
+        classes, domain_low, domain_high,
+    )
+
+    # Per-rule and overall figures on the untouched evaluation sample
+    matched = model.match(X_eval)
+    covered = matched >= 0
+    correct = model.classes_[model.rule_class[matched[covered]]] == y_eval[covered]
+    per_rule = np.bincount(matched[covered], minlength=model.n_rules)
+    model.coverage = per_rule / len(X_eval)
+    model.agreement = np.bincount(matched[covered], correct, minlength=model.n_rules) / np.maximum(per_rule, 1)
+    # Most-used rules first
+    order = np.argsort(-model.coverage, kind="stable")
+    for attr in ["low", "high", "rule_class", "coverage", "agreement"]:
+        setattr(model, attr, getattr(model, attr)[order])
+
+    report = {
+        "max_depth": max_depth,
+        "min_agreement": min_agreement,
+        "samples": samples,
+        "seed": seed,
+        "leaves": int(tree.n_leaves),
+        "rules": model.n_rules,
+        "coverage": float(covered.mean()),
+        "agreement": float(correct.mean()) if len(correct) else 0.0,
+        # Rules for covered rows, the forest for the rest
+        "overall_agreement": float(1.0 - (~correct).sum() / len(X_eval)),
+    }
+    return model, report
+
+
+def export_rules(model, path, report, names, sources):
+    arrays = {
+        "low": model.low, "high": model.high, "rule_class": model.rule_class,
+        "classes": model.classes_, "domain_low": model.domain_low, "domain_high": model.domain_high,
+        "coverage": model.coverage, "agreement": model.agreement,
+    }
+    return write_artifact(path, "rule_list", arrays, report, names, sources)
+
+
+def rules_from_arrays(arrays, names=None):
+    return RuleModel(arrays["low"], arrays["high"], arrays["rule_class"], arrays["classes"],
+                     arrays["domain_low"], arrays["domain_high"],
+                     arrays.get("coverage"), arrays.get("agreement"), names)
+
+
+def with_rule_model(registry, path=RULES_PATH, min_agreement=MIN_AGREEMENT):
+    """`build` for registry.derive / cached_predictor: the distilled rules,
+    backed by the decision grid (or flat forest), when a rule artifact built
+    from the current fertilizer pickle exists and its measured agreement is
+    at least `min_agreement`; otherwise the grid (or forest) alone."""
+    exact = with_decision_grid(registry)
+
+    def build(model):
+        fallback = exact(model)
+        if not os.path.exists(path):
+            return fallback
+        try:
+            artifact = load_artifact(path)
+        except ArtifactError:
+            return fallback
+        # Agreement was measured against the exact forest, not a compressed one
+        source = artifact.source_sha256("fertilizer") or ""
+        if source[:12] != registry.model_version("fertilizer"):
+            return fallback
+        if artifact.header["meta"].get("agreement", 0.0) < min_agreement:
+            return fallback
+        rules = artifact.model
+        rules.fallback = fallback
+        rules.cache_tag = "rules-" + artifact.header["sha256"][:8]
+        return rules
+
+    return build
+
+
+def _print_rules(model, meta):
+    print(f"{model.n_rules} rules from a depth-{meta['max_depth']} tree "
+          f"({meta['leaves']} leaves, kept at >= {meta['min_agreement']:.1%} agreement)")
+    print(f"cover {meta['coverage']:.1%} of the form's inputs and agree with the forest on "
+          f"{meta['agreement']:.3%} of them; the forest answers the rest "
+          f"(overall {meta['overall_agreement']:.3%})\n")
+    print("\n".join(model.rules()))
+
+
+def main(argv=None):
+    from model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Distill the fertilizer forest into readable rules")
+    parser.add_argument("command", choices=["build", "show"])
+    parser.add_argument("--max-depth", type=int, default=MAX_DEPTH)
+    parser.add_argument("--min-agreement", type=float, default=MIN_AGREEMENT,
+                        help="per-rule agreement with the forest needed to keep a rule")
+    parser.add_argument("--samples", type=int, default=SAMPLES,
+                        help="domain samples for each of fitting, selection and evaluation")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default=RULES_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        artifact = load_artifact(args.output)
+        _print_rules(artifact.model, artifact.header["meta"])
+        return 0
+
+    registry = ModelRegistry(artifact_dir=None)
+    encoders = {name: registry.get(name) for name in ["le_soil", "le_crop", "le_fert"]}
+    start = time.perf_counter()
+    model, report = distill(as_flat_forest(registry.get("fertilizer")),
+                            len(encoders["le_soil"].classes_), len(encoders["le_crop"].classes_),
+                            args.max_depth, args.min_agreement, args.samples, args.seed)
+    names = {name: [str(c) for c in enc.classes_] for name, enc in encoders.items()}
+    model.names = names
+    path = export_rules(model, args.output, {**report, "feature_names": FERT_FEATURES}, names,
+                        {name: registry.path(name) for name in ["fertilizer", *encoders]})
+    _print_rules(model, report)
+    print(f"\n✅ {path}: {os.path.getsize(path):,} bytes in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
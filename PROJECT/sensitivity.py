@@ -0,0 +1,65 @@
+# What-if sweeps for the crop recommender
+#
+# Holds the farmer's inputs fixed, varies one or two of them across their
+# form ranges and scores the whole lattice with a single predict call.
+import numpy as np
+
+from feature_schema import CROP_BOUNDS, CROP_FEATURES, reverse_label_mapping
+from lazy_imports import lazy_module
+
+pd = lazy_module("pandas")  # imported on first use, not with the page
+
+# Inputs that the form takes as whole numbers
+INTEGER_FEATURES = {"N", "P", "K"}
+
+MAX_RESOLUTION = 200
+
+
+def sweep_values(feature, resolution, bounds=CROP_BOUNDS):
+    """`resolution` evenly spaced values across the form range of `feature`
+    (whole numbers, without repeats, for the integer inputs)."""
+    low, high = bounds[feature]
+    values = np.linspace(low, high, resolution)
+    if feature in INTEGER_FEATURES:
+        values = np.unique(np.round(values))
+    return values
+
+
+def sweep_table(base, params, resolution=50, bounds=CROP_BOUNDS):
+    """Every combination of the swept values of `params`, with the other
+    features fixed at their `base` values, in CROP_FEATURES column order."""
+    if not 1 <= len(params) <= 2:
+        raise ValueError("Sweep one or two parameters")
+    unknown = [p for p in params if p not in CROP_FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(unknown)}")
+    resolution = min(int(resolution), MAX_RESOLUTION)
+
+    axes = np.meshgrid(*(sweep_values(p, resolution, bounds) for p in params), indexing="ij")
+    n = axes[0].size
+    table = pd.DataFrame({f: np.full(n, float(base[f])) for f in CROP_FEATURES})
+    for param, axis in zip(params, axes):
+        table[param] = axis.ravel()
+    return table
+
+
+def crop_sweep(model, base, params, resolution=50, bounds=CROP_BOUNDS):
+    """Score a sweep in one batched call; adds a `crop` column to `sweep_table`."""
+    table = sweep_table(base, params, resolution, bounds)
+    codes = model.predict(table[CROP_FEATURES])
+    table["crop"] = [reverse_label_mapping.get(code, "Unknown") for code in codes]
+    return table
+
+
+def crop_regions(sweep, param):
+    """Runs of a one-parameter sweep that recommend the same crop:
+    one row per run with its crop and the parameter range it covers."""
+    values = sweep[param].to_numpy()
+    crops = sweep["crop"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, crops[1:] != crops[:-1]])
+    ends = np.r_[starts[1:], len(crops)] - 1
+    return pd.DataFrame({
+        "crop": crops[starts],
+        "from": values[starts],
+        "to": values[ends],
+    })
@@ -0,0 +1,245 @@
+# Background images and web fonts as cacheable static files
+#
+# The pages used to base64-inline their background JPEG into a <style> block
+# on every rerun, so each interaction re-sent the whole image as text (about
+# 470 KB for ferti.jpg). Instead each background is resized once into WebP
+# variants under static/bg/ and the CSS points at them through Streamlit's
+# static file serving (server.enableStaticServing in .streamlit/config.toml):
+# the browser downloads a variant once and caches it, and media queries pick
+# the smallest one that covers the screen.
+#
+# The variants are built ahead of time and committed:
+#
+#   python static_assets.py build
+#
+# Pages only read static/; rendering never resizes or encodes an image.
+#
+# Remote assets (the crop page's Unsplash photo, the Google fonts) are
+# self-hosted after
+#
+#   python static_assets.py fetch
+#
+# which downloads them into static/ and builds the photo's variants, to be
+# committed like the rest. Pages never load anything from those hosts: until
+# a photo is fetched its page shows a bundled stand-in, and until a font is
+# fetched the page's font-family list falls back to a locally installed copy
+# or the generic family. With static serving turned off, a background falls
+# back to a data URI that is encoded once per process.
+import argparse
+import base64
+import functools
+import os
+import re
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+STATIC_URL = "app/static"
+BG_DIR = os.path.join(STATIC_DIR, "bg")          # generated variants
+SOURCE_DIR = os.path.join(STATIC_DIR, "src")     # downloaded original images
+FONT_DIR = os.path.join(STATIC_DIR, "fonts")
+
+WIDTHS = (640, 1280, 1920)
+WEBP_QUALITY = 80
+# Variant width used for the data URI fallback
+INLINE_WIDTH = 1280
+
+# Backgrounds in the repo
+LOCAL_IMAGES = ("soil1.jpg", "ferti.jpg")
+# Backgrounds that are not in the repo: file name -> original URL
+REMOTE_IMAGES = {
+    "crop_field.jpg": "https://images.unsplash.com/photo-1501004318641-b39e6451bec6?auto=format&fit=crop&w=1470&q=80",
+}
+# Bundled background shown in place of a remote one that has not been fetched
+STAND_INS = {"crop_field.jpg": "soil1.jpg"}
+
+# Font family -> weights used by the pages
+FONTS = {
+    "Inter": (300, 400, 500, 600, 700),
+    "Poppins": (400, 500, 600, 700),
+}
+GOOGLE_FONTS_URL = "https://fonts.googleapis.com/css2?family={family}:wght@{weights}&display=swap"
+# Google serves woff2 only to browsers it recognises
+FONT_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+FETCH_TIMEOUT = 20
+
+_variants = {}
+
+
+def _source_path(image):
+    if os.path.exists(os.path.join(BASE_DIR, image)):
+        return os.path.join(BASE_DIR, image)
+    return os.path.join(SOURCE_DIR, image)
+
+
+def _variant_widths(source_width):
+    largest = min(source_width, WIDTHS[-1])
+    return [w for w in WIDTHS if w < largest] + [largest]
+
+
+def _stem(image):
+    return os.path.splitext(os.path.basename(image))[0]
+
+
+def build_variants(image, force=False):
+    """Write the WebP variants of `image` (skipping ones newer than the
+    source) and return [(width, path)] from smallest to largest."""
+    from PIL import Image
+
+    source = _source_path(image)
+    stem = _stem(image)
+    os.makedirs(BG_DIR, exist_ok=True)
+    source_mtime = os.path.getmtime(source)
+    with Image.open(source) as original:
+        original = original.convert("RGB")
+        variants = []
+        for width in _variant_widths(original.width):
+            path = os.path.join(BG_DIR, f"{stem}-{width}.webp")
+            if force or not os.path.exists(path) or os.path.getmtime(path) < source_mtime:
+                height = round(original.height * width / original.width)
+                resized = original.resize((width, height), Image.LANCZOS)
+                resized.save(path + ".tmp", "WEBP", quality=WEBP_QUALITY, method=6)
+                os.replace(path + ".tmp", path)
+            variants.append((width, path))
+    return variants
+
+
+def built_variants(image):
+    """[(width, path)] of the WebP variants of `image` in static/bg/, from
+    smallest to largest ([] if none have been built)."""
+    pattern = re.compile(re.escape(_stem(image)) + r"-(\d+)\.webp$")
+    try:
+        names = os.listdir(BG_DIR)
+    except FileNotFoundError:
+        return []
+    variants = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            variants.append((int(match.group(1)), os.path.join(BG_DIR, name)))
+    return sorted(variants)
+
+
+def background_variants(image):
+    """Built variants of `image`, or of its stand-in when it has none,
+    looked up once per process."""
+    variants = _variants.get(image)
+    if variants is None:
+        variants = built_variants(image)
+        if not variants and image in STAND_INS:
+            variants = built_variants(STAND_INS[image])
+        _variants[image] = variants
+    return variants
+
+
+def static_serving():
+    import streamlit as st
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def static_url(path):
+    return STATIC_URL + "/" + os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+
+
+@functools.lru_cache(maxsize=16)
+def _data_uri(path, mtime):
+    with open(path, "rb") as f:
+        return "data:image/webp;base64," + base64.b64encode(f.read()).decode()
+
+
+def _background_rule(selector, layers, url):
+    return f"{selector} {{ background-image: {', '.join(layers + [f'url({url!r})'])}; }}"
+
+
+def background_css(image, overlay=None, selector=".stApp"):
+    """CSS rules that set `image` as the background of `selector`, with an
+    optional `overlay` layer (e.g. a linear-gradient) on top. Goes inside a
+    <style> block after the page's own rules for `selector`."""
+    layers = [overlay] if overlay else []
+    variants = background_variants(image)
+    if not variants:
+        # Nothing built for this image: keep just the overlay
+        return f"{selector} {{ background-image: {overlay}; }}" if overlay else ""
+    if not static_serving():
+        width, path = [v for v in variants if v[0] <= INLINE_WIDTH][-1]
+        return _background_rule(selector, layers, _data_uri(path, os.path.getmtime(path)))
+
+    rules = [_background_rule(selector, layers, static_url(variants[-1][1]))]
+    for width, path in reversed(variants[:-1]):
+        rules.append(f"@media (max-width: {width}px) {{ "
+                     f"{_background_rule(selector, layers, static_url(path))} }}")
+    return "\n".join(rules)
+
+
+def font_import(family):
+    """`@import` rule for the self-hosted copy of a web font, or "" when it
+    has not been fetched or static serving is off."""
+    local = os.path.join(FONT_DIR, family + ".css")
+    if os.path.exists(local) and static_serving():
+        return f"@import url('{static_url(local)}');"
+    return ""
+
+
+def fetch_font(family, weights=None, timeout=FETCH_TIMEOUT):
+    """Download a Google font's woff2 files into static/fonts/ and write
+    static/fonts/<family>.css pointing at them."""
+    import requests
+
+    weights = weights or FONTS[family]
+    url = GOOGLE_FONTS_URL.format(family=family, weights=";".join(map(str, weights)))
+    response = requests.get(url, headers={"User-Agent": FONT_USER_AGENT}, timeout=timeout)
+    response.raise_for_status()
+    css = response.text
+
+    os.makedirs(FONT_DIR, exist_ok=True)
+    for font_url in sorted(set(re.findall(r"url\((https://[^)]+)\)", css))):
+        name = family + "-" + font_url.rsplit("/", 1)[-1]
+        font = requests.get(font_url, timeout=timeout)
+        font.raise_for_status()
+        with open(os.path.join(FONT_DIR, name), "wb") as f:
+            f.write(font.content)
+        css = css.replace(font_url, name)   # relative to the stylesheet
+    with open(os.path.join(FONT_DIR, family + ".css"), "w", encoding="utf-8") as f:
+        f.write(css)
+
+
+def fetch_image(image, timeout=FETCH_TIMEOUT):
+    """Download a remote background into static/src/."""
+    import requests
+
+    response = requests.get(REMOTE_IMAGES[image], timeout=timeout)
+    response.raise_for_status()
+    os.makedirs(SOURCE_DIR, exist_ok=True)
+    with open(os.path.join(SOURCE_DIR, image), "wb") as f:
+        f.write(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and fetch the static assets of the pages")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Write the WebP variants of every background")
+    build.add_argument("--force", action="store_true", help="Rebuild variants that are up to date")
+    sub.add_parser("fetch", help="Download the remote backgrounds and fonts for self-hosting")
+    args = parser.parse_args()
+
+    if args.command == "fetch":
+        for image in REMOTE_IMAGES:
+            fetch_image(image)
+            print(f"Fetched {image}")
+        for family in FONTS:
+            fetch_font(family)
+            print(f"Fetched font {family}")
+        images = list(REMOTE_IMAGES)
+    else:
+        images = list(LOCAL_IMAGES) + [i for i in REMOTE_IMAGES if os.path.exists(_source_path(i))]
+
+    for image in images:
+        for width, path in build_variants(image, force=getattr(args, "force", False)):
+            print(f"{image:<16} {width:>5}px  {os.path.getsize(path) / 1024:7.1f} KB  {static_url(path)}")
+
+
+if __name__ == "__main__":
+    main()
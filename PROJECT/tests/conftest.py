@@ -0,0 +1,21 @@
+# Shared fixtures for the tests
+#
+#   python -m pytest -q PROJECT/tests
+#
+# The modules under test import each other as top-level modules (the way
+# Streamlit runs the pages from PROJECT/), so PROJECT/ goes on sys.path.
+# The registry loads the bundled pickles, not the built artifacts.
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+@pytest.fixture(scope="session")
+def registry():
+    from model_registry import ModelRegistry
+
+    return ModelRegistry(artifact_dir=None)
@@ -0,0 +1,113 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from batch_scoring import (BatchInputError, FertilizerBatch, score_crop_csv, score_fertilizer_csv,
+                           score_soil_file)
+from data_store import BASE_DIR, load_dataset
+from feature_schema import (CROP_BOUNDS, CROP_FEATURES, FERT_ENCODERS, FERT_FEATURES, SOIL_BOUNDS,
+                            SOIL_FEATURES, fertility_labels, reverse_label_mapping)
+
+PLOT = {"Temperature": 26, "Humidity": 52, "Moisture": 38, "Soil Type": "Sandy",
+        "Crop Type": "Maize", "Nitrogen": 37, "Potassium": 0, "Phosphorous": 0}
+
+
+def test_numeric_category_columns_are_flagged_not_fatal(registry, tmp_path):
+    # Both category columns parse as numbers in this file
+    table = pd.DataFrame([{**PLOT, "Soil Type": 5, "Crop Type": 2}, {**PLOT, "Soil Type": 1.5}])
+    source = io.StringIO(table.to_csv(index=False))
+    summary = score_fertilizer_csv(FertilizerBatch.from_registry(registry), source,
+                                   str(tmp_path / "scored.csv"))
+    assert (summary["rows"], summary["scored"]) == (2, 0)
+    errors = pd.read_csv(tmp_path / "scored.csv")["error"].tolist()
+    assert errors == ["unknown Soil Type '5.0'; unknown Crop Type '2'", "unknown Soil Type '1.5'"]
+
+
+def _csv(table):
+    return io.StringIO(table.to_csv(index=False))
+
+
+def test_crop_csv_scores_good_rows_and_flags_bad_ones(registry, tmp_path):
+    model = registry.get("crop")
+    fields = load_dataset("crop", CROP_FEATURES)
+    inside = pd.concat([fields[c].between(lo, hi) for c, (lo, hi) in CROP_BOUNDS.items()], axis=1)
+    fields = fields[inside.all(axis=1)].sample(200, random_state=0).reset_index(drop=True)
+    table = fields.astype(object)
+    table.loc[3, "N"] = "lots"
+    table.loc[7, "ph"] = 15.0
+    table.loc[9, "rainfall"] = None
+    output = str(tmp_path / "scored.csv.gz")
+    done = []
+
+    summary = score_crop_csv(model, _csv(table), output, chunksize=64, compress=True,
+                             progress=done.append)
+    assert (summary["rows"], summary["scored"], summary["rejected"]) == (200, 197, 3)
+    assert done == [64, 128, 192, 200]
+
+    scored = pd.read_csv(output, keep_default_na=False)
+    bad = [3, 7, 9]
+    assert scored.loc[bad, "error"].tolist() == [
+        "N missing or not numeric", "ph outside 3.5-9.9", "rainfall missing or not numeric"]
+    assert (scored.loc[bad, "predicted_crop"] == "").all()
+    good = scored.index.difference(bad)
+    expected = [reverse_label_mapping[c] for c in model.predict(fields.loc[good])]
+    assert scored.loc[good, "predicted_crop"].tolist() == expected
+    assert (scored.loc[good, "error"] == "").all()
+
+
+def test_missing_columns_reject_the_whole_file(registry, tmp_path):
+    table = load_dataset("crop", CROP_FEATURES).head(5).drop(columns=["rainfall", "ph"])
+    with pytest.raises(BatchInputError, match="Missing required column.*ph, rainfall"):
+        score_crop_csv(registry.get("crop"), _csv(table), str(tmp_path / "scored.csv"))
+
+
+def test_fertilizer_batch_matches_the_model_and_flags_bad_plots(registry):
+    plots = pd.read_csv(os.path.join(BASE_DIR, "Fertilizer Prediction (1).csv"))[FERT_FEATURES]
+    batch = FertilizerBatch.from_registry(registry)
+    scored, n_scored = batch.recommend(plots)
+
+    encoded = plots.copy()
+    for col, name in FERT_ENCODERS.items():
+        encoded[col] = registry.get(name).transform(plots[col])
+    expected = registry.get("le_fert").inverse_transform(registry.get("fertilizer").predict(encoded))
+    assert n_scored == len(plots)
+    assert scored["Recommended Fertilizer"].tolist() == list(expected)
+    assert (scored["error"] == "").all()
+
+    bad = plots.head(3).astype(object)
+    bad.loc[0, "Soil Type"] = "Peaty"
+    bad.loc[1, "Nitrogen"] = 500
+    scored, n_scored = batch.recommend(bad)
+    assert n_scored == 1
+    assert scored["error"].tolist() == ["unknown Soil Type 'Peaty'", "Nitrogen outside 0-100", ""]
+    assert scored["Recommended Fertilizer"].tolist()[:2] == ["", ""]
+
+
+def test_soil_workbook_counts_labels_and_warns(registry, tmp_path):
+    model = registry.get("soil")
+    samples = load_dataset("soil", SOIL_FEATURES)
+    inside = pd.concat([samples[c].between(lo, hi) for c, (lo, hi) in SOIL_BOUNDS.items()], axis=1)
+    samples = samples[inside.all(axis=1)].head(120).reset_index(drop=True)
+    table = samples.copy()
+    table.loc[0, ["N", "P", "Ph"]] = [40.0, 10.0, 8.5]
+    table.loc[1, "EC"] = 5.0
+    workbook = tmp_path / "lab.xlsx"
+    table.to_excel(workbook, index=False)
+    output = str(tmp_path / "scored.csv")
+
+    summary = score_soil_file(model, str(workbook), output, chunksize=50)
+    assert (summary["rows"], summary["scored"], summary["rejected"]) == (120, 119, 1)
+
+    good = table.drop(index=1)
+    labels = pd.Series(model.predict(good[SOIL_FEATURES])).map(
+        {code: label for code, (label, _) in fertility_labels.items()})
+    assert summary["counts"] == labels.value_counts().to_dict()
+
+    scored = pd.read_csv(output, keep_default_na=False)
+    assert scored.loc[1, "error"] == "EC outside 0.1-0.95"
+    assert scored.loc[1, "fertility_label"] == ""
+    assert scored.loc[0, "warnings"] == ("Low Nitrogen: Add compost or urea; "
+                                         "Low Phosphorus: Apply Single Super Phosphate; "
+                                         "Alkaline Soil: Add gypsum or sulfur")
@@ -0,0 +1,26 @@
+import gc
+import os
+import time
+
+from bulk_upload import _SessionDir, remove_stale_outputs
+
+
+def test_session_directory_goes_with_its_owner(tmp_path):
+    owner = _SessionDir(str(tmp_path))
+    path = owner.path
+    with open(os.path.join(path, "scored.csv.gz"), "wb") as f:
+        f.write(b"x" * 1000)
+    del owner
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_stale_session_directories_are_swept(tmp_path):
+    old, new = tmp_path / "old", tmp_path / "new"
+    for directory in (old, new):
+        directory.mkdir()
+        (directory / "reports.zip").write_bytes(b"x")
+    two_days_ago = time.time() - 48 * 3600
+    os.utime(old, (two_days_ago, two_days_ago))
+    remove_stale_outputs(str(tmp_path), max_age_hours=24)
+    assert sorted(os.listdir(tmp_path)) == ["new"]
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+import dashboard_data
+import data_store
+from dashboard_data import DASHBOARDS, dashboard_aggregates
+from data_store import load_dataset, load_table, source_path
+
+
+def test_dashboards_work_without_pyarrow(monkeypatch):
+    monkeypatch.setattr(data_store, "pa", None)
+    monkeypatch.setattr(dashboard_data, "_cache", {})
+    for name in DASHBOARDS:
+        aggregates = dashboard_aggregates(name)
+        assert aggregates.counts.sum() == len(load_dataset(name))
+    with pytest.raises(ImportError, match="pyarrow"):
+        load_table("soil")
+
+
+@pytest.mark.parametrize("name, selected", [
+    ("soil", {}),
+    ("crop", {"label": ["rice", "maize", "jute"]}),
+    ("fertilizer", {"Soil Type": ["Sandy", "Clayey"], "Crop Type": ["Maize", "Paddy", "Wheat"]}),
+])
+def test_aggregates_match_pandas_on_the_raw_frame(name, selected):
+    label, filters, features = DASHBOARDS[name]
+    raw = pd.read_csv(source_path(name))
+    for column, values in selected.items():
+        raw = raw[raw[column].isin(values)]
+    aggregates = dashboard_aggregates(name)
+    mask = aggregates.select(**selected)
+
+    counts = aggregates.class_counts(mask)
+    assert counts.to_dict() == raw[label].value_counts().to_dict()
+    means = aggregates.class_means(mask)
+    pdt.assert_frame_equal(means, raw.groupby(label)[features].mean(), check_names=False,
+                           check_index_type=False)
+    pdt.assert_frame_equal(aggregates.correlation(mask), raw[features].corr(), atol=1e-9)
+
+    feature = features[0]
+    histogram = aggregates.histogram(mask, feature, by_class=False)
+    expected, _ = np.histogram(raw[feature], bins=aggregates.edges[feature])
+    assert histogram["rows"].tolist() == expected[expected > 0].tolist()
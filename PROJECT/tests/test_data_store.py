@@ -0,0 +1,43 @@
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+import data_store
+from data_store import DATASETS, build_dataset, load_dataset, source_path
+
+
+def _expected_dtypes(name):
+    return {col: "category" if dtype == data_store.CATEGORY else dtype
+            for col, dtype in DATASETS[name][1].items()}
+
+
+@pytest.mark.parametrize("name", list(DATASETS))
+def test_arrow_and_csv_loads_agree(name, monkeypatch):
+    arrow = load_dataset(name)
+    monkeypatch.setattr(data_store, "pa", None)
+    csv = load_dataset(name)
+
+    assert {col: str(dtype) for col, dtype in arrow.dtypes.items()} == _expected_dtypes(name)
+    pdt.assert_frame_equal(arrow, csv)
+    raw = pd.read_csv(source_path(name))
+    pdt.assert_frame_equal(arrow.astype(raw.dtypes.to_dict()), raw, check_dtype=False)
+    for col in arrow.select_dtypes("category"):
+        assert list(arrow[col].cat.categories) == sorted(raw[col].unique())
+
+
+@pytest.mark.parametrize("pyarrow", [True, False])
+def test_projection_keeps_the_requested_order(monkeypatch, pyarrow):
+    if not pyarrow:
+        monkeypatch.setattr(data_store, "pa", None)
+    columns = ["Crop Type", "Nitrogen", "Soil Type"]
+    frame = load_dataset("fertilizer", columns)
+    assert list(frame.columns) == columns
+    assert [str(t) for t in frame.dtypes] == ["category", "int16", "category"]
+
+
+def test_small_batches_share_one_dictionary(tmp_path):
+    # Each 1 KiB block sees only some labels, so later batches add dictionary deltas
+    output = str(tmp_path / "soil.arrow")
+    path, rows = build_dataset("soil", output=output, block_size=1 << 10)
+    assert rows == len(pd.read_csv(source_path("soil")))
+    pdt.assert_frame_equal(load_dataset("soil", path=path), load_dataset("soil"))
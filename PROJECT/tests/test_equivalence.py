@@ -0,0 +1,82 @@
+# Every fast path answers exactly like the model it stands in for, on the
+# rows of the bundled datasets.
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from decision_grid import build_grid, climates_from_csv, export_grid
+from feature_schema import CROP_FEATURES, FERT_FEATURES
+from micro_batch import MicroBatcher
+from model_artifacts import export_all, load_artifact
+from train import load_task
+from tree_engine import as_flat_forest, with_early_exit
+
+FORESTS = {"crop": CROP_FEATURES, "fertilizer": FERT_FEATURES}
+
+
+@pytest.fixture(scope="module")
+def datasets():
+    return {task: load_task(task)[0] for task in ["crop", "fertilizer", "soil"]}
+
+
+@pytest.mark.parametrize("task", FORESTS)
+def test_flat_forest_matches_sklearn(registry, datasets, task):
+    model, X = registry.get(task), datasets[task]
+    forest = as_flat_forest(model)
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X))
+
+
+def test_agm_artifacts_match_the_pickles(registry, datasets, tmp_path):
+    for path in export_all(registry, str(tmp_path)):
+        task = path.rsplit("/", 1)[-1].split(".")[0]
+        X = datasets[task]
+        np.testing.assert_array_equal(load_artifact(path).model.predict(X),
+                                      registry.get(task).predict(X))
+
+
+@pytest.mark.parametrize("task", FORESTS)
+def test_early_exit_matches_the_full_forest(registry, datasets, task):
+    model, X = registry.get(task), datasets[task]
+    early_exit = with_early_exit(task, FORESTS[task])(model)
+    predictions, evaluated = early_exit.predict_counted(X)
+    np.testing.assert_array_equal(predictions, model.predict(X))
+    assert evaluated.max() <= early_exit.n_trees
+
+
+def test_decision_grid_matches_the_forest(registry, datasets, tmp_path):
+    model, X = registry.get("fertilizer"), datasets["fertilizer"]
+    n_soil, n_crop = len(registry.get("le_soil").classes_), len(registry.get("le_crop").classes_)
+    climates = climates_from_csv(max_slices=3)
+    built = build_grid(model, n_soil, n_crop, climates)
+    grid = load_artifact(export_grid(built, str(tmp_path / "grid.agm"), {})).model
+    grid.fallback = as_flat_forest(model)
+
+    # Random soil/crop codes and integer nutrient values under the sliced climates
+    rng = np.random.default_rng(0)
+    rows = pd.DataFrame(0.0, index=range(3000), columns=FERT_FEATURES)
+    rows[["Temperature", "Humidity", "Moisture"]] = np.repeat(climates, 1000, axis=0)
+    for name, high in [("Soil Type", n_soil), ("Crop Type", n_crop), ("Nitrogen", 101),
+                       ("Potassium", 51), ("Phosphorous", 51)]:
+        rows[name] = rng.integers(0, high, len(rows))
+    np.testing.assert_array_equal(grid.predict(rows), model.predict(rows))
+    assert grid.counts == {"grid": len(rows), "fallback": 0}
+
+    # Dataset rows mostly fall outside the three slices and go to the forest
+    np.testing.assert_array_equal(grid.predict(X), model.predict(X))
+    assert grid.counts["fallback"] > 0
+
+
+@pytest.mark.parametrize("task", ["crop", "soil"])
+def test_micro_batched_matches_direct(registry, datasets, task):
+    model, X = registry.get(task), datasets[task]
+    if task in FORESTS:
+        model = with_early_exit(task, FORESTS[task])(model)
+    batcher = MicroBatcher(model, f"test-{task}", max_wait_ms=5)
+    chunks = [X.iloc[i:i + 7] for i in range(0, len(X), 7)]
+    with ThreadPoolExecutor(8) as pool:
+        predictions = list(pool.map(batcher.predict, chunks))
+    np.testing.assert_array_equal(np.concatenate(predictions), model.predict(X))
+    assert batcher.stats()["batches"] < len(chunks)
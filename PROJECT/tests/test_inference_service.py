@@ -0,0 +1,78 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from feature_schema import CROP_FEATURES, reverse_label_mapping
+from inference_service import InferenceService, make_server, post_json
+
+PLOT = {"Temperature": 26, "Humidity": 52, "Moisture": 38, "Soil Type": "Sandy",
+        "Crop Type": "Maize", "Nitrogen": 37, "Potassium": 0, "Phosphorous": 0}
+
+
+@pytest.fixture(scope="module")
+def service(registry):
+    return InferenceService(registry)
+
+
+def test_numeric_category_is_a_422(service):
+    status, body = service.predict("/fertilizer", {**PLOT, "Soil Type": 5})
+    assert status == 422
+    assert body == {"error": "unknown Soil Type '5'"}
+
+
+def test_single_records_are_scored(service, registry):
+    field = {"N": 90, "P": 42, "K": 43, "temperature": 20.9, "humidity": 82.0, "ph": 6.5,
+             "rainfall": 202.9}
+    status, body = service.predict("/crop", field)
+    code = registry.get("crop").predict(pd.DataFrame([field])[CROP_FEATURES])[0]
+    assert (status, body) == (200, {"predicted_crop": reverse_label_mapping[code]})
+
+    status, body = service.predict("/fertilizer", PLOT)
+    assert (status, body) == (200, {"Recommended Fertilizer": "Urea"})
+
+    sample = {"N": 138, "P": 8.6, "K": 560, "Ph": 7.46, "EC": 0.62, "OC": 0.7, "S": 5.9,
+              "Zn": 0.24, "Fe": 0.31, "Cu": 0.77, "Mn": 8.71, "B": 0.11}
+    status, body = service.predict("/soil", sample)
+    assert status == 200
+    assert set(body) == {"fertility", "fertility_label", "warnings"}
+    assert body["warnings"] == "Low Phosphorus: Apply Single Super Phosphate"
+
+
+def test_lists_keep_per_record_errors(service):
+    status, body = service.predict("/fertilizer", [PLOT, {**PLOT, "Moisture": 95}])
+    assert status == 200
+    assert body == [{"Recommended Fertilizer": "Urea"}, {"error": "Moisture outside 10.0-80.0"}]
+
+
+def test_out_of_range_record_is_a_422(service):
+    status, body = service.predict("/fertilizer", {**PLOT, "Nitrogen": 500})
+    assert (status, body) == (422, {"error": "Nitrogen outside 0-100"})
+
+
+@pytest.mark.parametrize("endpoint, payload, status, error", [
+    ("/yield", PLOT, 404, "Unknown endpoint '/yield'"),
+    ("/fertilizer", [], 400, "Body must be a JSON object or a non-empty list of objects"),
+    ("/fertilizer", "Sandy", 400, "Body must be a JSON object or a non-empty list of objects"),
+    ("/fertilizer", {"Temperature": 26}, 400, "Missing required column(s): Humidity"),
+])
+def test_bad_requests(service, endpoint, payload, status, error):
+    code, body = service.predict(endpoint, payload)
+    assert code == status
+    assert body["error"].startswith(error)
+
+
+def test_http_round_trip(service):
+    server = make_server(port=0, workers=2, service=service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}"
+        status, body, headers = post_json(url + "/fertilizer", PLOT)
+        assert (status, body) == (200, {"Recommended Fertilizer": "Urea"})
+        assert "X-Model-Time-Ms" in headers
+        status, body, _ = post_json(url + "/fertilizer", {**PLOT, "Soil Type": "Peaty"})
+        assert (status, body) == (422, {"error": "unknown Soil Type 'Peaty'"})
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import lazy_imports
+from lazy_imports import BASE_DIR, LazyModule, import_times, lazy_module, page_imports, prefetch
+
+PREDICTION_PAGES = ["home.py", "Pages/Crop.py", "Pages/fertilizer.py", "Pages/stream_soil.py",
+                    "Pages/field_pipeline.py"]
+
+
+@pytest.fixture
+def fresh_module(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / "lazy_probe.py").write_text("ANSWER = 42\n")
+    yield "lazy_probe"
+    sys.modules.pop("lazy_probe", None)
+
+
+def test_lazy_module_imports_on_first_use(fresh_module):
+    module = lazy_module(fresh_module)
+    assert isinstance(module, LazyModule)
+    assert fresh_module not in sys.modules
+    assert "not loaded" in repr(module)
+
+    assert module.ANSWER == 42
+    assert fresh_module in sys.modules and fresh_module in import_times()
+    assert "(loaded)" in repr(module)
+    assert lazy_module(fresh_module) is sys.modules[fresh_module]
+
+
+def test_prefetch_runs_once_and_skips_broken_modules(fresh_module, monkeypatch):
+    monkeypatch.setattr(lazy_imports, "_prefetch_started", False)
+    thread = prefetch(["no_such_module_here", fresh_module])
+    thread.join(timeout=10)
+    assert fresh_module in sys.modules
+    assert prefetch([fresh_module]) is None
+
+
+def test_page_imports_keeps_only_top_level_imports(tmp_path):
+    page = tmp_path / "page.py"
+    page.write_text("import streamlit as st\nfrom os import path\nst.title('x')\n"
+                    "def later():\n    import pandas\n")
+    assert page_imports(str(page)) == "import streamlit as st\nfrom os import path"
+
+
+@pytest.mark.parametrize("page", PREDICTION_PAGES)
+def test_prediction_pages_defer_heavy_libraries(page):
+    child = ("import sys\n" + page_imports(os.path.join(BASE_DIR, page)) +
+             "\nprint(sorted({'pandas', 'sklearn', 'xgboost', 'altair'} & set(sys.modules)))")
+    result = subprocess.run([sys.executable, "-c", child], cwd=BASE_DIR, capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": BASE_DIR})
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
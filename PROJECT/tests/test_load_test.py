@@ -0,0 +1,24 @@
+import socket
+
+import pytest
+from streamlit import config
+from streamlit.runtime import Runtime
+from streamlit.testing.v1 import app_test
+
+from load_test import block_network, share_server_state
+
+
+def _process_state():
+    return [Runtime.__dict__["instance"], Runtime.__dict__["exists"], config.get_option,
+            app_test.patch_config_options, app_test.ScriptCache, socket.getaddrinfo,
+            socket.socket.connect, socket.socket.connect_ex]
+
+
+def test_harness_patches_are_undone():
+    before = _process_state()
+    with block_network() as refused, share_server_state():
+        assert config.get_option("global.appTest") is True
+        with pytest.raises(socket.gaierror):
+            socket.getaddrinfo("example.com", 443)
+    assert refused == [["example.com", 443]]
+    assert _process_state() == before
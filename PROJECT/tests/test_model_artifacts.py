@@ -0,0 +1,38 @@
+import struct
+
+import numpy as np
+import pytest
+
+from model_artifacts import ArtifactError, load_artifact, write_artifact
+
+
+def _damaged(data):
+    header_len = struct.unpack_from("<Q", data, 12)[0]
+    assert data.count(b'"offset": 0,') == 1
+    return {
+        "empty": b"",
+        "prefix only": data[:20],
+        "header cut short": data[:20 + header_len // 2],
+        "data cut short": data[:-100],
+        "header not JSON": data[:20] + b"[" * header_len + data[20 + header_len:],
+        "array past the end": data.replace(b'"offset": 0,', b'"offset": 8,'),
+    }
+
+
+@pytest.mark.parametrize("damage", ["empty", "prefix only", "header cut short", "data cut short",
+                                    "header not JSON", "array past the end"])
+def test_damaged_files_raise_artifact_error(tmp_path, damage):
+    path = write_artifact(str(tmp_path / "good.agm"), "rule_list", {"a": np.arange(1000)}, {})
+    with open(path, "rb") as f:
+        data = _damaged(f.read())[damage]
+    with open(path, "wb") as f:
+        f.write(data)
+    for verify in (True, False):
+        with pytest.raises(ArtifactError):
+            load_artifact(path, verify=verify)
+
+
+def test_arrays_that_do_not_make_a_model_raise_artifact_error(tmp_path):
+    path = write_artifact(str(tmp_path / "forest.agm"), "flat_forest", {"a": np.arange(10)}, {})
+    with pytest.raises(ArtifactError):
+        load_artifact(path)
@@ -0,0 +1,139 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from decision_grid import FORM_CLIMATE, DecisionGrid, build_grid, export_grid, with_decision_grid
+from model_artifacts import MODEL_ENCODERS, artifact_path, export_model
+from model_registry import ModelRegistry
+from rule_model import RuleModel, distill, export_rules, with_rule_model
+from tree_engine import as_flat_forest
+
+FERT_SOURCES = ["fertilizer", "le_soil", "le_crop", "le_fert"]
+
+
+@pytest.fixture(scope="module")
+def fertilizer_stand_ins(tmp_path_factory, registry):
+    """Paths of a one-slice decision grid and a rule list built from the pickle."""
+    directory = tmp_path_factory.mktemp("stand_ins")
+    model = registry.get("fertilizer")
+    n_soil, n_crop = len(registry.get("le_soil").classes_), len(registry.get("le_crop").classes_)
+    sources = {name: registry.path(name) for name in FERT_SOURCES}
+    grid_path = export_grid(build_grid(model, n_soil, n_crop, [FORM_CLIMATE]),
+                            str(directory / "grid.agm"), sources)
+    rules, report = distill(as_flat_forest(model), n_soil, n_crop, samples=20_000)
+    names = {name: [str(c) for c in registry.get(name).classes_] for name in FERT_SOURCES[1:]}
+    rules_path = export_rules(rules, str(directory / "rules.agm"), report, names, sources)
+    return grid_path, rules_path
+
+
+def install_compressed(registry, artifact_dir):
+    """Export the fertilizer forest the way `forest_compression.py --install` does."""
+    encoders = {name: registry.get(name) for name in MODEL_ENCODERS["fertilizer"]}
+    export_model(as_flat_forest(registry.get("fertilizer")), artifact_path("fertilizer", str(artifact_dir)),
+                 encoders, {name: registry.path(name) for name in FERT_SOURCES},
+                 {"compression": {"trees": 100}})
+    return ModelRegistry(artifact_dir=str(artifact_dir))
+
+
+def test_stand_ins_serve_the_exact_forest(registry, fertilizer_stand_ins):
+    grid_path, rules_path = fertilizer_stand_ins
+    model = registry.get("fertilizer")
+    assert isinstance(with_decision_grid(registry, grid_path)(model), DecisionGrid)
+    assert isinstance(with_rule_model(registry, rules_path, min_agreement=0.0)(model), RuleModel)
+
+
+def test_compressed_forest_has_its_own_version(registry, tmp_path):
+    compressed = install_compressed(registry, tmp_path)
+    version = compressed.model_version("fertilizer")
+    assert compressed.stats()["fertilizer"]["format"] == "agm"
+    assert version.startswith(registry.model_version("fertilizer") + "+compressed-")
+
+
+@pytest.mark.parametrize("corrupt", [lambda data: b"", lambda data: data[:len(data) // 2],
+                                     lambda data: data[:40] + b"{" + data[41:]])
+def test_corrupt_artifact_falls_back_to_the_pickle(registry, tmp_path, corrupt):
+    path = export_model(registry.get("soil"), artifact_path("soil", str(tmp_path)))
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(corrupt(data))
+    fresh = ModelRegistry(artifact_dir=str(tmp_path))
+    assert type(fresh.get("soil")) is type(registry.get("soil"))
+    assert fresh.stats()["soil"]["format"] == "pickle"
+
+
+def test_stand_ins_reject_a_compressed_forest(registry, fertilizer_stand_ins, tmp_path):
+    grid_path, rules_path = fertilizer_stand_ins
+    compressed = install_compressed(registry, tmp_path)
+    model = compressed.get("fertilizer")
+    assert not isinstance(with_decision_grid(compressed, grid_path)(model), DecisionGrid)
+    assert not isinstance(with_rule_model(compressed, rules_path, min_agreement=0.0)(model), RuleModel)
+
+
+def _predict_concurrently(model, n_rows=3000):
+    """Predict `n_rows` one-row arrays (half of them outside the form
+    climate) from 8 threads, switching threads as often as possible."""
+    rng = np.random.default_rng(0)
+    rows = np.tile(np.array([[*FORM_CLIMATE, 0, 0, 0, 0, 0]], dtype=np.float64), (n_rows, 1))
+    rows[:, 3:] = rng.integers(0, [5, 11, 101, 51, 51], (n_rows, 5))
+    rows[::2, 0] = 45.0
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda i: model.predict(rows[i:i + 1]), range(n_rows)))
+    finally:
+        sys.setswitchinterval(interval)
+    return n_rows
+
+
+def test_grid_counts_every_row_under_concurrency(registry, fertilizer_stand_ins):
+    grid = with_decision_grid(registry, fertilizer_stand_ins[0])(registry.get("fertilizer"))
+    n_rows = _predict_concurrently(grid)
+    assert grid.counts["grid"] > 0 and grid.counts["fallback"] > 0
+    assert grid.counts["grid"] + grid.counts["fallback"] == n_rows
+
+
+def test_rule_counts_every_row_under_concurrency(registry, fertilizer_stand_ins):
+    rules = with_rule_model(registry, fertilizer_stand_ins[1], min_agreement=0.0)(registry.get("fertilizer"))
+    n_rows = _predict_concurrently(rules)
+    assert rules.counts["rules"] > 0 and rules.counts["fallback"] > 0
+    assert rules.counts["rules"] + rules.counts["fallback"] == n_rows
+
+
+def _in_thread(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_derive_build_can_load_other_models():
+    fresh = ModelRegistry(artifact_dir=None)
+    built = {}
+    thread = _in_thread(lambda: built.update(
+        obj=fresh.derive("le_soil", "pair", lambda model: (model, fresh.get("le_crop")))))
+    thread.join(timeout=60)
+    assert not thread.is_alive(), "derive deadlocked on a nested registry.get"
+    assert built["obj"][1] is fresh.get("le_crop")
+
+
+def test_slow_build_does_not_block_other_models():
+    fresh = ModelRegistry(artifact_dir=None)
+    release = threading.Event()
+
+    def slow_build(model):
+        release.wait(timeout=60)
+        return model
+
+    fresh.get("le_soil")
+    builder = _in_thread(lambda: fresh.derive("le_soil", "slow", slow_build))
+    loader = _in_thread(lambda: fresh.get("le_crop"))
+    loader.join(timeout=30)
+    blocked = loader.is_alive()
+    release.set()
+    builder.join(timeout=30)
+    assert not blocked, "registry.get waited for an unrelated derive"
+    assert fresh.derive("le_soil", "slow", slow_build) is fresh.get("le_soil")
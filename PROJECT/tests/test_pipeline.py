@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from data_store import load_dataset
+from feature_schema import (
+    CROP_BOUNDS, FERT_BOUNDS, SOIL_BOUNDS, SOIL_TO_CROP_NPK, SOIL_TO_FERT_NPK,
+)
+from pipeline import FERT_NPK_COLUMNS, PIPELINE_BOUNDS, FieldPipeline, mapped_npk, rescale
+
+# (temperature, humidity, rainfall) of a few field climates
+CLIMATES = [(24.0, 82.0, 230.0), (22.0, 65.0, 90.0), (30.0, 60.0, 60.0)]
+
+
+def test_pipeline_bounds_are_accepted_by_every_stage():
+    for nutrient in ["N", "P", "K"]:
+        low, high = PIPELINE_BOUNDS[nutrient]
+        assert SOIL_BOUNDS[nutrient][0] <= low and high <= SOIL_BOUNDS[nutrient][1]
+        crop_low, crop_high = rescale(np.array([low, high]), SOIL_TO_CROP_NPK[nutrient])
+        assert CROP_BOUNDS[nutrient][0] <= crop_low and crop_high <= CROP_BOUNDS[nutrient][1]
+        fert_low, fert_high = rescale(np.array([low, high]), SOIL_TO_FERT_NPK[nutrient])
+        column = FERT_NPK_COLUMNS[nutrient]
+        assert FERT_BOUNDS[column][0] <= fert_low and fert_high <= FERT_BOUNDS[column][1]
+
+
+@pytest.mark.parametrize("climate", CLIMATES)
+def test_bundled_soil_rows_pass_every_stage(registry, climate):
+    temperature, humidity, rainfall = climate
+    soil = load_dataset("soil").drop(columns=["fertility"])
+    fields = soil.assign(temperature=temperature, humidity=humidity, rainfall=rainfall,
+                         Moisture=40.0, **{"Soil Type": "Loamy"})
+    inside = np.ones(len(fields), dtype=bool)
+    for col, (low, high) in PIPELINE_BOUNDS.items():
+        inside &= fields[col].between(low, high).to_numpy()
+    # Only the 13 rows with a pH of 0.9 or 11.15 are outside the form's range
+    assert inside.mean() > 0.98
+
+    result, _ = FieldPipeline.from_registry(registry).run(fields[inside])
+    for stage in ["soil", "crop", "fertilizer"]:
+        assert (result[f"{stage}_error"] == "").all(), result[f"{stage}_error"].unique()
+    has_fertilizer_data = result["Crop Type"] != ""
+    assert has_fertilizer_data.any()
+    assert (result.loc[has_fertilizer_data, "Recommended Fertilizer"] != "").all()
+
+
+def test_models_get_the_mapped_npk(registry):
+    class Recorder:
+        def __init__(self, model):
+            self.model, self.seen = model, None
+
+        def predict(self, X):
+            self.seen = X
+            return self.model.predict(X)
+
+    base = FieldPipeline.from_registry(registry)
+    crop, fertilizer = Recorder(base.crop_model), Recorder(base.fertilizer.model)
+    base.fertilizer.model = fertilizer
+    pipeline = FieldPipeline(base.soil_model, crop, base.fertilizer)
+    fields = load_dataset("soil").drop(columns=["fertility"]).iloc[:50].assign(
+        temperature=24.0, humidity=82.0, rainfall=230.0, Moisture=40.0, **{"Soil Type": "Loamy"})
+    result, _ = pipeline.run(fields)
+    npk = mapped_npk(fields.reset_index(drop=True))
+    np.testing.assert_allclose(crop.seen[["N", "P", "K"]], npk["crop"])
+    has_crop = (result["Crop Type"] != "").to_numpy()
+    np.testing.assert_allclose(fertilizer.seen[list(npk["fertilizer"].columns)], npk["fertilizer"][has_crop])
@@ -0,0 +1,33 @@
+import sqlite3
+
+import numpy as np
+
+from prediction_cache import PredictionCache
+
+
+def _versions(path):
+    with sqlite3.connect(path) as db:
+        return sorted(row[0] for row in db.execute("SELECT DISTINCT version FROM predictions"))
+
+
+def test_prune_keeps_tagged_variants_of_the_same_model(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PredictionCache(disk_path=path)
+    row = np.zeros((1, 3))
+    for version in ["aaaa", "aaaa+rules-1", "aaaa+compressed-2", "bbbb", "bbbb+rules-1", "aaaab"]:
+        cache.predict("fertilizer", version, lambda X: np.zeros(len(X)), row)
+    cache.predict("crop", "bbbb", lambda X: np.zeros(len(X)), row)
+
+    # A page process serving the rules and a service serving the grid share the file
+    cache.prune("fertilizer", "aaaa+rules-1")
+    cache.prune("fertilizer", "aaaa")
+    assert _versions(path) == ["aaaa", "aaaa+compressed-2", "aaaa+rules-1", "bbbb"]
+
+
+def test_disk_tier_answers_other_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    PredictionCache(disk_path=path).predict("soil", "v1", lambda X: np.full(len(X), 2), np.ones((2, 12)))
+    other = PredictionCache(disk_path=path)
+    calls = []
+    result = other.predict("soil", "v1", lambda X: calls.append(len(X)) or np.zeros(len(X)), np.ones((1, 12)))
+    assert result.tolist() == [2] and not calls and other.stats()["disk_hits"] == 1
@@ -0,0 +1,72 @@
+import json
+import zipfile
+
+import pandas as pd
+import pytest
+
+import reports
+from reports import render_report, report_cache_info, report_hash, write_report_zip
+
+
+@pytest.fixture
+def scored_csv(tmp_path):
+    path = tmp_path / "scored.csv"
+    pd.DataFrame({
+        "N": range(120),
+        "fertility_label": ["🌟 High Fertility", "✅ Moderate Fertility", ""] * 40,
+        "error": ["", "", "N outside 6.0-383.0"] * 40,
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("per_field, names", [
+    (True, ["000001_High_Fertility.pdf", "000002_Moderate_Fertility.pdf", "000003_flagged.pdf"]),
+    (False, ["soil_reports_000001-000050.pdf", "soil_reports_000051-000100.pdf",
+             "soil_reports_000101-000120.pdf"]),
+])
+def test_zip_holds_every_field(scored_csv, tmp_path, monkeypatch, per_field, names):
+    monkeypatch.setattr(reports, "TASK_SIZE", 16)
+    monkeypatch.setattr(reports, "PART_SIZE", 50)
+    zip_path = tmp_path / "reports.zip"
+    done = []
+
+    summary = write_report_zip(scored_csv, str(zip_path), "soil", per_field=per_field, workers=2,
+                               progress=done.append)
+    with zipfile.ZipFile(zip_path) as archive:
+        files = sorted(archive.namelist())
+        assert all(archive.read(name).startswith(b"%PDF") for name in files)
+
+    assert summary["fields"] == 120 and summary["files"] == len(files)
+    assert len(files) == (120 if per_field else 3)
+    assert files[:3] == names
+    assert done[-1] == 120 and done == sorted(done)
+
+
+def test_unknown_kind_is_rejected(scored_csv, tmp_path):
+    with pytest.raises(ValueError, match="Unknown report kind"):
+        write_report_zip(scored_csv, str(tmp_path / "reports.zip"), "yield")
+
+
+def test_single_reports_are_cached_by_content(monkeypatch):
+    monkeypatch.setattr(reports, "_rendered", reports.OrderedDict())
+    monkeypatch.setattr(reports, "_render_stats", {"hits": 0, "renders": 0})
+    data = {"Nitrogen": 37, "Recommended Fertilizer": "Urea"}
+
+    pdf = render_report("fertilizer", data)
+    assert pdf.startswith(b"%PDF")
+    assert render_report("fertilizer", dict(reversed(list(data.items())))) is pdf
+    assert json.loads(render_report("fertilizer", data, "json")) == {
+        "report": "Fertilizer Recommendation Report", **data}
+    assert render_report("fertilizer", data, "csv") == b"Nitrogen,Recommended Fertilizer\n37,Urea\n"
+    render_report("fertilizer", {**data, "Nitrogen": 38})
+    assert report_cache_info() == {"hits": 1, "renders": 4, "entries": 4}
+
+
+def test_report_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(reports, "_rendered", reports.OrderedDict())
+    monkeypatch.setattr(reports, "MAX_CACHED_REPORTS", 3)
+    for n in range(5):
+        render_report("soil", {"N": n}, "json")
+    assert report_cache_info()["entries"] == 3
+    assert (("json", report_hash("soil", {"N": 4})) in reports._rendered
+            and ("json", report_hash("soil", {"N": 0})) not in reports._rendered)
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from feature_schema import CROP_BOUNDS, CROP_FEATURES, reverse_label_mapping
+from sensitivity import crop_regions, crop_sweep, sweep_table, sweep_values
+
+BASE = {"N": 90, "P": 42, "K": 43, "temperature": 20.9, "humidity": 82.0, "ph": 6.5, "rainfall": 202.9}
+
+
+def test_integer_inputs_sweep_whole_numbers():
+    values = sweep_values("N", 400)
+    assert values[0] == CROP_BOUNDS["N"][0] and values[-1] == CROP_BOUNDS["N"][1]
+    assert len(values) == 151 and (values == values.round()).all()
+    assert len(sweep_values("ph", 40)) == 40
+
+
+def test_two_parameter_sweep_is_the_full_lattice():
+    table = sweep_table(BASE, ["ph", "rainfall"], resolution=20)
+    assert list(table.columns) == CROP_FEATURES
+    assert len(table) == 400
+    assert (table["N"] == 90).all() and (table["temperature"] == 20.9).all()
+    assert table[["ph", "rainfall"]].drop_duplicates().shape[0] == 400
+
+
+@pytest.mark.parametrize("params", [[], ["N", "P", "K"], ["yield"]])
+def test_bad_parameters_are_rejected(params):
+    with pytest.raises(ValueError):
+        sweep_table(BASE, params)
+
+
+def test_sweep_matches_row_by_row_predictions(registry):
+    model = registry.get("crop")
+    sweep = crop_sweep(model, BASE, ["rainfall"], resolution=60)
+    expected = [reverse_label_mapping[model.predict(pd.DataFrame([row])[CROP_FEATURES])[0]]
+                for row in sweep[CROP_FEATURES].to_dict("records")]
+    assert sweep["crop"].tolist() == expected
+
+
+def test_regions_cover_the_sweep_in_runs():
+    sweep = pd.DataFrame({"rainfall": [20.0, 40.0, 60.0, 80.0, 100.0],
+                          "crop": ["rice", "rice", "maize", "rice", "rice"]})
+    regions = crop_regions(sweep, "rainfall")
+    assert regions.to_dict("records") == [
+        {"crop": "rice", "from": 20.0, "to": 40.0},
+        {"crop": "maize", "from": 60.0, "to": 60.0},
+        {"crop": "rice", "from": 80.0, "to": 100.0},
+    ]
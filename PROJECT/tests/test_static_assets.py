@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+import static_assets
+from static_assets import BG_DIR, LOCAL_IMAGES, REMOTE_IMAGES, background_css, font_import
+
+
+@pytest.mark.parametrize("image", list(LOCAL_IMAGES) + list(REMOTE_IMAGES))
+def test_backgrounds_come_from_this_server(image, monkeypatch):
+    before = sorted(os.listdir(BG_DIR))
+    for serving in (True, False):
+        monkeypatch.setattr(static_assets, "static_serving", lambda: serving)
+        css = background_css(image, "linear-gradient(white, white)")
+        assert "url(" in css and "http" not in css
+    # Rendering only reads the committed variants
+    assert sorted(os.listdir(BG_DIR)) == before
+
+
+@pytest.mark.parametrize("family", static_assets.FONTS)
+def test_fonts_never_come_from_google(family):
+    assert "http" not in font_import(family)
@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+from model_artifacts import export_model, load_artifact
+from train import SERVABLE, load_task, make_candidate
+
+
+@pytest.mark.parametrize("task, kind", [(task, kind) for task, kinds in SERVABLE.items()
+                                        for kind in sorted(kinds)])
+def test_servable_candidates_export_as_agm(tmp_path, task, kind):
+    X, y, _ = load_task(task)
+    X, y = X.iloc[::4], y[::4]
+    model = make_candidate(kind, seed=0).fit(X, y)
+    path = export_model(model, str(tmp_path / f"{task}.agm"))
+    artifact = load_artifact(path)
+    np.testing.assert_array_equal(artifact.model.predict(X), model.predict(X))
@@ -0,0 +1,273 @@
+# Reproducible training for the three AgriFusion models
+#
+#   python train.py [crop fertilizer soil] [--candidates rf xgb svm] [--folds 5]
+#                   [--jobs -1] [--seed 42] [--promote]
+#
+# Replaces the training cells of "Crop Recommendation.ipynb",
+# "Crop_Fertilizer_Predictor.ipynb" and Pages/Fertility.ipynb. Data comes
+# from data_store, so every run sees the same typed columns. For each task
+# the rows are split into a stratified train/test split; every candidate is
+# cross-validated on the train part, with all (task, candidate, fold) fits
+# running in parallel on a process pool (one core per fit). The candidate
+# with the best mean CV accuracy is refit on the train part and scored on
+# the test part.
+#
+# Each run writes artifacts/models/<task>/<version>/ with the pickles and a
+# manifest.json: seed, dataset hash, library versions, and per candidate
+# the CV accuracy, fit time, predict latency and pickle size. --promote
+# installs the model and encoders at the paths the pages load them from
+# (model_registry.ARTIFACTS); caches keyed by model version pick it up.
+# Only models the pages can serve are promoted: the crop and fertilizer
+# pages compile their model into a flat forest, so those must be forests,
+# and `model_artifacts.py export` writes every model as an .agm artifact,
+# which holds forests and XGBoost models only (so no SVM for soil either).
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import platform
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.svm import SVC
+
+from data_store import load_dataset, source_path
+from feature_schema import CROP_FEATURES, FERT_ENCODERS, FERT_FEATURES, SOIL_FEATURES, label_mapping
+from model_registry import ARTIFACTS, BASE_DIR
+
+MODEL_DIR = os.path.join(BASE_DIR, "artifacts", "models")
+
+# Same fertility coding as Pages/Fertility.ipynb
+SOIL_CLASSES = {"Less Fertile": 0, "Fertile": 1, "Highly Fertile": 2}
+
+# Task -> candidate kinds the pages can serve
+SERVABLE = {
+    "crop": {"rf"},
+    "fertilizer": {"rf"},
+    "soil": {"rf", "xgb"},
+}
+
+LATENCY_REPEATS = 30
+
+
+def make_candidate(kind, seed):
+    """Unfitted estimator for a candidate kind (notebook hyperparameters,
+    single-threaded: the parallelism is across fits)."""
+    if kind == "rf":
+        return RandomForestClassifier(n_estimators=100, random_state=seed, n_jobs=1)
+    if kind == "xgb":
+        from xgboost import XGBClassifier
+        return XGBClassifier(eval_metric="mlogloss", random_state=seed, n_jobs=1)
+    if kind == "svm":
+        return make_pipeline(StandardScaler(), SVC(kernel="rbf", C=10, gamma="scale", random_state=seed))
+    raise ValueError(f"Unknown candidate '{kind}'")
+
+
+CANDIDATES = ["rf", "xgb", "svm"]
+
+
+def load_task(task):
+    """(X, y, encoders) for a task: model columns in training order, integer
+    targets, and the LabelEncoders the pages need next to the model."""
+    if task == "crop":
+        data = load_dataset("crop")
+        # Sorted categories: the codes are the alphabetical LabelEncoder codes
+        assert list(data["label"].cat.categories) == sorted(label_mapping, key=label_mapping.get)
+        return data[CROP_FEATURES], data["label"].cat.codes.to_numpy(np.int64), {}
+    if task == "fertilizer":
+        data = load_dataset("fertilizer")
+        encoders = {}
+        X = data[FERT_FEATURES].copy()
+        for col, name in FERT_ENCODERS.items():
+            encoders[name] = LabelEncoder().fit(data[col].astype(str))
+            X[col] = encoders[name].transform(data[col].astype(str))
+        encoders["le_fert"] = LabelEncoder().fit(data["Fertilizer Name"].astype(str))
+        y = encoders["le_fert"].transform(data["Fertilizer Name"].astype(str))
+        return X, y, encoders
+    if task == "soil":
+        data = load_dataset("soil")
+        return data[SOIL_FEATURES], data["fertility"].astype(str).map(SOIL_CLASSES).to_numpy(np.int64), {}
+    raise ValueError(f"Unknown task '{task}'")
+
+
+def predict_latency(model, X):
+    """(median single-row predict seconds, batch predict seconds per row)."""
+    row = X.iloc[:1]
+    times = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        model.predict(row)
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    model.predict(X)
+    return float(np.median(times)), (time.perf_counter() - start) / len(X)
+
+
+def fit_fold(task, kind, fold, estimator, X, y, train_idx, val_idx):
+    """One cross-validation fit; runs in a worker process."""
+    start = time.perf_counter()
+    model = clone(estimator).fit(X.iloc[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+    X_val = X.iloc[val_idx]
+    accuracy = accuracy_score(y[val_idx], model.predict(X_val))
+    latency, per_row = predict_latency(model, X_val)
+    return {
+        "task": task, "candidate": kind, "fold": fold,
+        "accuracy": accuracy, "fit_seconds": fit_seconds,
+        "predict_seconds": latency, "batch_seconds_per_row": per_row,
+        "model_bytes": len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+    }
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _library_versions():
+    import sklearn
+    versions = {"python": platform.python_version(), "numpy": np.__version__, "sklearn": sklearn.__version__}
+    try:
+        import xgboost
+        versions["xgboost"] = xgboost.__version__
+    except ImportError:
+        pass
+    return versions
+
+
+def _summarize(results):
+    keys = ["accuracy", "fit_seconds", "predict_seconds", "batch_seconds_per_row", "model_bytes"]
+    summary = {key: float(np.mean([r[key] for r in results])) for key in keys}
+    summary["accuracy_std"] = float(np.std([r["accuracy"] for r in results]))
+    summary["folds"] = len(results)
+    return summary
+
+
+def train(tasks, candidates=CANDIDATES, folds=5, jobs=-1, seed=42, test_size=0.2, output_dir=MODEL_DIR):
+    """Cross-validate every candidate of every task in one parallel pass,
+    refit each task's winners and write their versioned artifacts.
+    Returns one manifest dict per task."""
+    prepared, jobs_list = {}, []
+    for task in tasks:
+        X, y, encoders = load_task(task)
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=test_size, stratify=y, random_state=seed)
+        # Every class needs a row in every fold
+        n_splits = max(2, min(folds, int(np.bincount(y_train).min())))
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+        prepared[task] = (X, X_train, X_test, y_train, y_test, encoders, n_splits)
+        for kind in candidates:
+            estimator = make_candidate(kind, seed)
+            for fold, (train_idx, val_idx) in enumerate(splitter.split(X_train, y_train)):
+                jobs_list.append(delayed(fit_fold)(task, kind, fold, estimator, X_train, y_train,
+                                                   train_idx, val_idx))
+
+    start = time.perf_counter()
+    results = Parallel(n_jobs=jobs)(jobs_list)
+    cv_seconds = time.perf_counter() - start
+
+    manifests = []
+    for task in tasks:
+        X, X_train, X_test, y_train, y_test, encoders, n_splits = prepared[task]
+        scores = {kind: _summarize([r for r in results if r["task"] == task and r["candidate"] == kind])
+                  for kind in candidates}
+        ranked = sorted(candidates, key=lambda kind: -scores[kind]["accuracy"])
+        servable = [kind for kind in ranked if kind in SERVABLE[task]]
+        chosen = servable[0] if servable else ranked[0]
+
+        model = make_candidate(chosen, seed).fit(X_train, y_train)
+        test_accuracy = accuracy_score(y_test, model.predict(X_test))
+        latency, per_row = predict_latency(model, X_test)
+
+        version = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        directory = os.path.join(output_dir, task, version)
+        os.makedirs(directory, exist_ok=True)
+        files = {}
+        for name, obj in [(task, model)] + sorted(encoders.items()):
+            path = os.path.join(directory, ARTIFACTS[name])
+            joblib.dump(obj, path)
+            files[name] = {"file": ARTIFACTS[name], "sha256": _file_sha256(path)}
+
+        manifest = {
+            "task": task,
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "seed": seed,
+            "dataset": {"file": os.path.basename(source_path(task)), "sha256": _file_sha256(source_path(task)),
+                        "rows": len(X), "train_rows": len(X_train), "test_rows": len(X_test)},
+            "cv": {"folds": n_splits, "seconds_all_tasks": cv_seconds, "jobs": jobs},
+            "libraries": _library_versions(),
+            "candidates": scores,
+            "best_cv": ranked[0],
+            "selected": chosen,
+            "params": {k: v for k, v in model.get_params().items() if isinstance(v, (int, float, str, bool, type(None)))},
+            "test": {"accuracy": test_accuracy, "predict_seconds": latency, "batch_seconds_per_row": per_row,
+                     "model_bytes": len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))},
+            "servable": chosen in SERVABLE[task],
+            "files": files,
+        }
+        with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        manifest["directory"] = directory
+        manifests.append(manifest)
+    return manifests
+
+
+def promote(manifest, base_dir=BASE_DIR):
+    """Install a trained version at the paths the registry loads from."""
+    if not manifest["servable"]:
+        raise ValueError(f"{manifest['task']}: '{manifest['selected']}' models cannot be served by the pages")
+    for name, info in manifest["files"].items():
+        target = os.path.join(base_dir, ARTIFACTS[name])
+        shutil.copyfile(os.path.join(manifest["directory"], info["file"]), target + ".tmp")
+        os.replace(target + ".tmp", target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train, compare and version the AgriFusion models")
+    parser.add_argument("tasks", nargs="*", metavar="task", help=f"any of {', '.join(SERVABLE)} (default: all)")
+    parser.add_argument("--candidates", nargs="+", choices=CANDIDATES, default=CANDIDATES)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits (-1: all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--output-dir", default=MODEL_DIR)
+    parser.add_argument("--promote", action="store_true", help="install the selected models for the pages")
+    args = parser.parse_args(argv)
+    unknown = set(args.tasks) - set(SERVABLE)
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(sorted(unknown))}")
+
+    manifests = train(args.tasks or list(SERVABLE), args.candidates, args.folds, args.jobs, args.seed,
+                      args.test_size, args.output_dir)
+    for manifest in manifests:
+        print(f"\n🌱 {manifest['task']} -> {manifest['directory']}")
+        print(f"{'candidate':<10} {'cv acc':>8} {'± std':>7} {'fit s':>8} {'predict ms':>11} {'size KB':>9}")
+        for kind, s in manifest["candidates"].items():
+            marker = " *" if kind == manifest["selected"] else ""
+            print(f"{kind:<10} {s['accuracy']:8.4f} {s['accuracy_std']:7.4f} {s['fit_seconds']:8.2f} "
+                  f"{s['predict_seconds'] * 1000:11.3f} {s['model_bytes'] / 1024:9.1f}{marker}")
+        print(f"test accuracy of {manifest['selected']}: {manifest['test']['accuracy']:.4f}")
+        if args.promote:
+            promote(manifest)
+            print(f"✅ promoted {', '.join(manifest['files'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+# Flat-array evaluation of fitted random forests
+#
+# sklearn's RandomForestClassifier.predict spends most of a one-row call on
+# input validation and dispatching 100 per-tree Python calls. FlatForest
+# copies every tree of a fitted forest into one set of contiguous node arrays
+# and walks all trees at once, with a compiled loop when numba is installed
+# and a vectorized NumPy loop otherwise. numba is imported when the first
+# prediction needs it, not with this module: importing it takes longer than
+# painting a page.
+#
+# Predictions are bit-for-bit the same as sklearn's: inputs are rounded to
+# float32 exactly like sklearn's tree code, and the per-tree probabilities
+# are summed in estimator order and divided by the number of trees, as
+# ForestClassifier.predict_proba does.
+#
+# EarlyExitForest answers `predict` from as few trees as decide it. Trees
+# are visited most-reliable first, and a row stops as soon as its leading
+# class is ahead of every other class by more than the number of trees left
+# (a tree adds at most 1.0 to any class), so no remaining tree can change the
+# answer. A row that never gets that far is summed again in estimator order,
+# so the predictions are always exactly those of the full forest.
+import threading
+
+import numpy as np
+
+# Rows evaluated together by the NumPy path (bounds the (rows, trees) index array)
+CHUNK_NODES = 1 << 20
+
+
+class FlatForest:
+    """A fitted forest stored as contiguous node arrays.
+
+    Leaves point to themselves, so every tree can be walked for the same
+    number of steps (the depth of the deepest tree) without branching.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 classes, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.feature_names_in_ = feature_names
+        self.n_features_in_ = (len(feature_names) if feature_names is not None
+                               else int(feature.max()) + 1)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Build from a fitted sklearn RandomForestClassifier (or ExtraTreesClassifier)."""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(offset, offset + n, dtype=np.int32)
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+            lefts.append(np.where(is_leaf, own, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, own, tree.children_right + offset).astype(np.int32))
+
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            if not np.allclose(totals[is_leaf], 1.0):
+                # Pickles from sklearn < 1.4 store class counts; normalize like
+                # their DecisionTreeClassifier.predict_proba did
+                totals[totals == 0.0] = 1.0
+                value = value / totals
+            values.append(value)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            classes=np.asarray(forest.classes_),
+            feature_names=getattr(forest, "feature_names_in_", None),
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left,
+                                      self.right, self.value, self.roots))
+
+    def _prepare(self, X):
+        if hasattr(X, "columns") and self.feature_names_in_ is not None:
+            if list(X.columns) != list(self.feature_names_in_):
+                X = X[list(self.feature_names_in_)]
+            X = X.to_numpy(dtype=np.float32)
+        # sklearn evaluates trees on float32 inputs compared against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the forest expects {self.n_features_in_}")
+        if np.isnan(X).any():
+            raise ValueError("Input contains NaN")
+        return np.ascontiguousarray(X, dtype=np.float64)
+
+    def apply(self, X):
+        """Global leaf index reached in every tree, shape (n_rows, n_trees)."""
+        X = self._prepare(X)
+        return self._apply(X)
+
+    def _apply(self, X):
+        n_rows = X.shape[0]
+        leaves = np.empty((n_rows, self.n_trees), dtype=np.int32)
+        step = max(1, CHUNK_NODES // self.n_trees)
+        for start in range(0, n_rows, step):
+            rows = X[start:start + step]
+            row_ids = np.arange(len(rows))[:, None]
+            node = np.broadcast_to(self.roots, (len(rows), self.n_trees)).copy()
+            for _ in range(self.max_depth):
+                go_left = rows[row_ids, self.feature[node]] <= self.threshold[node]
+                node = np.where(go_left, self.left[node], self.right[node])
+            leaves[start:start + step] = node
+        return leaves
+
+    def predict_proba(self, X):
+        X = self._prepare(X)
+        kernel = _proba_kernel()
+        if kernel is not None:
+            out = np.zeros((X.shape[0], self.value.shape[1]), dtype=np.float64)
+            kernel(X, self.feature, self.threshold, self.left, self.right,
+                          self.value, self.roots, out)
+        else:
+            # Summing over the (non-contiguous) tree axis adds trees one after
+            # another, the same order sklearn accumulates them in
+            out = self.value[self._apply(X)].sum(axis=1, dtype=np.float64)
+        out /= self.n_trees
+        return out
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def as_flat_forest(model):
+    """FlatForest for a fitted sklearn forest (models loaded from .agm artifacts already are one)."""
+    return model if isinstance(model, FlatForest) else FlatForest.from_sklearn(model)
+
+
+# A stop needs the margin to beat the trees left by this much, so float
+# rounding in the partial sums can never decide a near-tie
+MARGIN_SLACK = 1e-9
+
+_evaluated = threading.local()
+
+
+def trees_evaluated():
+    """Trees the calling thread's EarlyExitForest predictions have evaluated
+    since its last `reset_trees_evaluated()` (cache hits evaluate none)."""
+    return getattr(_evaluated, "trees", 0)
+
+
+def reset_trees_evaluated():
+    _evaluated.trees = 0
+
+
+def add_trees_evaluated(n):
+    """Credit `n` evaluated trees to the calling thread (e.g. a micro-batch's share)."""
+    _evaluated.trees = trees_evaluated() + n
+
+
+def tree_order(forest, X):
+    """Tree indices, the trees that most often agree with the whole forest
+    on the rows of X first."""
+    leaves = forest.apply(X)
+    votes = forest.value[leaves]  # (rows, trees, classes)
+    final = np.argmax(votes.sum(axis=1), axis=1)
+    agreement = (np.argmax(votes, axis=2) == final[:, None]).mean(axis=0)
+    return np.argsort(-agreement, kind="stable").astype(np.int32)
+
+
+class EarlyExitForest:
+    """A FlatForest whose `predict` stops evaluating trees once the answer
+    is settled. `counts` totals the rows predicted and trees evaluated;
+    `histogram[k]` counts the rows that needed k trees."""
+
+    def __init__(self, forest, order=None):
+        self.forest = forest
+        self.order = (np.arange(forest.n_trees, dtype=np.int32) if order is None
+                      else np.asarray(order, dtype=np.int32))
+        self.counts = {"rows": 0, "trees": 0}
+        self.histogram = np.zeros(forest.n_trees + 1, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def predict_counted(self, X):
+        """(predictions, trees evaluated for each row)."""
+        forest = self.forest
+        X = forest._prepare(X)
+        kernel = _early_exit_kernel()
+        if kernel is not None:
+            out = np.zeros((X.shape[0], forest.value.shape[1]), dtype=np.float64)
+            evaluated = np.empty(X.shape[0], dtype=np.int32)
+            kernel(X, forest.feature, forest.threshold, forest.left, forest.right,
+                   forest.value, forest.roots, self.order, MARGIN_SLACK, out, evaluated)
+        else:
+            # The NumPy path walks every tree anyway; it reports how many the
+            # early exit would have needed and gives the same predictions
+            leaves = forest._apply(X)
+            out, evaluated = _early_exit_numpy(forest.value, leaves, self.order)
+        predictions = forest.classes_[np.argmax(out, axis=1)]
+
+        total = int(evaluated.sum())
+        with self._lock:
+            self.counts["rows"] += len(evaluated)
+            self.counts["trees"] += total
+            if len(evaluated) == 1:
+                self.histogram[total] += 1
+            else:
+                self.histogram += np.bincount(evaluated, minlength=len(self.histogram))
+        add_trees_evaluated(total)
+        return predictions, evaluated
+
+    def predict(self, X):
+        return self.predict_counted(X)[0]
+
+    def stats(self):
+        with self._lock:
+            rows, trees = self.counts["rows"], self.counts["trees"]
+            histogram = self.histogram.copy()
+        return {"rows": rows, "trees_evaluated": trees, "n_trees": self.forest.n_trees,
+                "mean_trees": trees / rows if rows else 0.0,
+                "histogram": {int(k): int(n) for k, n in enumerate(histogram) if n}}
+
+    def __getattr__(self, attr):
+        # predict_proba, apply, classes_, feature_names_in_ ... from the full forest
+        return getattr(self.forest, attr)
+
+
+def with_early_exit(dataset, features):
+    """`build` for registry.derive / cached_predictor: the flat forest with
+    early exit, its trees ordered on the rows of `dataset` (data_store.py)."""
+    def build(model):
+        from data_store import load_dataset
+
+        rows = load_dataset(dataset, features)
+        for col in rows.columns:
+            if rows[col].dtype == "category":
+                # Sorted categories: the codes are the LabelEncoder codes
+                rows[col] = rows[col].cat.codes
+        forest = as_flat_forest(model)
+        return EarlyExitForest(forest, tree_order(forest, rows))
+
+    return build
+
+
+def _early_exit_numpy(value, leaves, order):
+    n_trees = len(order)
+    partial = np.cumsum(value[leaves[:, order]], axis=1)  # (rows, trees, classes)
+    top_two = np.sort(partial, axis=2)[:, :, -2:]
+    remaining = n_trees - np.arange(1, n_trees + 1)
+    settled = top_two[:, :, 1] - top_two[:, :, 0] > remaining + MARGIN_SLACK
+    evaluated = np.where(settled.any(axis=1), settled.argmax(axis=1) + 1, n_trees).astype(np.int32)
+    out = partial[np.arange(len(leaves)), evaluated - 1]
+    unsettled = ~settled.any(axis=1)
+    if unsettled.any():
+        # Estimator order and the division, exactly as predict_proba
+        out[unsettled] = value[leaves[unsettled]].sum(axis=1, dtype=np.float64) / n_trees
+    return out, evaluated
+
+
+def _proba_loop(X, feature, threshold, left, right, value, roots, out):
+    for i in range(X.shape[0]):
+        for t in range(roots.shape[0]):
+            node = roots[t]
+            while left[node] != node:
+                if X[i, feature[node]] <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            for c in range(value.shape[1]):
+                out[i, c] += value[node, c]
+
+
+def _early_exit_loop(X, feature, threshold, left, right, value, roots, order, slack, out, evaluated):
+    n_trees = order.shape[0]
+    n_classes = value.shape[1]
+    leaves = np.empty(n_trees, dtype=np.int32)
+    for i in range(X.shape[0]):
+        evaluated[i] = n_trees
+        # The margin is at most k + 1, so nothing can settle before the middle
+        next_check = n_trees // 2
+        for k in range(n_trees):
+            t = order[k]
+            node = roots[t]
+            while left[node] != node:
+                if X[i, feature[node]] <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            leaves[t] = node
+            for c in range(n_classes):
+                out[i, c] += value[node, c]
+            if k >= next_check:
+                remaining = n_trees - k - 1
+                first = 0.0
+                second = 0.0
+                for c in range(n_classes):
+                    if out[i, c] > first:
+                        second = first
+                        first = out[i, c]
+                    elif out[i, c] > second:
+                        second = out[i, c]
+                shortfall = remaining + slack - (first - second)
+                if shortfall < 0.0:
+                    evaluated[i] = k + 1
+                    break
+                # Each tree closes the gap by at most 2 (margin +1, one fewer left)
+                next_check = k + max(1, int(np.ceil(shortfall / 2.0)))
+        if evaluated[i] == n_trees:
+            # Estimator order and the division, exactly as predict_proba
+            for c in range(n_classes):
+                out[i, c] = 0.0
+            for t in range(n_trees):
+                for c in range(n_classes):
+                    out[i, c] += value[leaves[t], c]
+            for c in range(n_classes):
+                out[i, c] /= n_trees
+
+
+_kernel = None  # compiled _proba_loop, False without numba
+_exit_kernel = None  # compiled _early_exit_loop, False without numba
+
+
+def _proba_kernel():
+    """`_proba_loop` compiled by numba on first use, or None if numba is not
+    installed (the NumPy path gives identical results)."""
+    global _kernel
+    if _kernel is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _kernel = False
+        else:
+            _kernel = njit(cache=True, nogil=True)(_proba_loop)
+    return _kernel or None
+
+
+def _early_exit_kernel():
+    """`_early_exit_loop` compiled by numba on first use, or None."""
+    global _exit_kernel
+    if _exit_kernel is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _exit_kernel = False
+        else:
+            _exit_kernel = njit(cache=True, nogil=True)(_early_exit_loop)
+    return _exit_kernel or None